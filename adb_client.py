@@ -0,0 +1,341 @@
+"""
+ADB device manager speaking the adb server's socket protocol
+Commands go straight to the local adb server instead of spawning an adb process per request
+"""
+
+import logging
+import shlex
+import socket
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEVICE_PORT = 5555
+
+
+class AdbError(Exception):
+    """The adb server rejected a request or could not be reached"""
+
+
+def device_serial(device_ip, port=None):
+    """Serial adb uses for a device: host:port for network devices"""
+    if ':' in device_ip:
+        return device_ip
+    return f"{device_ip}:{port or DEFAULT_DEVICE_PORT}"
+
+
+def shell_command(args):
+    """Quote an argument list for 'adb shell'"""
+    return ' '.join(shlex.quote(str(arg)) for arg in args)
+
+
+class AdbClient:
+    """Minimal client for the adb server smart-socket protocol (localhost:5037 by default)"""
+
+    def __init__(self, host='127.0.0.1', port=5037, timeout=10, start_server=True):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.start_server = start_server
+
+    def _connect(self, timeout=None):
+        try:
+            return socket.create_connection((self.host, self.port), timeout=timeout or self.timeout)
+        except ConnectionRefusedError:
+            raise AdbError(f"adb server is not running on {self.host}:{self.port}")
+
+    def ensure_server(self):
+        """Start the adb server if it is not running; takes seconds, so only background tasks call it"""
+        try:
+            self._connect().close()
+            return
+        except AdbError:
+            if not self.start_server:
+                raise
+        logger.info("Starting adb server")
+        subprocess.run(['adb', '-P', str(self.port), 'start-server'], capture_output=True, timeout=30)
+
+    @staticmethod
+    def _send(sock, payload):
+        data = payload.encode()
+        sock.sendall(f"{len(data):04x}".encode() + data)
+
+    @staticmethod
+    def _read_exact(sock, size):
+        data = b''
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise AdbError('adb server closed the connection')
+            data += chunk
+        return data
+
+    def _read_block(self, sock):
+        """Read a 4-hex-digit length prefixed block"""
+        length = int(self._read_exact(sock, 4), 16)
+        return self._read_exact(sock, length).decode(errors='replace')
+
+    def _check_status(self, sock):
+        status = self._read_exact(sock, 4)
+        if status == b'OKAY':
+            return
+        if status == b'FAIL':
+            raise AdbError(self._read_block(sock))
+        raise AdbError(f"Unexpected adb server response: {status!r}")
+
+    @staticmethod
+    def _read_all(sock):
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return b''.join(chunks).decode(errors='replace')
+            chunks.append(chunk)
+
+    def host_command(self, command):
+        """Run a host:* request and return its payload"""
+        with self._connect() as sock:
+            self._send(sock, command)
+            self._check_status(sock)
+            return self._read_block(sock)
+
+    def version(self):
+        return int(self.host_command('host:version'), 16)
+
+    def devices(self):
+        """Raw 'serial<TAB>state' lines as returned by 'adb devices'"""
+        return self.host_command('host:devices')
+
+    def connect(self, serial):
+        """Connect to a network device; adb reports failures in the message, not the status"""
+        message = self.host_command(f"host:connect:{serial}")
+        if 'connected to' not in message or 'failed' in message or 'cannot' in message:
+            raise AdbError(message.strip() or f"failed to connect to {serial}")
+        return message.strip()
+
+    def track_devices(self, idle_timeout=1):
+        """Yield the full device listing each time it changes (host:track-devices)
+
+        Yields None after idle_timeout seconds without a change so the caller can stop
+        """
+        with self._connect() as sock:
+            self._send(sock, 'host:track-devices')
+            self._check_status(sock)
+            sock.settimeout(idle_timeout)
+            while True:
+                try:
+                    header = sock.recv(4, socket.MSG_PEEK)
+                except socket.timeout:
+                    yield None
+                    continue
+                if not header:
+                    raise AdbError('adb server closed the connection')
+                sock.settimeout(self.timeout)
+                yield self._read_block(sock)
+                sock.settimeout(idle_timeout)
+
+    def disconnect(self, serial):
+        return self.host_command(f"host:disconnect:{serial}").strip()
+
+    def shell(self, serial, command, timeout=None):
+        """Run a shell command on one device and return its output"""
+        with self._connect(timeout) as sock:
+            self._send(sock, f"host:transport:{serial}")
+            self._check_status(sock)
+            self._send(sock, f"shell:{command}")
+            self._check_status(sock)
+            return self._read_all(sock)
+
+
+def parse_devices(raw):
+    """Parse 'adb devices' output into [{'device_id', 'status'}]"""
+    devices = []
+    for line in raw.strip().split('\n'):
+        parts = line.strip().split('\t')
+        if len(parts) >= 2 and parts[0] != 'List of devices attached':
+            devices.append({'device_id': parts[0], 'status': parts[1]})
+    return devices
+
+
+class AdbDeviceManager:
+    """In-memory device inventory that follows the adb server and keeps network devices connected"""
+
+    def __init__(self, client, health_interval=15, on_change=None):
+        self.client = client
+        self.health_interval = health_interval
+        self.on_change = on_change
+        self.running = False
+        self.tracking = False
+        self.raw_listing = ''
+        self.refreshed_at = None
+        self._lock = threading.Lock()
+        self._devices = {}  # serial -> state dict
+        self._wanted = set()  # network devices to keep connected
+
+    def _state(self, serial):
+        state = self._devices.get(serial)
+        if state is None:
+            state = self._devices[serial] = {
+                'device_id': serial,
+                'status': 'unknown',
+                'last_seen': None,
+                'last_error': None,
+                'failures': 0
+            }
+        return state
+
+    @staticmethod
+    def _set_status(state, status, changes):
+        """Update a device's status, collecting a change event when it differs"""
+        previous = state['status']
+        state['status'] = status
+        if previous != status:
+            changes.append(dict(state, previous_status=previous))
+
+    def _notify(self, changes):
+        if self.on_change is None:
+            return
+        for change in changes:
+            try:
+                self.on_change(change)
+            except Exception as e:
+                logger.error(f"Error handling ADB device change: {str(e)}")
+
+    def devices(self):
+        """Current view of all known devices"""
+        with self._lock:
+            return [dict(state) for state in self._devices.values()]
+
+    def apply_listing(self, raw):
+        """Record a device listing from the adb server; devices missing from it are disconnected"""
+        now = time.time()
+        attached = {device['device_id']: device['status'] for device in parse_devices(raw)}
+        changes = []
+        with self._lock:
+            for serial, status in attached.items():
+                state = self._state(serial)
+                state['last_seen'] = now
+                self._set_status(state, status, changes)
+            for serial, state in self._devices.items():
+                if serial not in attached:
+                    self._set_status(state, 'disconnected', changes)
+            self.raw_listing = raw
+            self.refreshed_at = now
+        self._notify(changes)
+        return changes
+
+    def refresh(self):
+        """Ask the adb server for attached devices, returns its raw listing"""
+        raw = self.client.devices()
+        self.apply_listing(raw)
+        return raw
+
+    def connect(self, serial):
+        """Connect a network device and keep it connected from now on"""
+        try:
+            message = self.client.connect(serial)
+        except Exception as e:
+            self._record_failure(serial, e)
+            raise
+        self._record_success(serial, keep_connected=True)
+        return message
+
+    def shell(self, serial, args, timeout=None):
+        """Run a shell command on a device, connecting it first if needed"""
+        with self._lock:
+            status = self._devices.get(serial, {}).get('status')
+        if status != 'device' and ':' in serial:
+            self.connect(serial)
+
+        try:
+            output = self.client.shell(serial, shell_command(args), timeout)
+        except Exception as e:
+            self._record_failure(serial, e)
+            raise
+        self._record_success(serial)
+        return output
+
+    def _record_success(self, serial, keep_connected=False):
+        changes = []
+        with self._lock:
+            if keep_connected:
+                self._wanted.add(serial)
+            state = self._state(serial)
+            state.update(last_seen=time.time(), last_error=None, failures=0)
+            self._set_status(state, 'device', changes)
+        self._notify(changes)
+
+    def _record_failure(self, serial, error):
+        changes = []
+        with self._lock:
+            state = self._state(serial)
+            state['last_error'] = str(error)
+            state['failures'] += 1
+            if state['status'] == 'device':
+                self._set_status(state, 'offline', changes)
+        self._notify(changes)
+
+    def health_check(self):
+        """Start the adb server if needed, refresh device states and reconnect network devices that dropped"""
+        try:
+            self.client.ensure_server()
+            self.refresh()
+        except Exception as e:
+            logger.error(f"ADB health check failed: {str(e)}")
+            return
+
+        with self._lock:
+            dropped = [serial for serial in self._wanted if self._devices.get(serial, {}).get('status') != 'device']
+        for serial in dropped:
+            try:
+                self.connect(serial)
+                logger.info(f"Reconnected ADB device {serial}")
+            except Exception as e:
+                logger.warning(f"Reconnecting ADB device {serial} failed: {str(e)}")
+
+    def run(self, sleep=time.sleep):
+        """Health check loop, run as a background task"""
+        while self.running:
+            self.health_check()
+            sleep(self.health_interval)
+
+    def track(self, sleep=time.sleep):
+        """Follow attach/detach notifications from the adb server, run as a background task
+
+        The health check loop keeps the inventory current while tracking is unavailable
+        """
+        while self.running:
+            try:
+                for raw in self.client.track_devices():
+                    if not self.running:
+                        break
+                    if raw is not None:
+                        self.tracking = True
+                        self.apply_listing(raw)
+            except Exception as e:
+                logger.warning(f"ADB device tracking interrupted: {str(e)}")
+            self.tracking = False
+            if self.running:
+                sleep(self.health_interval)
+
+    def start(self, start_background_task, sleep=time.sleep):
+        if not self.running:
+            self.running = True
+            start_background_task(self.run, sleep)
+            start_background_task(self.track, sleep)
+            logger.info("ADB device manager started")
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        with self._lock:
+            statuses = [state['status'] for state in self._devices.values()]
+        return {
+            'devices': len(statuses),
+            'online': statuses.count('device'),
+            'tracking': self.tracking,
+            'refreshed_at': self.refreshed_at
+        }
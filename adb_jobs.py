@@ -0,0 +1,132 @@
+"""
+Fleet-wide ADB command dispatch
+A job sends the same shell command to many devices over a bounded worker pool and records per-device progress
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def load_device_groups(value):
+    """Device groups from a JSON object {"group": ["ip", ...]} given inline or as a file path"""
+    if not value:
+        return {}
+    if os.path.isfile(value):
+        with open(value) as f:
+            groups = json.load(f)
+    else:
+        groups = json.loads(value)
+    if not isinstance(groups, dict) or not all(isinstance(devices, list) for devices in groups.values()):
+        raise ValueError('ADB device groups must map group names to lists of devices')
+    return groups
+
+
+class AdbJobRunner:
+    """Runs fleet jobs on a shared pool and keeps the most recent jobs for status queries"""
+
+    def __init__(self, manager, emit=None, max_workers=32, retries=2, retry_delay=1, history=100, sleep=time.sleep):
+        self.manager = manager
+        self.emit = emit
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.history = history
+        self.sleep = sleep
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='adb-job')
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def submit(self, serials, shell_args, timeout=None, **details):
+        """Queue one shell command for every device and return the job right away"""
+        job_id = uuid.uuid4().hex
+        job = {
+            'job_id': job_id,
+            'status': 'running' if serials else 'completed',
+            'created_at': time.time(),
+            'finished_at': None if serials else time.time(),
+            'command': list(shell_args),
+            'total': len(serials),
+            'succeeded': 0,
+            'failed': 0,
+            'devices': {
+                serial: {'device_id': serial, 'status': 'pending', 'attempts': 0, 'output': None, 'error': None}
+                for serial in serials
+            }
+        }
+        job.update(details)
+
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.history:
+                self._jobs.popitem(last=False)
+
+        for serial in job['devices']:
+            self._executor.submit(self._run_device, job, serial, shell_args, timeout)
+        return self.get(job_id)
+
+    def get(self, job_id):
+        """Copy of a job, or None if it is unknown or has aged out"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return dict(job, devices=[dict(device) for device in job['devices'].values()])
+
+    def jobs(self):
+        """Summaries of the retained jobs, newest first"""
+        with self._lock:
+            return [
+                {key: value for key, value in job.items() if key != 'devices'}
+                for job in reversed(self._jobs.values())
+            ]
+
+    def _run_device(self, job, serial, shell_args, timeout):
+        for attempt in range(1, self.retries + 2):
+            self._update(job, serial, status='running' if attempt == 1 else 'retrying', attempts=attempt)
+            try:
+                output = self.manager.shell(serial, shell_args, timeout=timeout)
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+                logger.warning(f"ADB job {job['job_id'][:8]} attempt {attempt} on {serial} failed: {error}")
+                if attempt <= self.retries:
+                    self._update(job, serial, error=error)
+                    self.sleep(self.retry_delay * 2 ** (attempt - 1))
+                    continue
+                self._update(job, serial, status='failed', error=error)
+                return
+            self._update(job, serial, status='succeeded', output=output, error=None)
+            return
+
+    def _update(self, job, serial, **changes):
+        with self._lock:
+            device = job['devices'][serial]
+            device.update(changes)
+            if changes.get('status') in ('succeeded', 'failed'):
+                job[changes['status']] += 1
+                if job['succeeded'] + job['failed'] == job['total']:
+                    job['status'] = 'completed' if not job['failed'] else 'completed_with_errors'
+                    job['finished_at'] = time.time()
+            progress = {
+                'job_id': job['job_id'],
+                'job_status': job['status'],
+                'device': dict(device),
+                'total': job['total'],
+                'succeeded': job['succeeded'],
+                'failed': job['failed']
+            }
+
+        if self.emit is not None:
+            try:
+                self.emit(progress)
+            except Exception as e:
+                logger.error(f"Error emitting ADB job progress: {str(e)}")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark for the FIDS API REST and websocket paths
+Seeds a throwaway SQLite database with N flights, drives the API in-process and reports
+latency percentiles, throughput and end-to-end update propagation delay
+
+Usage:
+    python benchmark.py --flights 5000 --requests 2000 --concurrency 16 --clients 50
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+def configure_environment(work_dir, args):
+    """Point the app at a local SQLite stand-in before main.py is imported"""
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(work_dir, 'fids_benchmark.db')}"
+    os.environ['CDC_WATERMARK_FILE'] = os.path.join(work_dir, 'cdc_watermark.json')
+    os.environ['BOARD_SNAPSHOT_FILE'] = os.path.join(work_dir, 'board_snapshot.json')
+    os.environ['CDC_POLL_INTERVAL'] = str(args.poll_interval)
+    os.environ['SOCKETIO_ASYNC_MODE'] = 'threading'
+    for name in ('PUBSUB_URL', 'RAILWAY_ENVIRONMENT', 'VERCEL_ENV'):
+        os.environ.pop(name, None)
+
+
+def seed_flights(main, count):
+    """Create the schema and insert count flights"""
+    from sqlalchemy import insert
+    from schedule import schedule_columns
+
+    main.init_database()
+    airlines = ['Emirates', 'Qatar Airways', 'Lufthansa', 'IndiGo', 'British Airways', 'Air India']
+    destinations = [('Dubai', 'DXB'), ('Doha', 'DOH'), ('Frankfurt', 'FRA'), ('Delhi', 'DEL'), ('London', 'LHR'), ('Mumbai', 'BOM')]
+    now = datetime.utcnow()
+
+    rows = []
+    for flight_id in range(1, count + 1):
+        airline = airlines[flight_id % len(airlines)]
+        destination, code = destinations[flight_id % len(destinations)]
+        scheduled = f"{(flight_id // 60) % 24:02d}:{flight_id % 60:02d}"
+        rows.append({
+            'id': flight_id,
+            'airline': airline,
+            'logo': f"https://fids-two.vercel.app/logos/{airline.lower().replace(' ', '-')}.png",
+            'time': scheduled,
+            'destination': destination,
+            'destinationCode': code,
+            'flight': f"{airline[:2].upper()}{100 + flight_id}",
+            'std': scheduled,
+            'etd': scheduled,
+            'gate': f"{'ABC'[flight_id % 3]}{flight_id % 20 + 1}",
+            'status': 'On Time',
+            'statusClass': 'ontime',
+            **schedule_columns(scheduled, scheduled, now.date()),
+            'last_updated': now
+        })
+
+    session = main.Session()
+    try:
+        for start in range(0, len(rows), 1000):
+            session.execute(insert(main.Flight), rows[start:start + 1000])
+        session.commit()
+    finally:
+        session.close()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(name, latencies, elapsed, errors=0):
+    """Latency percentiles (ms) and throughput for one scenario"""
+    if not latencies:
+        return {'scenario': name, 'count': 0, 'errors': errors}
+    return {
+        'scenario': name,
+        'count': len(latencies),
+        'errors': errors,
+        'throughput_per_s': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(max(latencies) * 1000, 3)
+    }
+
+
+def run_concurrently(main, total, concurrency, make_request):
+    """Issue total requests from concurrency threads, each with its own test client"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    per_worker = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+
+    def worker(count):
+        client = main.app.test_client()
+        local = []
+        failed = 0
+        for _ in range(count):
+            start = time.perf_counter()
+            response = make_request(client)
+            local.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, per_worker))
+    return latencies, time.perf_counter() - started, errors[0]
+
+
+def bench_flight_pages(main, args):
+    """GET /api/flights in page mode, cursor mode and with ETag revalidation"""
+    total_pages = max(1, math.ceil(args.flights / args.per_page))
+    results = []
+
+    def page_request(client):
+        page = random.randint(1, total_pages)
+        return client.get(f"/api/flights?page={page}&per_page={args.per_page}")
+    results.append(summarize('GET /api/flights (page)', *run_concurrently(main, args.requests, args.concurrency, page_request)))
+
+    def cursor_request(client):
+        after_id = random.randint(0, args.flights)
+        return client.get(f"/api/flights?after_id={after_id}&per_page={args.per_page}&include_total=false")
+    results.append(summarize('GET /api/flights (cursor)', *run_concurrently(main, args.requests, args.concurrency, cursor_request)))
+
+    # Clients that already hold the current version of the page
+    etags = {}
+    warm = main.app.test_client()
+    for page in range(1, min(total_pages, 20) + 1):
+        etags[page] = warm.get(f"/api/flights?page={page}&per_page={args.per_page}").headers.get('ETag')
+
+    def revalidate_request(client):
+        page = random.choice(list(etags))
+        return client.get(f"/api/flights?page={page}&per_page={args.per_page}", headers={'If-None-Match': etags[page]})
+    results.append(summarize('GET /api/flights (If-None-Match)', *run_concurrently(main, args.requests, args.concurrency, revalidate_request)))
+
+    return results
+
+
+def bench_updates(main, args):
+    """PUT /api/update-flight with random ETD changes"""
+    def update_request(client):
+        flight_id = random.randint(1, args.flights)
+        return client.put('/api/update-flight', json={'id': flight_id, 'etd': f"{random.randint(0, 23):02d}:{random.randint(0, 59):02d}"})
+    return summarize('PUT /api/update-flight', *run_concurrently(main, args.updates, min(args.concurrency, 4), update_request))
+
+
+def bench_propagation(main, args):
+    """Delay from an update's commit to its flight_updates event on M socket clients"""
+    clients = [main.socketio.test_client(main.app) for _ in range(args.clients)]
+    for client in clients:
+        client.get_received()
+
+    http = main.app.test_client()
+    delays = []
+    missed = 0
+    started = time.perf_counter()
+
+    for _ in range(args.propagation_updates):
+        flight_id = random.randint(1, args.flights)
+        sent_at = time.perf_counter()
+        http.put('/api/update-flight', json={'id': flight_id, 'status': f"Gate {random.randint(1, 99)}"})
+
+        pending = set(range(len(clients)))
+        deadline = sent_at + args.propagation_timeout
+        while pending and time.perf_counter() < deadline:
+            for index in list(pending):
+                for event in clients[index].get_received():
+                    if event['name'] != 'flight_updates':
+                        continue
+                    payload = event['args'][0]
+                    ids = [delta['id'] for delta in payload.get('deltas', [])] + [flight['id'] for flight in payload.get('flights', [])]
+                    if flight_id in ids:
+                        delays.append(time.perf_counter() - sent_at)
+                        pending.discard(index)
+                        break
+            time.sleep(0.001)
+        missed += len(pending)
+
+    elapsed = time.perf_counter() - started
+    for client in clients:
+        client.disconnect()
+
+    result = summarize(f"update -> flight_updates ({args.clients} clients)", delays, elapsed, missed)
+    result['throughput_per_s'] = round(len(delays) / elapsed, 1) if elapsed else None
+    return result
+
+
+def bench_wire_formats(main, args):
+    """Size of a whole-board flight_data payload and its client parse/decode time in each wire encoding
+
+    parse is the JSON or MessagePack parse alone (clients can render straight from the table
+    rows), decode also rebuilds the row dicts
+    """
+    from wire_format import available_encodings, decode_payload, encode_payload, msgpack
+
+    main.refresh_flight_cache()
+    board = main.flight_cache.get_page(1, args.flights)
+    results = []
+    for encoding in available_encodings():
+        encoded = encode_payload(board, encoding, 'flights')
+        # Text encodings go over the wire as JSON
+        wire = encoded if isinstance(encoded, bytes) else json.dumps(encoded)
+        parse = (lambda: msgpack.unpackb(wire, raw=False)) if isinstance(wire, bytes) else (lambda: json.loads(wire))
+        parse_timings = []
+        decode_timings = []
+        for _ in range(args.decode_rounds):
+            start = time.perf_counter()
+            data = parse()
+            parsed = time.perf_counter()
+            decode_payload(data, 'flights')
+            parse_timings.append(parsed - start)
+            decode_timings.append(time.perf_counter() - start)
+        results.append({
+            'encoding': encoding,
+            'flights': len(board['flights']),
+            'bytes': len(wire),
+            'parse_p50_ms': round(percentile(parse_timings, 50) * 1000, 3),
+            'decode_p50_ms': round(percentile(decode_timings, 50) * 1000, 3)
+        })
+    return results
+
+
+def print_report(results):
+    columns = ['scenario', 'count', 'errors', 'throughput_per_s', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']
+    widths = [max(len(column), *(len(str(result.get(column, '-'))) for result in results)) for column in columns]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    print('  '.join('-' * width for width in widths))
+    for result in results:
+        print('  '.join(str(result.get(column, '-')).ljust(width) for column, width in zip(columns, widths)))
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description='Benchmark the FIDS API against a local SQLite stand-in')
+    parser.add_argument('--flights', type=int, default=2000, help='flights to seed')
+    parser.add_argument('--requests', type=int, default=2000, help='GET requests per read scenario')
+    parser.add_argument('--updates', type=int, default=200, help='PUT /api/update-flight requests')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent HTTP clients')
+    parser.add_argument('--per-page', type=int, default=10, help='page size for read scenarios')
+    parser.add_argument('--clients', type=int, default=20, help='concurrent Socket.IO clients')
+    parser.add_argument('--propagation-updates', type=int, default=20, help='updates timed end to end')
+    parser.add_argument('--propagation-timeout', type=float, default=10, help='seconds to wait for each update to arrive')
+    parser.add_argument('--poll-interval', type=float, default=2, help='CDC_POLL_INTERVAL for the run')
+    parser.add_argument('--decode-rounds', type=int, default=20, help='decodes timed per wire encoding')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--json', dest='json_path', help='also write the results to this JSON file')
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    work_dir = tempfile.mkdtemp(prefix='fids-benchmark-')
+    configure_environment(work_dir, args)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    try:
+        import main as fids
+
+        print(f"🔄 Seeding {args.flights} flights into {os.environ['DATABASE_URL']}...")
+        seed_flights(fids, args.flights)
+        fids.start_cdc_monitoring()
+        time.sleep(0.5)
+
+        print("🏁 Running benchmark...")
+        results = bench_flight_pages(fids, args)
+        results.append(bench_updates(fids, args))
+        results.append(bench_propagation(fids, args))
+        fids.stop_cdc_monitoring()
+        wire_formats = bench_wire_formats(fids, args)
+
+        print()
+        print_report(results)
+        print()
+        print(f"📊 Flight cache: {fids.flight_cache.stats()}")
+        for result in wire_formats:
+            print(f"📦 flight_data as {result['encoding']}: {result['bytes']} bytes for {result['flights']} flights, "
+                  f"parsed in {result['parse_p50_ms']} ms, decoded to rows in {result['decode_p50_ms']} ms (p50)")
+
+        if args.json_path:
+            with open(args.json_path, 'w') as f:
+                json.dump({'parameters': vars(args), 'results': results, 'wire_formats': wire_formats}, f, indent=2)
+            print(f"✅ Results written to {args.json_path}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run_benchmark()
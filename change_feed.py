@@ -0,0 +1,272 @@
+"""
+Incremental change feed for the flights table
+Each source keeps a persistent high-water mark so every row version is delivered once
+"""
+
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import BigInteger, Integer, String, and_, or_, text
+
+logger = logging.getLogger(__name__)
+
+
+class WatermarkStore:
+    """Persists the change feed high-water mark to a small JSON file"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self, source_name):
+        """Return the saved watermark for this source, or None"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable CDC watermark file {self.path}: {str(e)}")
+            return None
+
+        if data.get('source') != source_name:
+            return None
+        return data
+
+    def save(self, source_name, watermark):
+        """Atomically replace the saved watermark"""
+        data = dict(watermark, source=source_name)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+
+class ChangeBatch:
+    """Rows changed since the last acknowledged watermark"""
+
+    def __init__(self, flights=None, deleted_ids=None, watermark=None, has_more=False, resync=False):
+        self.flights = flights or []
+        self.deleted_ids = deleted_ids or []
+        self.watermark = watermark
+        self.has_more = has_more
+        self.resync = resync  # the feed lost its position, reload the whole board
+
+    def __bool__(self):
+        return bool(self.flights or self.deleted_ids)
+
+
+class TimestampChangeSource:
+    """Change feed over the last_updated column, ordered by (last_updated, id)
+
+    Rows are selected relative to the stored watermark, never the app server clock.
+    Rows that commit late with a timestamp just behind the watermark are still picked
+    up through a short overlap window, and versions already delivered are skipped.
+    Works on SQL Server and on a local SQLite stand-in.
+    """
+
+    name = 'timestamp'
+
+    def __init__(self, flight_model, store, batch_size=500, overlap_seconds=5):
+        self.model = flight_model
+        self.store = store
+        self.batch_size = batch_size
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.resume()
+
+    def resume(self):
+        """Continue from the stored watermark on the next poll, e.g. after another node polled as leader"""
+        self.watermark = None  # (last_updated, id)
+        self._delivered = {}  # id -> last_updated of versions inside the overlap window
+        self._resumed = False
+        self._loaded = False
+
+    def _load(self):
+        """Read the stored watermark; done on poll so a store that is down fails the poll, not startup"""
+        saved = self.store.load(self.name)
+        if saved:
+            self.watermark = (datetime.fromisoformat(saved['last_updated']), saved['id'])
+            logger.info(f"CDC resuming from watermark {saved['last_updated']} / id {saved['id']}")
+        self._loaded = True
+
+    def _start_position(self, session):
+        """Start at the newest existing row so the first poll does not replay the table"""
+        Flight = self.model
+        latest = session.query(Flight.last_updated, Flight.id).filter(
+            Flight.last_updated.isnot(None)
+        ).order_by(Flight.last_updated.desc(), Flight.id.desc()).first()
+        return (latest[0], latest[1]) if latest else (datetime(1970, 1, 1), 0)
+
+    def poll(self, session):
+        """Fetch row versions newer than the watermark"""
+        Flight = self.model
+        if not self._loaded:
+            self._load()
+        if self.watermark is None:
+            self.watermark = self._start_position(session)
+            self.store.save(self.name, self._serialize(self.watermark))
+
+        wm_time, wm_id = self.watermark
+
+        # Rows strictly after the watermark, in feed order
+        rows = session.query(Flight).filter(
+            or_(
+                Flight.last_updated > wm_time,
+                and_(Flight.last_updated == wm_time, Flight.id > wm_id)
+            )
+        ).order_by(Flight.last_updated, Flight.id).limit(self.batch_size).all()
+        has_more = len(rows) == self.batch_size
+
+        # Late commits that landed just behind the watermark
+        late_rows = session.query(Flight).filter(
+            Flight.last_updated >= wm_time - self.overlap,
+            or_(
+                Flight.last_updated < wm_time,
+                and_(Flight.last_updated == wm_time, Flight.id <= wm_id)
+            )
+        ).all()
+
+        if not self._resumed:
+            # After a restart, rows behind the watermark were delivered by the previous run
+            for flight in late_rows:
+                self._delivered[flight.id] = flight.last_updated
+            late_rows = []
+            self._resumed = True
+
+        late_rows = [flight for flight in late_rows if self._delivered.get(flight.id) != flight.last_updated]
+
+        watermark = (rows[-1].last_updated, rows[-1].id) if rows else self.watermark
+        return ChangeBatch(flights=late_rows + rows, watermark=watermark, has_more=has_more)
+
+    def ack(self, batch):
+        """Advance the watermark once the batch has been broadcast"""
+        for flight in batch.flights:
+            self._delivered[flight.id] = flight.last_updated
+
+        if batch.watermark != self.watermark:
+            self.watermark = batch.watermark
+            self.store.save(self.name, self._serialize(self.watermark))
+
+        # Forget versions that have fallen out of the overlap window
+        horizon = self.watermark[0] - self.overlap
+        self._delivered = {
+            flight_id: last_updated for flight_id, last_updated in self._delivered.items()
+            if last_updated >= horizon
+        }
+
+    @staticmethod
+    def _serialize(watermark):
+        return {'last_updated': watermark[0].isoformat(), 'id': watermark[1]}
+
+
+class ChangeTrackingSource:
+    """Change feed over SQL Server Change Tracking
+
+    Requires change tracking on the database and table:
+        ALTER DATABASE <db> SET CHANGE_TRACKING = ON (CHANGE_RETENTION = 2 DAYS, AUTO_CLEANUP = ON)
+        ALTER TABLE dbo.flights ENABLE CHANGE_TRACKING
+    """
+
+    name = 'change_tracking'
+
+    def __init__(self, flight_model, store, batch_size=500, table_name='dbo.flights'):
+        self.model = flight_model
+        self.store = store
+        self.batch_size = batch_size
+        self.table_name = table_name
+        self.resume()
+
+    def resume(self):
+        """Continue from the stored version on the next poll, e.g. after another node polled as leader"""
+        self.version = None
+        self._loaded = False
+
+    def _load(self):
+        saved = self.store.load(self.name)
+        if saved:
+            self.version = saved['version']
+            logger.info(f"CDC resuming from change tracking version {self.version}")
+        self._loaded = True
+
+    def poll(self, session):
+        """Fetch rows changed since the last synchronized version"""
+        Flight = self.model
+        if not self._loaded:
+            self._load()
+        if self.version is None:
+            self.version = session.execute(text("SELECT CHANGE_TRACKING_CURRENT_VERSION()")).scalar() or 0
+            self.store.save(self.name, {'version': self.version})
+
+        # Changes older than the retention period are gone, the board must be reloaded
+        min_valid = session.execute(
+            text("SELECT CHANGE_TRACKING_MIN_VALID_VERSION(OBJECT_ID(:table_name))"),
+            {'table_name': self.table_name}
+        ).scalar()
+        if min_valid is not None and self.version < min_valid:
+            logger.warning(f"CDC version {self.version} is older than retention ({min_valid}), resyncing")
+            current = session.execute(text("SELECT CHANGE_TRACKING_CURRENT_VERSION()")).scalar() or 0
+            return ChangeBatch(watermark=current, resync=True)
+
+        # CHANGETABLE returns the net change per row, tagged with the version of its last change.
+        # A batch ends on a version boundary because rows committed together share a version.
+        limit = f"TOP ({int(self.batch_size) + 1}) " if self.batch_size else ""
+        versions = session.execute(
+            text(
+                f"SELECT {limit}ct.SYS_CHANGE_VERSION "
+                f"FROM CHANGETABLE(CHANGES {self.table_name}, :version) AS ct "
+                f"ORDER BY ct.SYS_CHANGE_VERSION"
+            ),
+            {'version': self.version}
+        ).scalars().all()
+
+        if not versions:
+            return ChangeBatch(watermark=self.version)
+
+        has_more = bool(self.batch_size) and len(versions) > self.batch_size
+        if has_more:
+            next_version = versions[self.batch_size]
+            earlier = [version for version in versions[:self.batch_size] if version < next_version]
+            # A single version larger than the batch is read whole
+            upto = earlier[-1] if earlier else next_version
+        else:
+            upto = versions[-1]
+
+        # Join instead of an IN list, which would exceed SQL Server's 2100 parameters on large backlogs
+        changes = text(
+            f"SELECT ct.id, ct.SYS_CHANGE_VERSION, ct.SYS_CHANGE_OPERATION "
+            f"FROM CHANGETABLE(CHANGES {self.table_name}, :version) AS ct "
+            f"WHERE ct.SYS_CHANGE_VERSION <= :upto"
+        ).bindparams(version=self.version, upto=upto).columns(
+            id=Integer, SYS_CHANGE_VERSION=BigInteger, SYS_CHANGE_OPERATION=String
+        ).subquery('changes')
+        rows = session.query(changes.c.id, changes.c.SYS_CHANGE_OPERATION, Flight).outerjoin(
+            Flight, Flight.id == changes.c.id
+        ).order_by(changes.c.SYS_CHANGE_VERSION, changes.c.id).all()
+
+        return ChangeBatch(
+            # A row changed and then deleted after the version read arrives as a delete next time
+            flights=[flight for _, operation, flight in rows if operation != 'D' and flight is not None],
+            deleted_ids=[flight_id for flight_id, operation, _ in rows if operation == 'D'],
+            watermark=upto,
+            has_more=has_more
+        )
+
+    def ack(self, batch):
+        """Advance the synchronized version once the batch has been broadcast"""
+        if batch.watermark != self.version:
+            self.version = batch.watermark
+            self.store.save(self.name, {'version': self.version})
+
+
+CHANGE_SOURCES = {
+    TimestampChangeSource.name: TimestampChangeSource,
+    ChangeTrackingSource.name: ChangeTrackingSource
+}
+
+
+def create_change_source(name, flight_model, store, batch_size=500):
+    """Build the configured change source"""
+    if name not in CHANGE_SOURCES:
+        raise ValueError(f"Unknown CDC source '{name}'. Expected one of: {', '.join(CHANGE_SOURCES)}")
+    return CHANGE_SOURCES[name](flight_model, store, batch_size=batch_size)
@@ -0,0 +1,70 @@
+"""
+Negotiated response compression
+Picks brotli or gzip from Accept-Encoding and skips bodies too small to be worth it
+"""
+
+import gzip
+
+try:
+    import brotli  # optional dependency, only needed for the br encoding
+except ImportError:
+    brotli = None
+
+# Preferred first when the client accepts both equally
+CONTENT_ENCODINGS = ('br', 'gzip')
+
+# Text responses worth compressing; images and archives are already compressed
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html')
+
+
+def available_encodings():
+    return CONTENT_ENCODINGS if brotli is not None else ('gzip',)
+
+
+class ResponseCompressor:
+    """Compresses response bodies at the configured levels
+
+    min_size is the smallest body compressed, gzip_level is 1-9 and brotli_quality 0-11
+    (lower is faster, higher is smaller)
+    """
+
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=5, on_compressed=None):
+        if not 1 <= gzip_level <= 9:
+            raise ValueError('gzip_level must be between 1 and 9')
+        if not 0 <= brotli_quality <= 11:
+            raise ValueError('brotli_quality must be between 0 and 11')
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.on_compressed = on_compressed
+
+    def negotiate(self, accept_encodings, size):
+        """Encoding to send a body of size bytes in, or None to send it as is
+
+        accept_encodings is the request's parsed Accept-Encoding header
+        """
+        if size < self.min_size:
+            return None
+        return accept_encodings.best_match(available_encodings())
+
+    def compress(self, body, encoding):
+        if encoding == 'br':
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+        elif encoding == 'gzip':
+            # Fixed mtime, so the same body always compresses to the same bytes
+            compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        else:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+        if self.on_compressed is not None:
+            self.on_compressed(encoding, len(body), len(compressed))
+        return compressed
+
+    def compressible(self, response):
+        """Whether a finished response can be compressed in place"""
+        return (
+            response.status_code == 200
+            and not response.direct_passthrough
+            and not response.is_streamed
+            and 'Content-Encoding' not in response.headers
+            and response.mimetype in COMPRESSIBLE_MIMETYPES
+        )
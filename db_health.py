@@ -0,0 +1,103 @@
+"""
+Database reachability tracking
+Requests fail fast while a database is down; reconnect attempts back off exponentially
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseUnavailableError(Exception):
+    """The database could not be reached (or is not configured), the request was not attempted"""
+
+
+class DatabaseHealth:
+    """Circuit breaker around one database connection, probed by a background task or on demand"""
+
+    def __init__(self, name, connect, initial_backoff=1, max_backoff=60):
+        self.name = name
+        self.connect = connect  # returns True once the database answered
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.available = False
+        self.last_error = None
+        self.unavailable_since = None
+        self.failed_attempts = 0
+        self.running = False
+        self._backoff = initial_backoff
+        self._next_attempt = 0
+        self._lock = threading.Lock()
+
+    def mark_available(self):
+        if not self.available:
+            if self.unavailable_since is not None:
+                logger.info(f"✅ {self.name} database reachable again after {time.time() - self.unavailable_since:.1f}s")
+            self.available = True
+        self.last_error = None
+        self.unavailable_since = None
+        self.failed_attempts = 0
+        self._backoff = self.initial_backoff
+
+    def mark_unavailable(self, error):
+        """Open the circuit after a connection error; the next probe is due after the backoff"""
+        if self.available or self.unavailable_since is None:
+            logger.error(f"❌ {self.name} database unavailable: {str(error)}")
+            self.unavailable_since = time.time()
+            self._next_attempt = time.monotonic() + self._backoff
+        self.available = False
+        self.last_error = str(error)
+
+    def check(self):
+        """Whether the database can be used now, probing it if a reconnect attempt is due"""
+        if self.available:
+            return True
+        if time.monotonic() < self._next_attempt:
+            return False
+        # One caller probes, the others keep failing fast
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if self.available:
+                return True
+            try:
+                connected = self.connect()
+            except Exception as e:
+                connected = False
+                self.last_error = str(e)
+            if connected:
+                self.mark_available()
+                return True
+            if self.unavailable_since is None:
+                self.unavailable_since = time.time()
+            self.failed_attempts += 1
+            self._next_attempt = time.monotonic() + self._backoff
+            logger.warning(f"{self.name} database reconnect attempt {self.failed_attempts} failed, next in {self._backoff:g}s")
+            self._backoff = min(self._backoff * 2, self.max_backoff)
+            return False
+        finally:
+            self._lock.release()
+
+    def run(self, interval, sleep=time.sleep):
+        """Reconnect loop, run as a background task so requests rarely pay for a probe"""
+        while self.running:
+            self.check()
+            sleep(interval)
+
+    def start(self, start_background_task, interval=1, sleep=time.sleep):
+        if not self.running:
+            self.running = True
+            start_background_task(self.run, interval, sleep)
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        return {
+            'available': self.available,
+            'unavailable_since': self.unavailable_since,
+            'failed_attempts': self.failed_attempts,
+            'last_error': self.last_error
+        }
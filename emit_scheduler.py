@@ -0,0 +1,246 @@
+"""
+Emit scheduler for flight_updates
+Merges changes per flight within a short window, caps messages per client per second and
+keeps stalled websockets from accumulating an unbounded backlog
+"""
+
+import logging
+import threading
+import time
+
+from flight_cache import merge_delta
+
+logger = logging.getLogger(__name__)
+
+SLOW_CLIENT_ACTIONS = ('resync', 'drop')
+
+
+class _ClientState:
+    __slots__ = ('tokens', 'updated_at', 'missed', 'slow')
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated_at = now
+        self.missed = set()  # flight ids held back from a rate-limited client
+        self.slow = False
+
+
+def combine_deltas(first, second):
+    """One delta for a client from the deltas two of its rooms queued for the same flight"""
+    if first is None:
+        return second
+    if second['version'] < first['version']:
+        first, second = second, first
+    if second['version'] > first['version']:
+        return merge_delta(first, second)
+    # Same version: the one that spans more versions
+    return first if first.get('since', first['version'] - 1) <= second.get('since', second['version'] - 1) else second
+
+
+class EmitScheduler:
+    """Queues room deltas and emits them from a background task every window seconds
+
+    send(room, deltas, skip_sids, generation) emits one message to a room, send_to_clients(sids, deltas,
+    generation) emits one message to each of a list of clients, members(room) lists a room's sids,
+    backlog(sid) counts packets queued for a client, catch_up(sid, flight_ids) sends current rows
+    a rate-limited client missed, resync(sid) sends a slow client a full snapshot and
+    disconnect(sid) drops it
+    """
+
+    def __init__(self, send, send_to_clients, members, backlog, catch_up, resync, disconnect, start_background_task,
+                 window=0.05, max_rate=20, max_backlog=200, slow_client_action='resync',
+                 sleep=time.sleep, on_coalesced=None, on_throttled=None, on_slow_client=None, on_flushed=None):
+        if slow_client_action not in SLOW_CLIENT_ACTIONS:
+            raise ValueError(f"slow_client_action must be one of: {', '.join(SLOW_CLIENT_ACTIONS)}")
+        self.send = send
+        self.send_to_clients = send_to_clients
+        self.members = members
+        self.backlog = backlog
+        self.catch_up = catch_up
+        self.resync = resync
+        self.disconnect = disconnect
+        self.start_background_task = start_background_task
+        self.window = window
+        self.max_rate = max_rate
+        self.max_backlog = max_backlog
+        self.slow_client_action = slow_client_action
+        self.sleep = sleep
+        self.on_coalesced = on_coalesced
+        self.on_throttled = on_throttled
+        self.on_slow_client = on_slow_client
+        self.on_flushed = on_flushed
+        self.running = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending = {}  # room -> flight id -> merged delta
+        self._generations = {}  # room -> newest board generation among its queued deltas
+        self._clients = {}  # sid -> _ClientState, for clients that were throttled or slow
+
+    def submit(self, room, deltas, generation=None):
+        """Queue deltas for a room, merged with changes to the same flights still waiting"""
+        coalesced = 0
+        with self._lock:
+            if generation is not None:
+                self._generations[room] = max(generation, self._generations.get(room, generation))
+            pending = self._pending.setdefault(room, {})
+            for delta in deltas:
+                previous = pending.get(delta['id'])
+                if previous is not None:
+                    coalesced += 1
+                pending[delta['id']] = merge_delta(previous, delta)
+        if coalesced and self.on_coalesced is not None:
+            self.on_coalesced(coalesced)
+        self.start()
+        self._wakeup.set()
+
+    def forget(self, sid):
+        """Drop the state of a disconnected client"""
+        with self._lock:
+            self._clients.pop(sid, None)
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self.running = True
+        self.start_background_task(self.run)
+
+    def stop(self):
+        self.running = False
+        self._wakeup.set()
+
+    def run(self):
+        while self.running:
+            self._wakeup.wait(timeout=1)
+            if not self.running:
+                break
+            self._wakeup.clear()
+            # Changes arriving during the window are merged into this flush
+            self.sleep(self.window)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing flight updates: {str(e)}")
+
+    def flush(self):
+        """Emit everything queued, holding back clients over their rate or with a backlog
+
+        Each client gets at most one message per flush: clients in several rooms with queued
+        changes are left out of the room messages and sent the combined deltas of their rooms
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            generations, self._generations = self._generations, {}
+        now = time.monotonic()
+        started = time.perf_counter()
+
+        members = {room: self.members(room) for room in pending}
+        client_rooms = {}
+        for room, sids in members.items():
+            for sid in sids:
+                client_rooms.setdefault(sid, []).append(room)
+
+        admitted = {}
+        throttled = 0
+        for sid, rooms in client_rooms.items():
+            flights = pending[rooms[0]] if len(rooms) == 1 else {
+                flight_id: None for room in rooms for flight_id in pending[room]
+            }
+            admitted[sid] = self._admit(sid, now, flights)
+            throttled += not admitted[sid]
+
+        for room, flights in pending.items():
+            sids = members[room]
+            skip_sids = [sid for sid in sids if not admitted[sid] or len(client_rooms[sid]) > 1]
+            if len(skip_sids) < len(sids):
+                self.send(room, list(flights.values()), skip_sids, generations.get(room))
+
+        # Clients whose rooms queued the same combined deltas share one message
+        combined = {}
+        for sid, rooms in client_rooms.items():
+            if len(rooms) < 2 or not admitted[sid]:
+                continue
+            deltas = {}
+            for room in rooms:
+                for flight_id, delta in pending[room].items():
+                    deltas[flight_id] = combine_deltas(deltas.get(flight_id), delta)
+            deltas = [deltas[flight_id] for flight_id in sorted(deltas)]
+            key = tuple((delta['id'], delta['version'], delta.get('since')) for delta in deltas)
+            generation = max((generations[room] for room in rooms if room in generations), default=None)
+            group = combined.setdefault((generation, key), (deltas, generation, []))
+            group[2].append(sid)
+        for deltas, generation, sids in combined.values():
+            self.send_to_clients(sids, deltas, generation)
+
+        if throttled and self.on_throttled is not None:
+            self.on_throttled(throttled)
+        if pending and self.on_flushed is not None:
+            self.on_flushed(time.perf_counter() - started)
+
+        self._service_held_clients(now)
+
+    def _admit(self, sid, now, flights):
+        """Whether a client gets the next room message, recording what it missed if not"""
+        with self._lock:
+            state = self._clients.get(sid)
+            if state is None:
+                state = self._clients[sid] = _ClientState(self.max_rate, now)
+        if state.slow or self._is_slow(sid, state):
+            return False
+        if self._take_token(state, now):
+            return True
+        state.missed.update(flights)
+        return False
+
+    def _take_token(self, state, now):
+        state.tokens = min(self.max_rate, state.tokens + (now - state.updated_at) * self.max_rate)
+        state.updated_at = now
+        if state.tokens < 1:
+            return False
+        state.tokens -= 1
+        return True
+
+    def _is_slow(self, sid, state):
+        if self.backlog(sid) <= self.max_backlog:
+            return False
+        if self.on_slow_client is not None:
+            self.on_slow_client(self.slow_client_action)
+        if self.slow_client_action == 'drop':
+            logger.warning(f"Disconnecting slow client {sid}: more than {self.max_backlog} packets queued")
+            self.forget(sid)
+            self.disconnect(sid)
+        else:
+            logger.warning(f"Pausing updates to slow client {sid} until its backlog drains")
+            state.slow = True
+            state.missed.clear()
+        return True
+
+    def _service_held_clients(self, now):
+        """Catch up rate-limited clients that have tokens again and resync drained slow clients"""
+        with self._lock:
+            held = [(sid, state) for sid, state in self._clients.items() if state.slow or state.missed]
+            # Clients that are neither held nor short of tokens need no state
+            for sid, state in list(self._clients.items()):
+                refilled = state.tokens + (now - state.updated_at) * self.max_rate
+                if not state.slow and not state.missed and refilled >= self.max_rate:
+                    del self._clients[sid]
+
+        for sid, state in held:
+            if state.slow:
+                if self.backlog(sid) <= self.max_backlog // 2 and self._take_token(state, now):
+                    state.slow = False
+                    self.resync(sid)
+            elif self._take_token(state, now):
+                missed, state.missed = state.missed, set()
+                self.catch_up(sid, sorted(missed))
+        if held:
+            # Come back for the rest even if no new changes arrive
+            self._wakeup.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending_rooms': len(self._pending),
+                'throttled_clients': sum(1 for state in self._clients.values() if state.missed),
+                'slow_clients': sum(1 for state in self._clients.values() if state.slow)
+            }
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+"""
+Fake adb server for local development and tests
+Speaks the adb smart-socket protocol for host:version, host:devices, host:connect,
+host:disconnect, host:track-devices and host:transport + shell, and records shell commands
+
+Usage:
+    python fake_adb_server.py --port 5037 --devices 192.168.1.100:5555,192.168.1.101:5555
+"""
+
+import argparse
+import socketserver
+import threading
+
+
+class FakeAdbServer(socketserver.ThreadingTCPServer):
+    """In-process stand-in for the adb server"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, devices=None, reachable=None, shell_delay=0):
+        super().__init__((host, port), FakeAdbHandler)
+        self.lock = threading.Lock()
+        self.devices = dict(devices or {})  # serial -> state
+        self.reachable = set(reachable if reachable is not None else self.devices)  # serials host:connect accepts
+        self.shell_delay = shell_delay
+        self.shell_commands = []  # (serial, command)
+        self.changed = threading.Condition(self.lock)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def listing(self):
+        with self.lock:
+            return ''.join(f"{serial}\t{state}\n" for serial, state in self.devices.items())
+
+    def set_device(self, serial, state=None):
+        """Attach (state) or drop (None) a device, waking track-devices listeners"""
+        with self.lock:
+            if state is None:
+                self.devices.pop(serial, None)
+            else:
+                self.devices[serial] = state
+            self.changed.notify_all()
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        with self.lock:
+            self.changed.notify_all()
+        self.shutdown()
+        self.server_close()
+
+
+class FakeAdbHandler(socketserver.BaseRequestHandler):
+
+    def _read_request(self):
+        header = self._read_exact(4)
+        if not header:
+            return None
+        return self._read_exact(int(header, 16)).decode()
+
+    def _read_exact(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                return data
+            data += chunk
+        return data
+
+    def _okay(self, payload=None):
+        self.request.sendall(b'OKAY')
+        if payload is not None:
+            data = payload.encode()
+            self.request.sendall(f"{len(data):04x}".encode() + data)
+
+    def _fail(self, message):
+        data = message.encode()
+        self.request.sendall(b'FAIL' + f"{len(data):04x}".encode() + data)
+
+    def handle(self):
+        server = self.server
+        request = self._read_request()
+        if request is None:
+            return
+
+        if request == 'host:version':
+            self._okay('0029')
+        elif request == 'host:devices':
+            self._okay(server.listing())
+        elif request.startswith('host:connect:'):
+            serial = request[len('host:connect:'):]
+            if serial in server.reachable:
+                already = server.devices.get(serial) == 'device'
+                server.set_device(serial, 'device')
+                self._okay(f"{'already connected' if already else 'connected'} to {serial}")
+            else:
+                self._okay(f"failed to connect to {serial}")
+        elif request.startswith('host:disconnect:'):
+            serial = request[len('host:disconnect:'):]
+            server.set_device(serial, None)
+            self._okay(f"disconnected {serial}")
+        elif request == 'host:track-devices':
+            self._track_devices()
+        elif request.startswith('host:transport:'):
+            self._transport(request[len('host:transport:'):])
+        else:
+            self._fail(f"unknown host service: {request}")
+
+    def _track_devices(self):
+        server = self.server
+        # Compare against the listing that was sent, or a device attached in between is never reported
+        last = server.listing()
+        self._okay(last)
+        while True:
+            with server.changed:
+                server.changed.wait(timeout=1)
+            listing = server.listing()
+            if listing == last:
+                continue
+            last = listing
+            data = listing.encode()
+            try:
+                self.request.sendall(f"{len(data):04x}".encode() + data)
+            except OSError:
+                return
+
+    def _transport(self, serial):
+        server = self.server
+        with server.lock:
+            state = server.devices.get(serial)
+        if state != 'device':
+            self._fail(f"device '{serial}' not found")
+            return
+        self._okay()
+
+        command = self._read_request() or ''
+        if not command.startswith('shell:'):
+            self._fail(f"unsupported service: {command}")
+            return
+        command = command[len('shell:'):]
+        with server.lock:
+            server.shell_commands.append((serial, command))
+        if server.shell_delay:
+            threading.Event().wait(server.shell_delay)
+        self._okay()
+        self.request.sendall(f"Starting: Intent {{ {command} }}\n".encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake adb server for local development')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5037)
+    parser.add_argument('--devices', default='', help='comma separated serials that are attached and reachable')
+    parser.add_argument('--shell-delay', type=float, default=0, help='seconds each shell command takes')
+    args = parser.parse_args()
+
+    devices = {serial: 'device' for serial in args.devices.split(',') if serial}
+    server = FakeAdbServer(args.host, args.port, devices, shell_delay=args.shell_delay)
+    print(f"🤖 Fake adb server listening on {args.host}:{server.port} with {len(devices)} devices")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
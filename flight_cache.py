@@ -0,0 +1,551 @@
+"""
+In-memory snapshot of the flights table
+Serves flight board pages and totals without a database round-trip
+"""
+
+import bisect
+from collections import deque
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+
+from schedule import parse_window
+
+# Columns with secondary indexes for filtering, and columns the board can be sorted by
+INDEXED_FIELDS = ('gate', 'destinationCode', 'airline', 'status')
+SORT_FIELDS = ('std', 'etd')
+
+# Sorting and time windows use the typed schedule columns
+SORT_COLUMNS = {'std': 'std_at', 'etd': 'etd_at'}
+
+# from/to windows select flights by estimated departure
+WINDOW_FIELD = 'etd'
+
+# Row version written on every change; ISO strings compare in time order
+ROW_VERSION_FIELD = 'last_updated'
+
+logger = logging.getLogger(__name__)
+
+
+def merge_delta(pending, delta):
+    """One delta equivalent to applying pending and then delta
+
+    A merged delta that spans several versions carries 'since', the version it applies on top of
+    """
+    if pending is None or delta.get('deleted'):
+        return delta
+    if pending.get('deleted') or delta['version'] <= pending['version']:
+        # Deleted and inserted again: the new row replaces the old one
+        return delta
+    return {
+        'id': delta['id'],
+        'version': delta['version'],
+        'since': pending.get('since', pending['version'] - 1),
+        'changes': dict(pending['changes'], **delta['changes'])
+    }
+
+
+def parse_flight_query(args):
+    """Filters, sort order and time window from request args or a socket payload, raises ValueError if invalid
+
+    Filters take one value, a comma separated list or a list; sort is 'std', 'etd' or '-etd' for descending;
+    from/to bound the estimated departure time (see schedule.parse_window)
+    """
+    filters = {}
+    for field in INDEXED_FIELDS:
+        raw = args.getlist(field) if hasattr(args, 'getlist') else args.get(field)
+        if raw is None or raw == []:
+            continue
+        if not isinstance(raw, list):
+            raw = [raw]
+        values = []
+        for item in raw:
+            values.extend(value.strip() for value in str(item).split(',') if value.strip())
+        if values:
+            filters[field] = tuple(dict.fromkeys(values))
+
+    sort = args.get('sort')
+    if sort:
+        field = sort.lstrip('-')
+        if field not in SORT_FIELDS:
+            raise ValueError(f"Invalid sort field: {sort}. Use one of {', '.join(SORT_FIELDS)}, prefixed with - for descending")
+        sort = (field, sort.startswith('-'))
+
+    window = None
+    start, end = args.get('from'), args.get('to')
+    if start or end:
+        start, end = parse_window(start, end)
+        window = (start.isoformat() if start else None, end.isoformat() if end else None)
+
+    return filters or None, sort or None, window
+
+
+class FlightBoardCache:
+    """Process-local copy of the flights table kept current by the CDC poller"""
+
+    def __init__(self, max_staleness=10, max_serialized_pages=1000, changelog_size=1000, reconcile_interval=60):
+        self.max_staleness = max_staleness
+        self.reconcile_interval = reconcile_interval
+        self.max_serialized_pages = max_serialized_pages
+        self.generation = 0
+        # Distinguishes generations of this process from those of a previous run
+        self.epoch = uuid.uuid4().hex[:8]
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._flights = {}
+        self._versions = {}
+        self._ids = []
+        self._index = {field: {} for field in INDEXED_FIELDS}  # field -> value -> set of ids
+        self._sorted = {field: [] for field in SORT_FIELDS}  # field -> sorted (value, id)
+        self._serialized = {}  # response key -> (generation, body or bodies by content encoding)
+        # Recent (generation, deltas), so reconnecting clients can catch up without a full reload
+        self._changelog = deque(maxlen=changelog_size)
+        self._loaded = False
+        self._refreshed_at = None
+        # When the whole table was last read; empty polls do not move it
+        self._loaded_at = None
+        # Wall-clock time the contents were last confirmed against the database
+        self.confirmed_at = None
+
+    def is_fresh(self):
+        """Whether the snapshot was confirmed current within the staleness bound"""
+        with self._lock:
+            if self._refreshed_at is None:
+                return False
+            return time.monotonic() - self._refreshed_at <= self.max_staleness
+
+    def reconcile_due(self):
+        """Whether the last full read of the table is older than the reconcile interval
+
+        The change feed misses deletes and rows written without last_updated, so a snapshot that
+        polls keep fresh must still be compared with the table now and then
+        """
+        with self._lock:
+            if self._loaded_at is None or not self.reconcile_interval:
+                return False
+            return time.monotonic() - self._loaded_at >= self.reconcile_interval
+
+    def load(self, flights, fresh=True, confirmed_at=None):
+        """Replace the whole snapshot with a full read of the table
+
+        fresh=False loads a last-known board (e.g. from disk) that must not count as current.
+        Returns deltas for the rows that differ from the previous snapshot (none on the first load)
+        """
+        with self._lock:
+            flights = {flight['id']: flight for flight in flights}
+
+            deltas = []
+            if self._loaded:
+                # Rows that changed while nobody was watching (a stale read, a feed resync)
+                for flight_id, flight in flights.items():
+                    current = self._flights.get(flight_id)
+                    if current == flight:
+                        continue
+                    if current is None:
+                        changes = {field: value for field, value in flight.items() if field != 'id'}
+                    else:
+                        changes = {field: value for field, value in flight.items() if current.get(field) != value}
+                    deltas.append({'id': flight_id, 'version': self._versions.get(flight_id, 0) + 1, 'changes': changes})
+                deltas.extend(
+                    {'id': flight_id, 'version': self._versions.get(flight_id, 0) + 1, 'deleted': True}
+                    for flight_id in self._ids if flight_id not in flights
+                )
+
+            self._versions = {
+                flight_id: self._versions.get(flight_id, 0) + (0 if self._flights.get(flight_id) == flight else 1)
+                for flight_id, flight in flights.items()
+            }
+            changed = flights != self._flights
+            self._flights = flights
+            self._ids = sorted(self._flights)
+            self._rebuild_indexes()
+            self._loaded = True
+            if changed:
+                self._bump()
+                if deltas:
+                    self._changelog.append((self.generation, deltas))
+                else:
+                    # First load: no client can hold an earlier version
+                    self._changelog.clear()
+            if fresh:
+                self._refreshed_at = self._loaded_at = time.monotonic()
+                self.confirmed_at = time.time()
+            else:
+                self._refreshed_at = None
+                self.confirmed_at = confirmed_at
+            return deltas
+
+    def apply_changes(self, flights):
+        """Merge changed rows into the snapshot, returns field-level deltas for them
+
+        A row version already applied (e.g. published on write, then read again by the poller)
+        or older than the snapshot's (a lagging replica) produces no delta
+        """
+        with self._lock:
+            deltas = []
+            for flight in flights:
+                flight_id = flight['id']
+                current = self._flights.get(flight_id)
+                if current == flight or self._is_older(flight, current):
+                    continue
+                if current is None:
+                    bisect.insort(self._ids, flight_id)
+                    changes = {field: value for field, value in flight.items() if field != 'id'}
+                else:
+                    changes = {field: value for field, value in flight.items() if current.get(field) != value}
+                    self._unindex(current)
+                self._index_flight(flight)
+
+                version = self._versions.get(flight_id, 0) + 1
+                self._flights[flight_id] = flight
+                self._versions[flight_id] = version
+                deltas.append({'id': flight_id, 'version': version, 'changes': changes})
+
+            if deltas:
+                self._bump()
+                self._changelog.append((self.generation, deltas))
+            self.touch()
+            return deltas
+
+    @staticmethod
+    def _is_older(flight, current):
+        if current is None or not flight.get(ROW_VERSION_FIELD) or not current.get(ROW_VERSION_FIELD):
+            return False
+        return flight[ROW_VERSION_FIELD] < current[ROW_VERSION_FIELD]
+
+    def remove(self, flight_ids):
+        """Drop deleted rows from the snapshot, returns deletion deltas for them"""
+        with self._lock:
+            deltas = []
+            for flight_id in flight_ids:
+                flight = self._flights.pop(flight_id, None)
+                if flight is None:
+                    continue
+                self._unindex(flight)
+                version = self._versions.pop(flight_id, 0) + 1
+                deltas.append({'id': flight_id, 'version': version, 'deleted': True})
+
+            if deltas:
+                removed_ids = {delta['id'] for delta in deltas}
+                self._ids = [flight_id for flight_id in self._ids if flight_id not in removed_ids]
+                self._bump()
+                self._changelog.append((self.generation, deltas))
+            return deltas
+
+    def _rebuild_indexes(self):
+        self._index = {field: {} for field in INDEXED_FIELDS}
+        for flight in self._flights.values():
+            for field in INDEXED_FIELDS:
+                self._index[field].setdefault(flight.get(field), set()).add(flight['id'])
+        self._sorted = {
+            field: sorted((self._sort_value(flight, field), flight['id']) for flight in self._flights.values())
+            for field in SORT_FIELDS
+        }
+
+    def _index_flight(self, flight):
+        for field in INDEXED_FIELDS:
+            self._index[field].setdefault(flight.get(field), set()).add(flight['id'])
+        for field in SORT_FIELDS:
+            bisect.insort(self._sorted[field], (self._sort_value(flight, field), flight['id']))
+
+    def _unindex(self, flight):
+        for field in INDEXED_FIELDS:
+            ids = self._index[field].get(flight.get(field))
+            if ids is not None:
+                ids.discard(flight['id'])
+                if not ids:
+                    del self._index[field][flight.get(field)]
+        for field in SORT_FIELDS:
+            entries = self._sorted[field]
+            position = bisect.bisect_left(entries, (self._sort_value(flight, field), flight['id']))
+            if position < len(entries) and entries[position][1] == flight['id']:
+                del entries[position]
+
+    @staticmethod
+    def _sort_value(flight, field):
+        # ISO strings order like the datetimes; rows without a typed time sort first
+        return flight.get(SORT_COLUMNS[field]) or ''
+
+    def _window(self, start, end):
+        """Ids whose estimated departure is in [start, end), in time order"""
+        entries = self._sorted[WINDOW_FIELD]
+        low = bisect.bisect_left(entries, (start or '\x00',))
+        high = bisect.bisect_left(entries, (end,)) if end else len(entries)
+        return [flight_id for _, flight_id in entries[low:high]]
+
+    def _select(self, filters=None, sort=None, window=None):
+        """Ids matching every filter (any of a field's values) and the window, in id or sort order"""
+        matches = None
+        if window:
+            in_window = self._window(*window)
+            if sort and sort[0] == WINDOW_FIELD and not filters:
+                # The range scan is already in the requested order
+                return in_window[::-1] if sort[1] else in_window
+            matches = set(in_window)
+        for field, values in (filters or {}).items():
+            ids = set()
+            for value in values:
+                ids |= self._index[field].get(value, set())
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                return []
+
+        if sort:
+            field, descending = sort
+            entries = self._sorted[field]
+            if matches is not None and len(matches) < len(entries) // 4:
+                # Few matches: sorting them is cheaper than walking the whole index
+                ordered = sorted(matches, key=lambda flight_id: (self._sort_value(self._flights[flight_id], field), flight_id))
+            else:
+                ordered = [flight_id for _, flight_id in entries if matches is None or flight_id in matches]
+            return ordered[::-1] if descending else ordered
+
+        if matches is None:
+            return self._ids
+        return sorted(matches)
+
+    def _bump(self):
+        """New data version, pre-serialized responses of the old one are dropped"""
+        self.generation += 1
+        self._serialized = {}
+
+    def changes_since(self, board_version):
+        """Deltas after a board version ('epoch-generation'), merged per flight
+
+        None when the version is from another process, or older than the changelog reaches back
+        """
+        epoch, _, generation = str(board_version).rpartition('-')
+        if epoch != self.epoch or not generation.isdigit():
+            return None
+        generation = int(generation)
+        with self._lock:
+            if generation == self.generation:
+                return []
+            if generation > self.generation or not self._changelog or self._changelog[0][0] > generation + 1:
+                return None
+            merged = {}
+            for entry_generation, deltas in self._changelog:
+                if entry_generation <= generation:
+                    continue
+                for delta in deltas:
+                    merged[delta['id']] = merge_delta(merged.get(delta['id']), delta)
+            return list(merged.values())
+
+    def touch(self):
+        """Mark the snapshot as current (a poll found nothing new)"""
+        with self._lock:
+            if self._refreshed_at is not None:
+                self._refreshed_at = time.monotonic()
+                self.confirmed_at = time.time()
+
+    def invalidate(self):
+        """Force the next read to reload from the database"""
+        with self._lock:
+            self._refreshed_at = None
+
+    def get_page(self, page, per_page, filters=None, sort=None, window=None):
+        """Return a page from memory, or None (a miss) if the snapshot is stale"""
+        with self._lock:
+            if not self.is_fresh():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self.build_page(page, per_page, filters, sort, window)
+
+    def build_page(self, page, per_page, filters=None, sort=None, window=None):
+        """Build the paginated response for the current snapshot
+
+        filters maps indexed fields to accepted values, sort is (field, descending),
+        window is (from, to) as ISO strings, either may be None
+        """
+        with self._lock:
+            ids = self._select(filters, sort, window)
+            total_flights = len(ids)
+            offset = (page - 1) * per_page
+            flight_list = [self._versioned(flight_id) for flight_id in ids[offset:offset + per_page]]
+            generation = self.generation
+
+        # Calculate pagination info
+        total_pages = math.ceil(total_flights / per_page)
+
+        result = {
+            'success': True,
+            'flights': flight_list,
+            'generation': generation,
+            'board_version': self.etag(generation),
+            'pagination': {
+                'current_page': page,
+                'per_page': per_page,
+                'total_flights': total_flights,
+                'total_pages': total_pages,
+                'has_next': page < total_pages,
+                'has_prev': page > 1,
+                'next_page': page + 1 if page < total_pages else 1,
+                'prev_page': page - 1 if page > 1 else total_pages
+            }
+        }
+        return self._describe_query(result, filters, sort, window)
+
+    @staticmethod
+    def _describe_query(result, filters, sort, window):
+        """Echo the applied filters, sort order and window in a response"""
+        if filters:
+            result['filters'] = {field: list(values) for field, values in filters.items()}
+        if sort:
+            field, descending = sort
+            result['sort'] = f"-{field}" if descending else field
+        if window:
+            result['window'] = {'field': WINDOW_FIELD, 'from': window[0], 'to': window[1]}
+        return result
+
+    def get_page_after(self, after_id, per_page, include_total=True, filters=None, window=None):
+        """Return the rows following after_id from memory, or None (a miss) if stale"""
+        with self._lock:
+            if not self.is_fresh():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self.build_page_after(after_id, per_page, include_total, filters, window)
+
+    def build_page_after(self, after_id, per_page, include_total=True, filters=None, window=None):
+        """Build a keyset page of the (matching) rows with id greater than after_id"""
+        with self._lock:
+            ids = self._select(filters, None, window)
+            start = bisect.bisect_right(ids, after_id)
+            page_ids = ids[start:start + per_page]
+            flight_list = [self._versioned(flight_id) for flight_id in page_ids]
+            has_next = start + per_page < len(ids)
+            total_flights = len(ids)
+            generation = self.generation
+
+        pagination = {
+            'mode': 'cursor',
+            'per_page': per_page,
+            'after_id': after_id,
+            'has_next': has_next,
+            'next_after_id': page_ids[-1] if has_next else None
+        }
+        if include_total:
+            pagination['total_flights'] = total_flights
+
+        result = {
+            'success': True,
+            'flights': flight_list,
+            'generation': generation,
+            'board_version': self.etag(generation),
+            'pagination': pagination
+        }
+        return self._describe_query(result, filters, None, window)
+
+    def has_data(self):
+        with self._lock:
+            return bool(self._flights)
+
+    def flights(self):
+        """All rows in id order with the generation they belong to"""
+        with self._lock:
+            return [dict(self._flights[flight_id]) for flight_id in self._ids], self.generation
+
+    def select_ids(self, filters=None, sort=None, window=None):
+        """Ids of the flights matching a board query, in id or sort order"""
+        with self._lock:
+            return list(self._select(filters, sort, window))
+
+    def select_flights(self, filters=None, offset=0, limit=None):
+        """Current rows matching the filters in id order, with their versions"""
+        with self._lock:
+            ids = self._select(filters)
+            ids = ids[offset:offset + limit] if limit is not None else ids[offset:]
+            return [self._versioned(flight_id) for flight_id in ids]
+
+    def get_flights(self, flight_ids):
+        """Current rows with their versions, skipping ids that no longer exist"""
+        with self._lock:
+            return [self._versioned(flight_id) for flight_id in flight_ids if flight_id in self._flights]
+
+    def etag(self, generation=None):
+        """Strong entity tag for a data version (the current one by default)"""
+        return f"{self.epoch}-{self.generation if generation is None else generation}"
+
+    def get_serialized(self, key):
+        """Pre-serialized response body for the current generation, with its etag"""
+        with self._lock:
+            entry = self._serialized.get(key)
+            if entry is None or entry[0] != self.generation or not self.is_fresh():
+                return None
+            self.hits += 1
+            return self.etag(entry[0]), entry[1]
+
+    def put_serialized(self, key, generation, body):
+        """Remember a response body built from the given generation"""
+        with self._lock:
+            if generation != self.generation:
+                return
+            if len(self._serialized) >= self.max_serialized_pages:
+                self._serialized = {}
+            self._serialized[key] = (generation, body)
+
+    def position(self, flight_id):
+        """Index of a flight in id order (where it is or would be inserted)"""
+        with self._lock:
+            return bisect.bisect_left(self._ids, flight_id)
+
+    def _versioned(self, flight_id):
+        return dict(self._flights[flight_id], version=self._versions[flight_id])
+
+    def stats(self):
+        """Cache size, generation and hit ratio"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            age = time.monotonic() - self._refreshed_at if self._refreshed_at is not None else None
+            return {
+                'generation': self.generation,
+                'flights': len(self._ids),
+                'fresh': self.is_fresh(),
+                'age_seconds': round(age, 3) if age is not None else None,
+                'max_staleness_seconds': self.max_staleness,
+                'last_reconcile_age_seconds': round(time.monotonic() - self._loaded_at, 3) if self._loaded_at is not None else None,
+                'reconcile_interval_seconds': self.reconcile_interval,
+                'serialized_responses': len(self._serialized),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None
+            }
+
+
+class BoardSnapshotStore:
+    """Last-known flight board persisted to a local JSON file, served while the database is down"""
+
+    def __init__(self, path):
+        self.path = path
+        self.saved_generation = None
+        self.saved_at = None
+
+    def load(self):
+        """Return {'flights', 'generation', 'saved_at'} from the file, or None"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable board snapshot {self.path}: {str(e)}")
+            return None
+        if not isinstance(data.get('flights'), list):
+            return None
+        return data
+
+    def save(self, flights, generation):
+        """Atomically replace the saved board"""
+        saved_at = time.time()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'saved_at': saved_at, 'generation': generation, 'flights': flights}, f)
+        os.replace(tmp_path, self.path)
+        self.saved_generation = generation
+        self.saved_at = saved_at
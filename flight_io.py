@@ -0,0 +1,117 @@
+"""
+Streaming flight schedule import and export
+Reads CSV or NDJSON one row at a time and writes the board back out the same way
+"""
+
+import csv
+import io
+import json
+
+FORMATS = ('csv', 'ndjson')
+
+# Content types that select a format when none is given explicitly
+CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson'
+}
+
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+def resolve_format(requested, content_type=None):
+    """'csv' or 'ndjson' from an explicit format argument or the request content type"""
+    if requested:
+        if requested not in FORMATS:
+            raise ValueError(f"Invalid format: {requested}. Use one of: {', '.join(FORMATS)}")
+        return requested
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    if mimetype in CONTENT_TYPES:
+        return CONTENT_TYPES[mimetype]
+    raise ValueError(f"Specify format ({', '.join(FORMATS)}) or a text/csv or application/x-ndjson content type")
+
+
+def iter_rows(stream, fmt):
+    """(line number, row dict or error message) for each record of a binary stream"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='' if fmt == 'csv' else None)
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            # Empty cells are absent fields, so partial updates do not blank columns
+            yield reader.line_num, {key.strip(): value for key, value in row.items() if key and value not in (None, '')}
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, f"Invalid JSON: {str(e)}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, 'Each line must be a JSON object'
+            continue
+        yield line_number, {key: value for key, value in row.items() if value is not None}
+
+
+def validate_row(row, fields, max_lengths):
+    """(flight id or None, fields to write) for an import row or update, raises ValueError if invalid"""
+    flight_id = row.get('id')
+    if flight_id is not None:
+        try:
+            flight_id = int(flight_id)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid id: {flight_id}")
+        if flight_id < 1:
+            raise ValueError(f"Invalid id: {flight_id}")
+
+    values = {}
+    for field in fields:
+        if field not in row:
+            continue
+        value = row[field]
+        if value is None:
+            raise ValueError(f"{field} cannot be null")
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise ValueError(f"{field} must be a string")
+        value = str(value).strip()
+        max_length = max_lengths.get(field)
+        if max_length and len(value) > max_length:
+            raise ValueError(f"{field} is longer than {max_length} characters")
+        values[field] = value
+    return flight_id, values
+
+
+def chunked(items, size):
+    """Lists of up to size items from any iterable, without reading ahead"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_lines(flights, fmt, fields):
+    """CSV (with a header line) or NDJSON text for an iterable of flight dicts"""
+    if fmt == 'ndjson':
+        for flight in flights:
+            yield json.dumps({field: flight.get(field) for field in fields}) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    for flight in flights:
+        writer.writerow(flight)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
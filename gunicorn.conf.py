@@ -0,0 +1,34 @@
+"""
+Gunicorn settings for the FIDS API
+The worker class follows SOCKETIO_ASYNC_MODE so gunicorn and Flask-SocketIO agree on the async model
+"""
+
+import os
+
+ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE', 'threading')
+
+WORKER_CLASSES = {
+    'gevent': 'geventwebsocket.gunicorn.workers.GeventWebSocketWorker',
+    'eventlet': 'eventlet',
+    'threading': 'gthread'
+}
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = WORKER_CLASSES[ASYNC_MODE]
+
+# Socket.IO keeps per-connection state in the process, so run one worker per container
+# unless a message queue shares it between workers
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+
+# Concurrency limit per worker: simultaneous connections (websocket clients included)
+# in the gevent/eventlet modes, request threads in threading mode
+worker_connections = int(os.getenv('WORKER_CONNECTIONS', '2000'))
+threads = int(os.getenv('WORKER_THREADS', '50'))
+
+# Long-lived websocket connections must not be mistaken for hung requests
+timeout = int(os.getenv('WORKER_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
@@ -1,19 +1,63 @@
-import subprocess
-from flask import Flask, request, jsonify
+import os
+
+# Async worker model ('threading', 'gevent' or 'eventlet'). The standard library must be
+# patched before anything else is imported, so this is read from the process environment.
+ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE', 'threading')
+
+# Bounded pool of OS threads for blocking pyodbc calls in the async modes
+DB_EXECUTOR_WORKERS = int(os.getenv('DB_EXECUTOR_WORKERS', '10'))
+
+if ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+    from gevent.threadpool import ThreadPool
+    db_threadpool = ThreadPool(DB_EXECUTOR_WORKERS)
+elif ASYNC_MODE == 'eventlet':
+    os.environ.setdefault('EVENTLET_THREADPOOL_SIZE', str(DB_EXECUTOR_WORKERS))
+    import eventlet
+    eventlet.monkey_patch()
+    from eventlet import tpool
+
+from flask import Flask, Response, request, jsonify, g
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit, disconnect
+from flask_socketio import SocketIO, emit, disconnect, join_room, leave_room
 import logging
-import math
-import os
 import pyodbc
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, text
+from sqlalchemy import create_engine, inspect, insert, Column, Integer, String, DateTime, Index, text, update
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import expression
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime, timedelta
+from sqlalchemy.exc import InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from contextlib import contextmanager
+from datetime import datetime
 import json
+import base64
+import hashlib
 import threading
 import time
+import socket
 from dotenv import load_dotenv
+from flight_cache import BoardSnapshotStore, FlightBoardCache, parse_flight_query
+from flight_io import EXPORT_MIMETYPES, chunked, export_lines, iter_rows, resolve_format, validate_row
+from schedule import schedule_columns, service_date_of
+from db_health import DatabaseHealth, DatabaseUnavailableError
+from change_feed import WatermarkStore, create_change_source
+from subscriptions import ALL_FLIGHTS_ROOM, SubscriptionIndex, room_query, rooms_from_request
+from emit_scheduler import EmitScheduler
+from compression import CONTENT_ENCODINGS, ResponseCompressor
+from wire_format import ClientEncodings, available_encodings, encode_payload, wire_room
+from pubsub import RedisWatermarkStore, create_pubsub
+from adb_client import AdbClient, AdbDeviceManager, AdbError, device_serial
+from adb_jobs import AdbJobRunner, load_device_groups
+from metrics import (
+    REGISTRY, FLIGHTS_READ_SECONDS, FLIGHT_CACHE_HITS, FLIGHT_CACHE_MISSES, FLIGHT_CACHE_HIT_RATIO,
+    CDC_POLL_SECONDS, CDC_LAG_SECONDS, BROADCAST_ROWS, EMIT_FANOUT_SECONDS, SOCKET_CONNECTIONS,
+    EMIT_COALESCED, EMIT_THROTTLED, SLOW_CLIENTS, FLIGHT_PUBLISH_FAILURES,
+    DB_POOL_CHECKOUT_SECONDS, DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, DB_POOL_SIZE, DB_POOL_TIMEOUTS, HTTP_REQUEST_SECONDS,
+    HTTP_COMPRESSIONS, HTTP_COMPRESSION_SAVED_BYTES
+)
 
 # Load environment variables
 load_dotenv()
@@ -44,6 +88,7 @@ socketio = SocketIO(
         "https://*.railway.app",
         "https://*.up.railway.app"
     ],
+    async_mode=ASYNC_MODE,
     logger=False,  # Disable verbose logging in production
     engineio_logger=False,
     transports=['websocket', 'polling']  # Enable both transports for better compatibility
@@ -65,6 +110,28 @@ DATABASE_CONFIG = {
 # SQLAlchemy setup
 Base = declarative_base()
 
+class utcnow(expression.FunctionElement):
+    """The database server's current UTC time, so row versions from every writer node share one clock"""
+    type = DateTime()
+    inherit_cache = True
+
+@compiles(utcnow)
+def compile_utcnow(element, compiler, **kw):
+    return 'CURRENT_TIMESTAMP'
+
+@compiles(utcnow, 'mssql')
+def compile_utcnow_mssql(element, compiler, **kw):
+    return 'SYSUTCDATETIME()'
+
+@compiles(utcnow, 'postgresql')
+def compile_utcnow_postgresql(element, compiler, **kw):
+    return "(CURRENT_TIMESTAMP AT TIME ZONE 'utc')"
+
+@compiles(utcnow, 'sqlite')
+def compile_utcnow_sqlite(element, compiler, **kw):
+    # CURRENT_TIMESTAMP only has whole seconds on SQLite
+    return "STRFTIME('%Y-%m-%d %H:%M:%f', 'now')"
+
 class Flight(Base):
     __tablename__ = 'flights'
     
@@ -80,199 +147,1006 @@ class Flight(Base):
     gate = Column(String(10), nullable=False)
     status = Column(String(50), nullable=False)
     statusClass = Column(String(50), nullable=False)
-    last_updated = Column(DateTime, default=datetime.utcnow)
+    # Typed copies of std/etd (airport-local time), derived from the strings on every write
+    std_at = Column(DateTime)
+    etd_at = Column(DateTime)
+    last_updated = Column(DateTime, default=utcnow())
+    
+    __table_args__ = (
+        # Board views filtered by one column and ordered by departure time
+        Index('ix_flights_gate_std_at', 'gate', 'std_at'),
+        Index('ix_flights_destination_code_std_at', 'destinationCode', 'std_at'),
+        Index('ix_flights_airline_std_at', 'airline', 'std_at'),
+        Index('ix_flights_status', 'status'),
+        # Time ordering and from/to window range scans
+        Index('ix_flights_std_at', 'std_at'),
+        Index('ix_flights_etd_at', 'etd_at'),
+        # Change feed keyset scan
+        Index('ix_flights_last_updated_id', 'last_updated', 'id'),
+    )
+
+# Columns clients may change through the update endpoints
+FLIGHT_UPDATE_FIELDS = ['airline', 'time', 'destination', 'destinationCode', 'flight', 'std', 'etd', 'gate', 'status', 'statusClass']
+
+# Connection pool sizing; a short pool_timeout turns an exhausted pool into a fast 503
+DB_POOL_OPTIONS = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+    'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+    'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '5')),
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '3600')),  # Recycle connections every hour
+    'pool_pre_ping': True  # Replace connections the server or a failover dropped
+}
+
+# Seconds clients are told to wait when the pool is exhausted
+DB_RETRY_AFTER = int(os.getenv('DB_RETRY_AFTER', '2'))
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection"""
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start)
 
 # Create database engine and session
-def create_db_engine():
+def create_db_engine(database_url=None, server=None, read_only=False):
+    """Engine for the primary (or, with read_only, a replica), None if the configuration is invalid
+
+    No connection is opened here; the first session or the background health check connects
+    """
     try:
-        # Build connection string for pyodbc with better timeout settings for Railway
-        connection_string = (
-            f"mssql+pyodbc://{DATABASE_CONFIG['username']}:{DATABASE_CONFIG['password']}"
-            f"@{DATABASE_CONFIG['server']}/{DATABASE_CONFIG['database']}"
-            f"?driver=ODBC+Driver+18+for+SQL+Server"
-            f"&TrustServerCertificate=yes"
-            f"&Connection+Timeout=30"
-            f"&Login+Timeout=30"
-            f"&timeout=30"
-        )
-        logger.info(f"Connecting to: {DATABASE_CONFIG['server']}/{DATABASE_CONFIG['database']}")
-        
-        # Create engine with connection pooling and timeout settings
-        engine = create_engine(
-            connection_string, 
-            echo=False,
-            pool_size=5,
-            max_overflow=10,
-            pool_timeout=30,
-            pool_recycle=3600  # Recycle connections every hour
-        )
-        
-        # Test connection
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        logger.info("✅ Database connection successful")
+        if database_url:
+            # Explicit URL, e.g. a local SQLite stand-in for development and tests
+            logger.info(f"Database engine for: {database_url}")
+            # An in-memory SQLite database only exists on its one connection
+            in_memory = database_url in ('sqlite://', 'sqlite:///:memory:')
+            engine = create_engine(database_url, echo=False, **({} if in_memory else dict(poolclass=TimedQueuePool, **DB_POOL_OPTIONS)))
+        else:
+            server = server or DATABASE_CONFIG['server']
+            # Build connection string for pyodbc with better timeout settings for Railway
+            connection_string = (
+                f"mssql+pyodbc://{DATABASE_CONFIG['username']}:{DATABASE_CONFIG['password']}"
+                f"@{server}/{DATABASE_CONFIG['database']}"
+                f"?driver=ODBC+Driver+18+for+SQL+Server"
+                f"&TrustServerCertificate=yes"
+                f"&Connection+Timeout=30"
+                f"&Login+Timeout=30"
+                f"&timeout=30"
+            )
+            if read_only:
+                # Lets an availability group listener route the connection to a readable secondary
+                connection_string += "&ApplicationIntent=ReadOnly"
+            logger.info(f"Database engine for: {server}/{DATABASE_CONFIG['database']}")
+            
+            # Create engine with connection pooling and timeout settings
+            engine = create_engine(
+                connection_string, 
+                echo=False,
+                poolclass=TimedQueuePool,
+                **DB_POOL_OPTIONS
+            )
         return engine
     except Exception as e:
-        logger.error(f"❌ Database connection failed: {str(e)}")
-        logger.error("Please check your .env file and ensure the database is accessible")
+        logger.error(f"❌ Database configuration is invalid: {str(e)}")
+        logger.error("Please check your .env file")
         return None
 
-engine = create_db_engine()
+# Optional read replica for board reloads and change feed polls; writes always go to the primary
+DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+SQL_SERVER_REPLICA_HOST = os.getenv('SQL_SERVER_REPLICA_HOST')
+REPLICA_CONFIGURED = bool(DATABASE_REPLICA_URL or SQL_SERVER_REPLICA_HOST)
+
+engine = create_db_engine(os.getenv('DATABASE_URL'))
 Session = sessionmaker(bind=engine) if engine else None
+replica_engine = create_db_engine(DATABASE_REPLICA_URL, SQL_SERVER_REPLICA_HOST, read_only=True) if REPLICA_CONFIGURED else None
+ReadSession = sessionmaker(bind=replica_engine) if replica_engine else None
+
+def ping_engine(db_engine):
+    with db_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return True
+
+def connect_primary():
+    """Create the primary engine if it does not exist yet, otherwise check it answers"""
+    global engine, Session
+    if engine is None:
+        new_engine = create_db_engine(os.getenv('DATABASE_URL'))
+        if new_engine is None:
+            return False
+        engine, Session = new_engine, sessionmaker(bind=new_engine)
+        return True
+    return ping_engine(engine)
+
+def connect_replica():
+    global replica_engine, ReadSession
+    if replica_engine is None:
+        new_engine = create_db_engine(DATABASE_REPLICA_URL, SQL_SERVER_REPLICA_HOST, read_only=True)
+        if new_engine is None:
+            return False
+        replica_engine, ReadSession = new_engine, sessionmaker(bind=new_engine)
+        return True
+    return ping_engine(replica_engine)
+
+# Requests fail fast while a database is down; a background task reconnects with backoff
+DB_RECONNECT_MAX_BACKOFF = float(os.getenv('DB_RECONNECT_MAX_BACKOFF', '60'))
+# Neither is probed at import; the first check (usually the background task) connects.
+# Probes block on the driver's login timeout, so they run on the DB thread pool like queries
+database_health = DatabaseHealth('Primary', lambda: run_db(connect_primary), max_backoff=DB_RECONNECT_MAX_BACKOFF)
+replica_health = DatabaseHealth('Replica', lambda: run_db(connect_replica), max_backoff=DB_RECONNECT_MAX_BACKOFF)
+
+# Errors that mean the database could not be reached, as opposed to a failed statement
+DB_CONNECTION_ERRORS = (OperationalError, InterfaceError)
+DB_UNREACHABLE_ERRORS = (DatabaseUnavailableError,) + DB_CONNECTION_ERRORS
+DB_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_HEALTH_CHECK_INTERVAL', '1'))
+
+# Pool state is read when /metrics is scraped
+DB_POOL_CHECKED_OUT.set_callback(lambda: engine.pool.checkedout() if engine else None)
+DB_POOL_OVERFLOW.set_callback(lambda: max(engine.pool.overflow(), 0) if engine else None)
+DB_POOL_SIZE.set_callback(lambda: engine.pool.size() if engine else None)
+
+@contextmanager
+def session_scope(read_only=False):
+    """Session for one unit of work, rolled back on error and always returned to the pool
+
+    read_only sessions use the replica while it is reachable and the primary otherwise
+    """
+    if read_only and REPLICA_CONFIGURED and replica_health.check() and ReadSession:
+        factory, health = ReadSession, replica_health
+    else:
+        factory, health = Session, database_health
+    if not health.check() or not factory:
+        raise DatabaseUnavailableError("Database connection not available. Please check your SQL Server configuration.")
+    
+    session = factory()
+    try:
+        yield session
+    except DB_CONNECTION_ERRORS as e:
+        session.rollback()
+        health.mark_unavailable(e)
+        raise
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+def db_busy_message(e=None):
+    if isinstance(e, DatabaseUnavailableError):
+        return str(e)
+    return 'Database is busy, please retry shortly'
+
+def db_busy_response(e=None):
+    """503 telling the client to back off while the pool is exhausted or the database is down"""
+    response = jsonify({
+        'success': False,
+        'error': db_busy_message(e),
+        'message': 'Service unavailable'
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(DB_RETRY_AFTER)
+    return response
+
+@app.errorhandler(PoolTimeoutError)
+@app.errorhandler(DatabaseUnavailableError)
+def handle_database_busy(e):
+    logger.warning(f"Database unavailable for request: {str(e)}")
+    return db_busy_response(e)
+
+def run_db(fn, *args, **kwargs):
+    """Run a blocking database call on the bounded DB thread pool in the async worker modes
+
+    Calls made from a pool thread (e.g. a health probe inside session_scope) run inline
+    """
+    if ASYNC_MODE == 'gevent':
+        return db_threadpool.apply(fn, args, kwargs)
+    if ASYNC_MODE == 'eventlet':
+        return tpool.execute(fn, *args, **kwargs)
+    # Threading mode: each request already runs on its own thread
+    return fn(*args, **kwargs)
 
 # Global variables for CDC monitoring
 cdc_thread = None
 cdc_running = False
+CDC_POLL_INTERVAL = float(os.getenv('CDC_POLL_INTERVAL', '2'))
+
+# 'delta' emits changed fields only, 'full' emits every column of each changed flight
+FLIGHT_UPDATES_FORMAT = os.getenv('FLIGHT_UPDATES_FORMAT', 'delta')
+
+# Occupied Socket.IO rooms, used to fan out each change only to matching screens
+subscriptions = SubscriptionIndex()
+broadcast_lock = threading.Lock()
+
+# Opt-in compact wire encodings ('compact', 'msgpack') for flight payloads, JSON by default
+client_encodings = ClientEncodings()
+
+# Pub/sub between API nodes: the elected leader polls the change feed and publishes,
+# every node applies the changes to its own snapshot and sockets
+FLIGHT_CHANGES_CHANNEL = 'fids:flight_changes'
+flight_pubsub = create_pubsub(os.getenv('PUBSUB_URL'))
+cdc_leader = flight_pubsub.leader_lock('fids:cdc_leader', ttl=float(os.getenv('CDC_LEADER_TTL', '10')))
+
+# Incremental change feed: 'timestamp' (last_updated column) or 'change_tracking' (SQL Server)
+change_source = create_change_source(
+    os.getenv('CDC_SOURCE', 'timestamp'),
+    Flight,
+    RedisWatermarkStore(flight_pubsub.client, 'fids:cdc_watermark') if flight_pubsub.name == 'redis'
+    else WatermarkStore(os.getenv('CDC_WATERMARK_FILE', '.cdc_watermark.json')),
+    batch_size=int(os.getenv('CDC_BATCH_SIZE', '500'))
+)
+
+# Largest accepted PUT /api/update-flights batch
+BULK_UPDATE_MAX_ITEMS = int(os.getenv('BULK_UPDATE_MAX_ITEMS', '1000'))
+
+# Rows per transaction for streaming imports, and per snapshot read for exports
+FLIGHT_IMPORT_BATCH_SIZE = int(os.getenv('FLIGHT_IMPORT_BATCH_SIZE', '500'))
+FLIGHT_IMPORT_MAX_ERRORS = 100
+FLIGHT_IMPORT_FIELDS = ['logo'] + FLIGHT_UPDATE_FIELDS
+FLIGHT_EXPORT_FIELDS = ['id', 'version'] + FLIGHT_IMPORT_FIELDS + ['std_at', 'etd_at', 'last_updated']
+# Columns a new flight cannot be inserted without
+FLIGHT_REQUIRED_FIELDS = [column.name for column in Flight.__table__.columns if not column.nullable and not column.primary_key]
+FLIGHT_MAX_LENGTHS = {column.name: getattr(column.type, 'length', None) for column in Flight.__table__.columns}
+
+# SQL Server accepts at most 2100 parameters per statement
+SQL_IN_CHUNK_SIZE = 1000
+
+# In-memory flight board snapshot, kept current by the CDC poller
+flight_cache = FlightBoardCache(
+    max_staleness=float(os.getenv('FLIGHT_CACHE_MAX_STALENESS', '10')),
+    changelog_size=int(os.getenv('FLIGHT_CHANGELOG_SIZE', '1000')),
+    reconcile_interval=float(os.getenv('FLIGHT_CACHE_RECONCILE_INTERVAL', '60'))
+)
+flight_cache_refresh_lock = threading.Lock()
+
+# Last-known board on disk, served (marked stale) while the database is unreachable
+board_snapshot_store = BoardSnapshotStore(os.getenv('BOARD_SNAPSHOT_FILE', '.board_snapshot.json'))
+BOARD_SNAPSHOT_INTERVAL = float(os.getenv('BOARD_SNAPSHOT_INTERVAL', '30'))
+FLIGHT_CACHE_HITS.set_callback(lambda: flight_cache.hits)
+FLIGHT_CACHE_MISSES.set_callback(lambda: flight_cache.misses)
+FLIGHT_CACHE_HIT_RATIO.set_callback(lambda: flight_cache.stats()['hit_ratio'])
+
+def record_compression(encoding, size, compressed_size):
+    HTTP_COMPRESSIONS.labels(encoding=encoding).inc()
+    HTTP_COMPRESSION_SAVED_BYTES.labels(encoding=encoding).inc(max(0, size - compressed_size))
+
+# gzip/brotli for JSON responses; flight pages are compressed once per data version
+response_compressor = ResponseCompressor(
+    min_size=int(os.getenv('COMPRESSION_MIN_SIZE', '1024')),
+    gzip_level=int(os.getenv('COMPRESSION_GZIP_LEVEL', '6')),
+    brotli_quality=int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5')),
+    on_compressed=record_compression
+)
+
+# Shared caches (CDN, reverse proxy) may reuse a response for this many seconds, so polling
+# bursts hit the origin once per interval; browsers always revalidate by ETag
+FLIGHTS_SHARED_MAX_AGE = int(os.getenv('FLIGHTS_SHARED_MAX_AGE', '2'))
+ADB_DEVICES_SHARED_MAX_AGE = int(os.getenv('ADB_DEVICES_SHARED_MAX_AGE', '5'))
+
+def shared_cache_headers(response, shared_max_age):
+    """Let shared caches keep a response briefly, keyed by the negotiated encoding"""
+    if shared_max_age > 0:
+        response.headers['Cache-Control'] = f"public, max-age=0, s-maxage={shared_max_age}"
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+# ADB commands go over the adb server socket; the manager keeps an in-memory device inventory
+# from track-devices notifications and keeps network devices connected
+ADB_DEVICES_ROOM = 'adb:devices'
+ADB_COMMAND_TIMEOUT = float(os.getenv('ADB_COMMAND_TIMEOUT', '30'))
+adb_manager = AdbDeviceManager(
+    AdbClient(
+        host=os.getenv('ADB_SERVER_HOST', '127.0.0.1'),
+        port=int(os.getenv('ADB_SERVER_PORT', os.getenv('ANDROID_ADB_SERVER_PORT', '5037'))),
+        timeout=float(os.getenv('ADB_SERVER_TIMEOUT', '10'))
+    ),
+    health_interval=float(os.getenv('ADB_HEALTH_CHECK_INTERVAL', '15')),
+    on_change=lambda device: socketio.emit('device_status', device, to=ADB_DEVICES_ROOM)
+)
+
+# Fleet-wide dispatch: one job sends a command to many devices over a bounded pool,
+# progress goes to sockets in the ADB jobs room
+ADB_JOBS_ROOM = 'adb:jobs'
+ADB_FLEET_MAX_DEVICES = int(os.getenv('ADB_FLEET_MAX_DEVICES', '1000'))
+adb_device_groups = load_device_groups(os.getenv('ADB_DEVICE_GROUPS'))
+adb_jobs = AdbJobRunner(
+    adb_manager,
+    emit=lambda progress: socketio.emit('adb_job_progress', progress, to=ADB_JOBS_ROOM),
+    max_workers=int(os.getenv('ADB_FLEET_WORKERS', '32')),
+    retries=int(os.getenv('ADB_FLEET_RETRIES', '2')),
+    retry_delay=float(os.getenv('ADB_FLEET_RETRY_DELAY', '1'))
+)
+
+def browser_intent(url):
+    """Shell arguments that open a URL in the device browser"""
+    return ['am', 'start', '-a', 'android.intent.action.VIEW', '-d', url]
 
 def init_database():
     """Initialize database tables"""
     if not engine:
-        raise Exception("Database connection not available. Please check your SQL Server configuration.")
+        raise DatabaseUnavailableError("Database connection not available. Please check your SQL Server configuration.")
     
     try:
         Base.metadata.create_all(engine)
+        # create_all skips tables that already exist, add columns and indexes declared since
+        migrate_schedule_columns()
+        for index in Flight.__table__.indexes:
+            index.create(engine, checkfirst=True)
         logger.info("Database tables created successfully")
+        mark_schema_ready()
         return True
     except Exception as e:
         logger.error(f"Error creating database tables: {str(e)}")
         raise e
 
-def get_flights_from_db(page=1, per_page=10):
-    """Get paginated flights from database"""
-    if not Session:
-        raise Exception("Database connection not available. Please check your SQL Server configuration.")
+# Serverless (Vercel) runs no background tasks, so nothing prepares the schema or warms the board
+BACKGROUND_STARTUP = not os.getenv('VERCEL_ENV')
+
+# Readiness: set once the schema is known to be up to date
+schema_ready = False
+schema_error = None
+SCHEMA_RETRY_INTERVAL = float(os.getenv('SCHEMA_RETRY_INTERVAL', '30'))
+
+def mark_schema_ready():
+    global schema_ready, schema_error
+    schema_ready = True
+    schema_error = None
+
+def schema_is_current():
+    """Whether the flights table already has every declared column and index"""
+    inspector = inspect(engine)
+    if not inspector.has_table(Flight.__tablename__):
+        return False
+    columns = {column['name'] for column in inspector.get_columns(Flight.__tablename__)}
+    indexes = {index['name'] for index in inspector.get_indexes(Flight.__tablename__)}
+    return (
+        {column.name for column in Flight.__table__.columns} <= columns
+        and {index.name for index in Flight.__table__.indexes} <= indexes
+    )
+
+def ensure_schema():
+    """Run the migrations unless an earlier start (or migration.sql) already applied them"""
+    if schema_is_current():
+        logger.info("✅ Database schema is up to date")
+        mark_schema_ready()
+        return
+    logger.info("Initializing database...")
+    init_database()
+    logger.info("✅ Database initialized successfully")
+
+def prepare_database():
+    """Background startup task: wait for the database, bring the schema up to date, then load the board"""
+    global schema_error
+    while not schema_ready:
+        if not database_health.check():
+            socketio.sleep(DB_HEALTH_CHECK_INTERVAL)
+            continue
+        try:
+            run_db(ensure_schema)
+        except DB_CONNECTION_ERRORS as e:
+            database_health.mark_unavailable(e)
+        except Exception as e:
+            schema_error = str(e)
+            logger.error(f"❌ Database setup failed: {str(e)}")
+            logger.error("Please run the migration.sql script on your database, retrying in "
+                         f"{SCHEMA_RETRY_INTERVAL:g}s")
+            socketio.sleep(SCHEMA_RETRY_INTERVAL)
     
+    # Warm the snapshot so the first board request does not pay for the load
     try:
-        session = Session()
-        
-        # Calculate offset
-        offset = (page - 1) * per_page
-        
-        # Get total count
-        total_flights = session.query(Flight).count()
-        
-        # Get paginated flights with ORDER BY (required for SQL Server OFFSET/LIMIT)
-        flights = session.query(Flight).order_by(Flight.id).offset(offset).limit(per_page).all()
-        
-        # Convert to dict format
-        flight_list = []
-        for flight in flights:
-            flight_dict = {
-                'id': flight.id,
-                'airline': flight.airline,
-                'logo': flight.logo,
-                'time': flight.time,
-                'destination': flight.destination,
-                'destinationCode': flight.destinationCode,
-                'flight': flight.flight,
-                'std': flight.std,
-                'etd': flight.etd,
-                'gate': flight.gate,
-                'status': flight.status,
-                'statusClass': flight.statusClass,
-                'last_updated': flight.last_updated.isoformat() if flight.last_updated else None
-            }
-            flight_list.append(flight_dict)
+        refresh_flight_cache()
+    except Exception as e:
+        logger.warning(f"Could not preload the flight board: {str(e)}")
+
+SCHEDULE_BACKFILL_BATCH_SIZE = 1000
+
+def migrate_schedule_columns():
+    """Add the typed std_at/etd_at columns to an existing table and backfill them from the strings"""
+    existing = {column['name'] for column in inspect(engine).get_columns(Flight.__tablename__)}
+    with engine.begin() as connection:
+        for column in (Flight.__table__.c.std_at, Flight.__table__.c.etd_at):
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f"ALTER TABLE {Flight.__tablename__} ADD {column.name} {column_type} NULL"))
+                logger.info(f"Added column {Flight.__tablename__}.{column.name}")
+    
+    # Keyset batches so a large table is not read or locked in one go
+    with session_scope() as session:
+        backfilled = 0
+        last_id = 0
+        while True:
+            rows = (
+                session.query(Flight.id, Flight.std, Flight.etd, Flight.last_updated)
+                .filter(Flight.id > last_id, (Flight.std_at.is_(None)) | (Flight.etd_at.is_(None)))
+                .order_by(Flight.id)
+                .limit(SCHEDULE_BACKFILL_BATCH_SIZE)
+                .all()
+            )
+            if not rows:
+                break
+            # last_updated is left alone: the snapshot picks the columns up on its next full load
+            updates = [
+                dict(schedule_columns(row.std, row.etd, service_date_of(row.last_updated)), id=row.id)
+                for row in rows
+            ]
+            session.execute(update(Flight), updates)
+            session.commit()
+            backfilled += len(rows)
+            last_id = rows[-1].id
+        if backfilled:
+            logger.info(f"Backfilled std_at/etd_at for {backfilled} flights")
+
+def flight_to_dict(flight):
+    """Convert a Flight row to its API dict format"""
+    return {
+        'id': flight.id,
+        'airline': flight.airline,
+        'logo': flight.logo,
+        'time': flight.time,
+        'destination': flight.destination,
+        'destinationCode': flight.destinationCode,
+        'flight': flight.flight,
+        'std': flight.std,
+        'etd': flight.etd,
+        'gate': flight.gate,
+        'status': flight.status,
+        'statusClass': flight.statusClass,
+        'std_at': flight.std_at.isoformat() if flight.std_at else None,
+        'etd_at': flight.etd_at.isoformat() if flight.etd_at else None,
+        'last_updated': flight.last_updated.isoformat() if flight.last_updated else None
+    }
+
+@FLIGHTS_READ_SECONDS.labels(phase='query').time()
+def load_flights_from_db():
+    """Read the whole flights table in id order"""
+    with session_scope(read_only=True) as session:
+        return [flight_to_dict(flight) for flight in session.query(Flight).order_by(Flight.id).all()]
+
+def refresh_flight_cache(reconcile=False):
+    """Reload the flight board snapshot from the database
+
+    reconcile=True also reloads a fresh snapshot once its last full read is older than the reconcile interval
+    """
+    # Only one request reloads, the rest wait and read the fresh snapshot
+    with flight_cache_refresh_lock:
+        if flight_cache.is_fresh() and not (reconcile and flight_cache.reconcile_due()):
+            return
         
-        session.close()
+        flights = run_db(load_flights_from_db)
+        deltas = reload_flight_board(flights)
         
-        # Calculate pagination info
-        total_pages = math.ceil(total_flights / per_page)
+        logger.info(f"Flight board cache loaded with {len(flights)} flights (generation {flight_cache.generation}, {len(deltas)} changed)")
+    
+    persist_board_snapshot(force=True)
+
+def persist_board_snapshot(force=False):
+    """Save the current board to disk when it changed, at most every BOARD_SNAPSHOT_INTERVAL seconds"""
+    if not flight_cache.is_fresh():
+        return
+    flights, generation = flight_cache.flights()
+    if generation == board_snapshot_store.saved_generation:
+        return
+    if not force and board_snapshot_store.saved_at and time.time() - board_snapshot_store.saved_at < BOARD_SNAPSHOT_INTERVAL:
+        return
+    try:
+        board_snapshot_store.save(flights, generation)
+    except Exception as e:
+        logger.warning(f"Could not save the board snapshot: {str(e)}")
+
+def read_last_known_board(build, error):
+    """Build a response from the last-known board while the database is unreachable, marked stale"""
+    with flight_cache_refresh_lock:
+        if not flight_cache.has_data():
+            saved = board_snapshot_store.load()
+            if not saved or not saved['flights']:
+                raise error
+            flight_cache.load(saved['flights'], fresh=False, confirmed_at=saved.get('saved_at'))
+            logger.warning(f"Serving the last-known board from {board_snapshot_store.path} ({len(saved['flights'])} flights)")
+    
+    result = build()
+    result['stale'] = True
+    result['as_of'] = datetime.utcfromtimestamp(flight_cache.confirmed_at).isoformat() if flight_cache.confirmed_at else None
+    return result
+
+@FLIGHTS_READ_SECONDS.labels(phase='total').time()
+def get_flights_from_db(page=1, per_page=10, filters=None, sort=None, window=None):
+    """Get paginated flights, served from the in-memory board snapshot"""
+    try:
+        result = flight_cache.get_page(page, per_page, filters, sort, window)
+        if result is not None:
+            return result
         
-        return {
-            'success': True,
-            'flights': flight_list,
-            'pagination': {
-                'current_page': page,
-                'per_page': per_page,
-                'total_flights': total_flights,
-                'total_pages': total_pages,
-                'has_next': page < total_pages,
-                'has_prev': page > 1,
-                'next_page': page + 1 if page < total_pages else 1,
-                'prev_page': page - 1 if page > 1 else total_pages
-            }
-        }
+        # Snapshot missing or stale - reload the whole table once
+        try:
+            refresh_flight_cache()
+        except DB_UNREACHABLE_ERRORS as e:
+            return read_last_known_board(lambda: flight_cache.build_page(page, per_page, filters, sort, window), e)
+        return flight_cache.build_page(page, per_page, filters, sort, window)
+    except Exception as e:
+        logger.error(f"Error fetching flights from database: {str(e)}")
+        raise e
+
+def encode_cursor(after_id, per_page, filters=None, window=None):
+    """Build an opaque continuation token for keyset pagination"""
+    state = {'after_id': after_id, 'per_page': per_page}
+    if filters:
+        state['filters'] = filters
+    if window:
+        state['window'] = window
+    payload = json.dumps(state, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Parse a continuation token, raises ValueError if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        filters = {field: tuple(values) for field, values in payload.get('filters', {}).items()}
+        window = tuple(payload['window']) if payload.get('window') else None
+        return int(payload['after_id']), int(payload['per_page']), filters or None, window
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+@FLIGHTS_READ_SECONDS.labels(phase='total').time()
+def get_flights_after(after_id=0, per_page=10, include_total=True, filters=None, window=None):
+    """Get the flights following after_id (keyset pagination), served from the board snapshot"""
+    try:
+        result = flight_cache.get_page_after(after_id, per_page, include_total, filters, window)
+        if result is None:
+            build = lambda: flight_cache.build_page_after(after_id, per_page, include_total, filters, window)
+            try:
+                refresh_flight_cache()
+                result = build()
+            except DB_UNREACHABLE_ERRORS as e:
+                result = read_last_known_board(build, e)
+        
+        # Continuation token for the next page, carrying the filters and window along
+        next_after_id = result['pagination']['next_after_id']
+        result['pagination']['next_cursor'] = (
+            encode_cursor(next_after_id, per_page, filters, window) if next_after_id is not None else None
+        )
+        return result
     except Exception as e:
         logger.error(f"Error fetching flights from database: {str(e)}")
         raise e
 
+def broadcast_flight_changes(changed_flights, deleted_ids=()):
+    """Apply changed rows to the board snapshot and emit them to the subscribed rooms"""
+    with broadcast_lock:
+        # Rows as clients last saw them, to reach rooms a flight is leaving
+        changed_ids = [flight['id'] for flight in changed_flights] + list(deleted_ids)
+        previous = {flight['id']: flight for flight in flight_cache.get_flights(changed_ids)}
+        removed_positions = {flight_id: flight_cache.position(flight_id) for flight_id in deleted_ids}
+        
+        # The snapshot holds the last-emitted version of every flight
+        deltas = flight_cache.apply_changes(changed_flights) + flight_cache.remove(deleted_ids)
+        queue_flight_deltas(deltas, previous, removed_positions)
+    return deltas
+
+def reload_flight_board(flights):
+    """Replace the board snapshot with a full read of the table and emit the rows that differ"""
+    with broadcast_lock:
+        previous = {flight['id']: flight for flight in flight_cache.flights()[0]}
+        deltas = flight_cache.load(flights)
+        # Where deleted rows were, for the page rooms that shift
+        removed_positions = {delta['id']: flight_cache.position(delta['id']) for delta in deltas if delta.get('deleted')}
+        queue_flight_deltas(deltas, previous, removed_positions)
+    return deltas
+
+def queue_flight_deltas(deltas, previous, removed_positions):
+    """Hand deltas to the scheduler for the rooms that display them
+
+    previous maps flight ids to their rows before the change, removed_positions maps deleted
+    ids to where they were in id order
+    """
+    if not deltas:
+        return
+    BROADCAST_ROWS.observe(len(deltas))
+    
+    current = {flight['id']: flight for flight in flight_cache.get_flights([delta['id'] for delta in deltas])}
+    
+    # Group deltas by the rooms that display them; the scheduler merges and emits them
+    room_deltas = {}
+    for delta in deltas:
+        flight_id = delta['id']
+        if delta.get('deleted'):
+            position, shifted = removed_positions[flight_id], True
+        else:
+            position, shifted = flight_cache.position(flight_id), flight_id not in previous
+        
+        for room in subscriptions.match(current.get(flight_id), previous.get(flight_id), position, shifted):
+            room_deltas.setdefault(room, []).append(delta)
+    
+    for room, deltas_for_room in room_deltas.items():
+        emit_scheduler.submit(room, deltas_for_room, flight_cache.generation)
+    
+    logger.info(f"Queued {len(deltas)} flight changes for {len(room_deltas)} rooms")
+
+def emit_flight_updates(room, deltas, skip_sids=(), generation=None, sids=None):
+    """Emit one flight_updates event to a room in the configured format
+
+    generation is the board version the deltas bring clients to, the current one by default;
+    sids addresses those clients instead of a room
+    """
+    generation = flight_cache.generation if generation is None else generation
+    if FLIGHT_UPDATES_FORMAT == 'full':
+        # Legacy payload: every column of each changed flight, as it is now
+        changed = flight_cache.get_flights([delta['id'] for delta in deltas if not delta.get('deleted')])
+        removed_ids = [delta['id'] for delta in deltas if delta.get('deleted')]
+        if changed:
+            emit_flight_payload('flight_updates', {
+                'type': 'update',
+                'flights': changed,
+                'timestamp': datetime.utcnow().isoformat()
+            }, room, 'flights', skip_sids, sids)
+        if removed_ids:
+            emit_flight_payload('flight_updates', {
+                'type': 'delete',
+                'ids': removed_ids,
+                'timestamp': datetime.utcnow().isoformat()
+            }, room, 'flights', skip_sids, sids)
+    else:
+        # Only the fields that changed, with a per-flight version for gap detection
+        emit_flight_payload('flight_updates', {
+            'type': 'delta',
+            'deltas': deltas,
+            'generation': generation,
+            'board_version': flight_cache.etag(generation),
+            'timestamp': datetime.utcnow().isoformat()
+        }, room, 'deltas', skip_sids, sids)
+
+def emit_flight_payload(event, payload, room, table_key, skip_sids=(), sids=None):
+    """Emit to a room once per wire encoding in use, encoding the payload once for each
+
+    sids addresses a list of clients instead, each receiving the event once
+    """
+    if sids is not None:
+        by_encoding = {}
+        for sid in sids:
+            by_encoding.setdefault(client_encodings.get(sid), []).append(sid)
+        for encoding, encoding_sids in by_encoding.items():
+            socketio.emit(event, encode_payload(payload, encoding, table_key), to=encoding_sids)
+        return
+    for encoding in client_encodings.in_use():
+        socketio.emit(event, encode_payload(payload, encoding, table_key), to=wire_room(room, encoding),
+                      skip_sid=list(skip_sids) or None)
+
+def flight_resync_payload(flight_ids):
+    """flight_resync event with the current rows of the given flights"""
+    flights = flight_cache.get_flights(flight_ids)
+    found_ids = {flight['id'] for flight in flights}
+    return {
+        'success': True,
+        'flights': flights,
+        'missing_ids': [flight_id for flight_id in flight_ids if flight_id not in found_ids],
+        'generation': flight_cache.generation,
+        'board_version': flight_cache.etag()
+    }
+
+def catch_up_client(sid, flight_ids):
+    """Current rows of the flights a rate-limited client was held back from"""
+    socketio.emit('flight_resync', encode_payload(flight_resync_payload(flight_ids), client_encodings.get(sid), 'flights'), to=sid)
+
+def resync_client(sid):
+    """Full snapshot of a client's rooms, after updates to it were paused for a backlog"""
+    flights = {}
+    for room in subscriptions.rooms_of(sid):
+        filters, offset, limit = room_query(room)
+        flights.update((flight['id'], flight) for flight in flight_cache.select_flights(filters, offset, limit))
+    payload = {
+        'success': True,
+        'snapshot': True,
+        'flights': [flights[flight_id] for flight_id in sorted(flights)],
+        'missing_ids': [],
+        'generation': flight_cache.generation,
+        'board_version': flight_cache.etag()
+    }
+    socketio.emit('flight_resync', encode_payload(payload, client_encodings.get(sid), 'flights'), to=sid)
+
+def board_snapshot(encoding):
+    """flight_resync event with the whole board, encoded once per generation and encoding"""
+    key = ('snapshot', encoding)
+    cached = flight_cache.get_serialized(key)
+    if cached is not None:
+        return cached[1]
+    
+    generation = flight_cache.generation
+    payload = encode_payload({
+        'success': True,
+        'snapshot': True,
+        'flights': flight_cache.select_flights(),
+        'missing_ids': [],
+        'generation': generation,
+        'board_version': flight_cache.etag(generation)
+    }, encoding, 'flights')
+    flight_cache.put_serialized(key, generation, payload)
+    return payload
+
+def resume_client(board_version):
+    """Bring a connecting client up to date from memory: the changes it missed since board_version,
+    or the whole board when it has none or the changelog no longer reaches back to it"""
+    if not flight_cache.is_fresh():
+        try:
+            refresh_flight_cache()
+        except DB_UNREACHABLE_ERRORS:
+            # The last-known board is better than nothing
+            if not flight_cache.has_data():
+                raise
+    
+    encoding = client_encodings.get(request.sid)
+    deltas = flight_cache.changes_since(board_version) if board_version else None
+    if deltas is None:
+        emit('flight_resync', board_snapshot(encoding))
+    elif FLIGHT_UPDATES_FORMAT == 'full':
+        emit('flight_resync', encode_payload(flight_resync_payload([delta['id'] for delta in deltas]), encoding, 'flights'))
+    else:
+        generation = flight_cache.generation
+        emit('flight_updates', encode_payload({
+            'type': 'delta',
+            'resume': True,
+            'deltas': deltas,
+            'generation': generation,
+            'board_version': flight_cache.etag(generation),
+            'timestamp': datetime.utcnow().isoformat()
+        }, encoding, 'deltas'))
+
+def socket_backlog(sid):
+    """Packets queued for a client that its transport has not written yet"""
+    eio_sid = socketio.server.manager.eio_sid_from_sid(sid, '/')
+    eio_socket = socketio.server.eio.sockets.get(eio_sid) if eio_sid else None
+    return eio_socket.queue.qsize() if eio_socket is not None else 0
+
+# Merges changes per flight within a window, caps flight_updates per client and holds back
+# clients whose websocket is not draining
+emit_scheduler = EmitScheduler(
+    send=emit_flight_updates,
+    send_to_clients=lambda sids, deltas, generation: emit_flight_updates(None, deltas, generation=generation, sids=sids),
+    members=subscriptions.members,
+    backlog=socket_backlog,
+    catch_up=catch_up_client,
+    resync=resync_client,
+    disconnect=lambda sid: socketio.server.disconnect(sid, namespace='/'),
+    start_background_task=socketio.start_background_task,
+    window=float(os.getenv('FLIGHT_UPDATES_WINDOW', '0.05')),
+    max_rate=float(os.getenv('FLIGHT_UPDATES_MAX_RATE', '20')),
+    max_backlog=int(os.getenv('SLOW_CLIENT_MAX_BACKLOG', '200')),
+    slow_client_action=os.getenv('SLOW_CLIENT_ACTION', 'resync'),
+    sleep=socketio.sleep,
+    on_coalesced=EMIT_COALESCED.inc,
+    on_throttled=EMIT_THROTTLED.inc,
+    on_slow_client=lambda action: SLOW_CLIENTS.labels(action=action).inc(),
+    on_flushed=EMIT_FANOUT_SECONDS.observe
+)
+
+@CDC_POLL_SECONDS.time()
+def poll_change_feed():
+    """Read the next change batch, returns it with the changed rows in dict format"""
+    with session_scope(read_only=True) as session:
+        # Row versions past the high-water mark
+        batch = change_source.poll(session)
+        
+        # How far behind the writes the poller is running
+        written = [flight.last_updated for flight in batch.flights if flight.last_updated]
+        if written:
+            CDC_LAG_SECONDS.observe(max((datetime.utcnow() - max(written)).total_seconds(), 0))
+        
+        return batch, [flight_to_dict(flight) for flight in batch.flights]
+
+def publish_flight_changes(changed_flights=(), deleted_ids=(), resync=False):
+    """Send changes to every API node (an empty message confirms the board is current)"""
+    flight_pubsub.publish(FLIGHT_CHANGES_CHANNEL, {
+        'flights': list(changed_flights),
+        'deleted_ids': list(deleted_ids),
+        'resync': resync
+    })
+
+def publish_committed_flight_changes(changed_flights):
+    """Publish a committed write; if pub/sub fails the write still succeeded, and the CDC feed catches up"""
+    try:
+        publish_flight_changes(changed_flights)
+    except Exception as e:
+        FLIGHT_PUBLISH_FAILURES.inc()
+        logger.error(f"Publishing {len(changed_flights)} committed flight changes failed, the CDC feed will deliver them: {str(e)}")
+
+def handle_flight_changes_message(message):
+    """Apply changes published by any node to this node's snapshot and sockets"""
+    if message['flights'] or message['deleted_ids']:
+        broadcast_flight_changes(message['flights'], message['deleted_ids'])
+    elif message['resync']:
+        # What changed is unknown: reload now, so connected clients get the difference
+        flight_cache.invalidate()
+        try:
+            refresh_flight_cache()
+        except Exception as e:
+            logger.warning(f"Board reload after a change feed resync failed, the next read retries: {str(e)}")
+    else:
+        flight_cache.touch()
+
+flight_pubsub.subscribe(FLIGHT_CHANGES_CHANNEL, handle_flight_changes_message)
+
 def monitor_cdc_changes():
     """Monitor database changes using CDC (Change Data Capture)"""
     global cdc_running
     
     while cdc_running:
+        persist_board_snapshot()
+        
+        # Polling starts once the background startup brought the schema up to date
+        if not schema_ready:
+            socketio.sleep(CDC_POLL_INTERVAL)
+            continue
+        
+        # Every node compares its snapshot with the table now and then, for what the feed cannot see
+        if flight_cache.reconcile_due():
+            try:
+                refresh_flight_cache(reconcile=True)
+            except DB_UNREACHABLE_ERRORS:
+                # Retried on the next pass once the database is back
+                pass
+            except Exception as e:
+                logger.error(f"Error reconciling the flight board: {str(e)}")
+        
+        # Only the elected node polls the database
+        was_leader = cdc_leader.is_leader
+        if not cdc_leader.acquire():
+            socketio.sleep(CDC_POLL_INTERVAL)
+            continue
+        
+        has_more = False
         try:
-            session = Session()
+            if not was_leader:
+                # Another node may have advanced the shared watermark since this one last polled
+                change_source.resume()
             
-            # Query for recent changes (last 5 seconds)
-            recent_changes = session.query(Flight).filter(
-                Flight.last_updated >= datetime.utcnow() - timedelta(seconds=5)
-            ).all()
+            batch, changed_flights = run_db(poll_change_feed)
+            has_more = batch.has_more
             
-            if recent_changes:
-                # Convert to dict format
-                changed_flights = []
-                for flight in recent_changes:
-                    flight_dict = {
-                        'id': flight.id,
-                        'airline': flight.airline,
-                        'logo': flight.logo,
-                        'time': flight.time,
-                        'destination': flight.destination,
-                        'destinationCode': flight.destinationCode,
-                        'flight': flight.flight,
-                        'std': flight.std,
-                        'etd': flight.etd,
-                        'gate': flight.gate,
-                        'status': flight.status,
-                        'statusClass': flight.statusClass,
-                        'last_updated': flight.last_updated.isoformat()
-                    }
-                    changed_flights.append(flight_dict)
-                
-                # Emit changes to all connected clients
-                socketio.emit('flight_updates', {
-                    'type': 'update',
-                    'flights': changed_flights,
-                    'timestamp': datetime.utcnow().isoformat()
-                })
-                
-                logger.info(f"Broadcasted {len(changed_flights)} flight updates via WebSocket")
+            publish_flight_changes(changed_flights, batch.deleted_ids, batch.resync)
             
-            session.close()
+            # Only advance the watermark after the batch went out
+            change_source.ack(batch)
             
+        except DatabaseUnavailableError:
+            # Reconnecting in the background; the watermark resumes where it stopped
+            pass
         except Exception as e:
             logger.error(f"Error in CDC monitoring: {str(e)}")
         
-        time.sleep(2)  # Check every 2 seconds
+        # Drain a backlog without waiting
+        if not has_more:
+            socketio.sleep(CDC_POLL_INTERVAL)
 
 def start_cdc_monitoring():
-    """Start CDC monitoring thread"""
+    """Start CDC monitoring as a background task of the async worker model"""
     global cdc_thread, cdc_running
     
     if not cdc_running:
         cdc_running = True
-        cdc_thread = threading.Thread(target=monitor_cdc_changes)
-        cdc_thread.daemon = True
-        cdc_thread.start()
+        cdc_thread = socketio.start_background_task(monitor_cdc_changes)
         logger.info("CDC monitoring started")
 
 def stop_cdc_monitoring():
     """Stop CDC monitoring thread"""
     global cdc_running
     cdc_running = False
+    cdc_leader.release()
     logger.info("CDC monitoring stopped")
 
+# Per-route request latency
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    started = getattr(g, 'request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.labels(
+            method=request.method, route=route, status=response.status_code
+        ).observe(time.perf_counter() - started)
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Compress JSON responses the route did not already encode (streamed exports are left as is)"""
+    if not response_compressor.compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    encoding = response_compressor.negotiate(request.accept_encodings, len(body))
+    if encoding:
+        response.set_data(response_compressor.compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # A strong ETag names exact bytes, so the compressed body gets its own
+            response.set_etag(f"{etag}-{encoding}")
+    return response
+
 # WebSocket event handlers
+def join_flight_room(room):
+    """Join a subscription room through the Socket.IO room of the client's encoding"""
+    join_room(wire_room(room, client_encodings.get(request.sid)))
+    subscriptions.add(request.sid, room)
+
+def leave_flight_room(room):
+    leave_room(wire_room(room, client_encodings.get(request.sid)))
+    subscriptions.remove(request.sid, room)
+
 @socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
     logger.info(f"Client connected: {request.sid}")
-    emit('connection_response', {'status': 'connected', 'message': 'Connected to FIDS real-time updates'})
+    
+    SOCKET_CONNECTIONS.inc()
+    
+    # Handshake options come from the auth payload or the query string
+    options = dict(request.args)
+    if isinstance(auth, dict):
+        options.update(auth)
+    
+    # Clients may ask for a compact encoding in the handshake, e.g. ?encoding=msgpack
+    encoding_error = None
+    if options.get('encoding'):
+        try:
+            client_encodings.set(request.sid, options['encoding'])
+        except ValueError as e:
+            encoding_error = str(e)
+    
+    # Receive every change until the client subscribes to specific rooms
+    join_flight_room(ALL_FLIGHTS_ROOM)
+    emit('connection_response', {
+        'status': 'connected',
+        'message': 'Connected to FIDS real-time updates',
+        'encoding': client_encodings.get(request.sid),
+        'encodings': list(available_encodings())
+    })
+    if encoding_error:
+        emit('error', {'message': encoding_error})
+    
+    # Reconnecting clients send their last board_version and get what they missed;
+    # snapshot=true asks for the whole board without a request_flights round trip
+    if options.get('board_version') or str(options.get('snapshot', '')).lower() in ('1', 'true'):
+        try:
+            resume_client(options.get('board_version'))
+        except (PoolTimeoutError, DatabaseUnavailableError) as e:
+            emit('error', {'message': db_busy_message(e), 'retry_after': DB_RETRY_AFTER})
+        except Exception as e:
+            logger.error(f"Error resuming flight board: {str(e)}")
+            emit('error', {'message': str(e)})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     logger.info(f"Client disconnected: {request.sid}")
+    SOCKET_CONNECTIONS.dec()
+    subscriptions.remove_client(request.sid)
+    client_encodings.remove(request.sid)
+    emit_scheduler.forget(request.sid)
+
+@socketio.on('set_encoding')
+def handle_set_encoding(data):
+    """Switch the encoding of flight_data, flight_updates and flight_resync payloads"""
+    try:
+        encoding = (data or {}).get('encoding')
+        rooms = subscriptions.rooms_of(request.sid)
+        previous = client_encodings.get(request.sid)
+        client_encodings.set(request.sid, encoding)
+        
+        # Move to the broadcast rooms of the new encoding
+        for room in rooms:
+            leave_room(wire_room(room, previous))
+            join_room(wire_room(room, encoding))
+        
+        emit('encoding_response', {'success': True, 'encoding': encoding})
+        
+    except Exception as e:
+        logger.error(f"Error setting encoding: {str(e)}")
+        emit('error', {'message': str(e)})
 
 @socketio.on('request_flights')
 def handle_request_flights(data):
@@ -280,14 +1154,151 @@ def handle_request_flights(data):
     try:
         page = data.get('page', 1)
         per_page = data.get('per_page', 10)
+        filters, sort, window = parse_flight_query(data)
+        
+        # Cursor mode when the client sends a continuation token or after_id
+        if data.get('cursor'):
+            after_id, per_page, filters, window = decode_cursor(data['cursor'])
+            result = get_flights_after(after_id, per_page, data.get('include_total', True), filters, window)
+        elif data.get('after_id') is not None:
+            result = get_flights_after(int(data['after_id']), per_page, data.get('include_total', True), filters, window)
+        else:
+            result = get_flights_from_db(page, per_page, filters, sort, window)
+        emit('flight_data', encode_payload(result, client_encodings.get(request.sid), 'flights'))
         
-        result = get_flights_from_db(page, per_page)
-        emit('flight_data', result)
+    except (PoolTimeoutError, DatabaseUnavailableError) as e:
+        emit('error', {'message': db_busy_message(e), 'retry_after': DB_RETRY_AFTER})
         
     except Exception as e:
         logger.error(f"Error handling flight request: {str(e)}")
         emit('error', {'message': str(e)})
 
+@socketio.on('subscribe_flights')
+def handle_subscribe_flights(data):
+    """Join rooms by page, gate, destinationCode or airline"""
+    try:
+        rooms = rooms_from_request(data or {})
+        
+        # Subscribed clients stop receiving the whole airport's traffic
+        leave_flight_room(ALL_FLIGHTS_ROOM)
+        
+        for room in rooms:
+            join_flight_room(room)
+        
+        emit('subscription_response', {
+            'success': True,
+            'rooms': sorted(subscriptions.rooms_of(request.sid))
+        })
+        
+    except Exception as e:
+        logger.error(f"Error handling flight subscription: {str(e)}")
+        emit('error', {'message': str(e)})
+
+@socketio.on('unsubscribe_flights')
+def handle_unsubscribe_flights(data=None):
+    """Leave rooms, falling back to all flights when none remain"""
+    try:
+        rooms = rooms_from_request(data) if data else subscriptions.rooms_of(request.sid)
+        
+        for room in rooms:
+            leave_flight_room(room)
+        
+        if not subscriptions.rooms_of(request.sid):
+            join_flight_room(ALL_FLIGHTS_ROOM)
+        
+        emit('subscription_response', {
+            'success': True,
+            'rooms': sorted(subscriptions.rooms_of(request.sid))
+        })
+        
+    except Exception as e:
+        logger.error(f"Error handling flight unsubscription: {str(e)}")
+        emit('error', {'message': str(e)})
+
+@socketio.on('resync_flights')
+def handle_resync_flights(data=None):
+    """Send full current rows for flights where the client detected a version gap"""
+    try:
+        flight_ids = [int(flight_id) for flight_id in (data or {}).get('ids', [])]
+        if not flight_cache.is_fresh():
+            refresh_flight_cache()
+        
+        emit('flight_resync', encode_payload(flight_resync_payload(flight_ids), client_encodings.get(request.sid), 'flights'))
+        
+    except Exception as e:
+        logger.error(f"Error handling flight resync: {str(e)}")
+        emit('error', {'message': str(e)})
+
+@socketio.on('subscribe_adb_jobs')
+def handle_subscribe_adb_jobs(data=None):
+    """Receive adb_job_progress events for fleet jobs"""
+    join_room(ADB_JOBS_ROOM)
+    emit('adb_jobs_subscribed', {'success': True})
+
+@socketio.on('unsubscribe_adb_jobs')
+def handle_unsubscribe_adb_jobs(data=None):
+    leave_room(ADB_JOBS_ROOM)
+
+@socketio.on('subscribe_adb_devices')
+def handle_subscribe_adb_devices(data=None):
+    """Receive device_status events when devices attach, drop or change state"""
+    join_room(ADB_DEVICES_ROOM)
+    emit('adb_devices', {'success': True, 'devices': adb_manager.devices(), 'refreshed_at': adb_manager.refreshed_at})
+
+@socketio.on('unsubscribe_adb_devices')
+def handle_unsubscribe_adb_devices(data=None):
+    leave_room(ADB_DEVICES_ROOM)
+
+def page_etag(board_version, key):
+    """ETag of one page: the board version and the resolved query, so a relative from/to window
+    that has moved on no longer revalidates"""
+    return f"{board_version}-{hashlib.md5(repr(key).encode()).hexdigest()[:8]}"
+
+def serve_flight_page(key, build):
+    """Respond with a page's JSON, serialized and compressed once per data version and revalidated by ETag"""
+    # Client already has this version: no lookup, no serialization
+    if flight_cache.is_fresh():
+        etag = page_etag(flight_cache.etag(), key)
+        # Compressed bodies carry their encoding in the ETag
+        for tag in [etag] + [f"{etag}-{encoding}" for encoding in CONTENT_ENCODINGS]:
+            if request.if_none_match.contains_weak(tag):
+                response = app.response_class(status=304)
+                response.set_etag(tag)
+                return shared_cache_headers(response, FLIGHTS_SHARED_MAX_AGE)
+
+    cached = flight_cache.get_serialized(key)
+    if cached:
+        board_version, bodies = cached
+    else:
+        # Label with the generation the page was read from
+        result = build()
+        generation = result['generation']
+        with FLIGHTS_READ_SECONDS.labels(phase='serialize').time():
+            body = app.json.dumps(result).encode() + b'\n'
+        if result.get('stale'):
+            # Last-known board: neither cached nor revalidated once the database is back
+            response = app.response_class(body, mimetype='application/json')
+            response.headers['Cache-Control'] = 'no-store'
+            return response
+        # Body per content encoding, filled in as clients ask for them
+        bodies = {'identity': body}
+        flight_cache.put_serialized(key, generation, bodies)
+        board_version = flight_cache.etag(generation)
+    etag = page_etag(board_version, key)
+
+    body = bodies['identity']
+    encoding = response_compressor.negotiate(request.accept_encodings, len(body))
+    if encoding:
+        if encoding not in bodies:
+            bodies[encoding] = response_compressor.compress(body, encoding)
+        body = bodies[encoding]
+        etag = f"{etag}-{encoding}"
+
+    response = app.response_class(body, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    return shared_cache_headers(response, FLIGHTS_SHARED_MAX_AGE)
 
 @app.route('/api/flights', methods=['GET'])
 def get_flights():
@@ -296,23 +1307,65 @@ def get_flights():
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 10))
         
+        cursor = request.args.get('cursor')
+        after_id = request.args.get('after_id')
+        include_total = request.args.get('include_total', 'true').lower() != 'false'
+        
+        # Filter by gate, destinationCode, airline or status, sort by std/etd, window by from/to
+        try:
+            filters, sort, window = parse_flight_query(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'message': 'Bad request'
+            }), 400
+        
+        # Cursor (keyset) mode: continuation token or explicit after_id
+        if cursor:
+            try:
+                after_id, per_page, filters, window = decode_cursor(cursor)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e),
+                    'message': 'Bad request'
+                }), 400
+        elif after_id is not None:
+            after_id = int(after_id)
+        
         # Validate pagination parameters
         if page < 1:
             page = 1
         if per_page < 1 or per_page > 50:
             per_page = 10
         
+        filters_key = tuple(sorted(filters.items())) if filters else None
+        if after_id is not None:
+            if sort:
+                return jsonify({
+                    'success': False,
+                    'error': 'sort is only supported with page pagination, cursor pages are in id order',
+                    'message': 'Bad request'
+                }), 400
+            after_id = max(after_id, 0)
+            key = ('cursor', after_id, per_page, include_total, filters_key, window)
+            return serve_flight_page(key, lambda: get_flights_after(after_id, per_page, include_total, filters, window))
+        
         # Get flights from database (no fallback)
-        result = get_flights_from_db(page, per_page)
-        return jsonify(result)
+        key = ('page', page, per_page, filters_key, sort, window)
+        return serve_flight_page(key, lambda: get_flights_from_db(page, per_page, filters, sort, window))
         
     except ValueError:
         return jsonify({
             'success': False,
-            'error': 'Invalid page or per_page parameter. Must be integers.',
+            'error': 'Invalid page, per_page or after_id parameter. Must be integers.',
             'message': 'Bad request'
         }), 400
         
+    except (PoolTimeoutError, DatabaseUnavailableError) as e:
+        return db_busy_response(e)
+        
     except Exception as e:
         logger.error(f"Error fetching flights: {str(e)}")
         return jsonify({
@@ -338,46 +1391,38 @@ def execute_adb():
         # Construct the full URL
         full_url = f"{base_url}/{target_page}"
         
-        # ADB command to open URL in browser
-        adb_command = [
-            'adb', 'shell', 'am', 'start',
-            '-a', 'android.intent.action.VIEW',
-            '-d', full_url
-        ]
+        # Send the command to this device only, over the persistent adb server connection
+        serial = device_serial(device_ip)
+        shell_args = browser_intent(full_url)
+        adb_command = ['adb', '-s', serial, 'shell'] + shell_args
         
         logger.info(f"Executing ADB command: {' '.join(adb_command)}")
         
-        # Execute the ADB command
-        result = subprocess.run(
-            adb_command,
-            capture_output=True,
-            text=True,
-            timeout=30  # 30 second timeout
-        )
-        
-        if result.returncode == 0:
-            return jsonify({
-                'success': True,
-                'command': ' '.join(adb_command),
-                'output': result.stdout,
-                'device_ip': device_ip,
-                'target_url': full_url,
-                'message': f'Successfully sent command to device {device_ip}'
-            })
-        else:
+        try:
+            output = adb_manager.shell(serial, shell_args, timeout=ADB_COMMAND_TIMEOUT)
+        except AdbError as e:
             return jsonify({
                 'success': False,
                 'command': ' '.join(adb_command),
-                'error': result.stderr,
+                'error': str(e),
                 'device_ip': device_ip,
                 'target_url': full_url,
                 'message': f'Failed to execute command on device {device_ip}'
             }), 500
+        
+        return jsonify({
+            'success': True,
+            'command': ' '.join(adb_command),
+            'output': output,
+            'device_ip': device_ip,
+            'target_url': full_url,
+            'message': f'Successfully sent command to device {device_ip}'
+        })
             
-    except subprocess.TimeoutExpired:
+    except socket.timeout:
         return jsonify({
             'success': False,
-            'error': 'Command timed out after 30 seconds',
+            'error': f'Command timed out after {ADB_COMMAND_TIMEOUT:g} seconds',
             'message': 'ADB command execution timed out'
         }), 408
         
@@ -391,67 +1436,169 @@ def execute_adb():
 
 @app.route('/api/adb-devices', methods=['GET'])
 def list_adb_devices():
-    """List connected ADB devices"""
+    """List ADB devices from the in-memory inventory (?refresh=true asks the adb server first)
+
+    Until the device manager's first refresh the inventory is empty with refreshed_at null
+    """
     try:
-        result = subprocess.run(
-            ['adb', 'devices'],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        
-        if result.returncode == 0:
-            # Parse ADB devices output
-            lines = result.stdout.strip().split('\n')[1:]  # Skip header
-            devices = []
-            
-            for line in lines:
-                if line.strip():
-                    parts = line.split('\t')
-                    if len(parts) >= 2:
-                        device_id = parts[0]
-                        status = parts[1]
-                        devices.append({
-                            'device_id': device_id,
-                            'status': status
-                        })
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        if refresh:
+            adb_manager.refresh()
+
+        response = jsonify({
+            'success': True,
+            'devices': adb_manager.devices(),
+            'raw_output': adb_manager.raw_listing,
+            'refreshed_at': adb_manager.refreshed_at,
+            'tracking': adb_manager.tracking
+        })
+        if refresh:
+            # An explicit refresh must reach the adb server, not a cached copy
+            response.headers['Cache-Control'] = 'no-store'
+            return response
+        # Weak, so the same ETag stands for the compressed body
+        response.set_etag(hashlib.md5(response.get_data()).hexdigest(), weak=True)
+        return shared_cache_headers(response, ADB_DEVICES_SHARED_MAX_AGE).make_conditional(request)
             
+    except Exception as e:
+        logger.error(f"Error listing ADB devices: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to list ADB devices'
+        }), 500
+
+@app.route('/api/execute-adb-fleet', methods=['POST'])
+def execute_adb_fleet():
+    """Open a page on many devices at once, returns a job id to follow"""
+    try:
+        data = request.get_json() or {}
+        device_ips = list(data.get('devices') or [])
+        group = data.get('group')
+        target_page = data.get('targetPage', 'departures')
+        base_url = data.get('baseURL', 'https://fids-two.vercel.app')
+        
+        if group:
+            if group not in adb_device_groups:
+                return jsonify({
+                    'success': False,
+                    'error': f'Unknown device group: {group}'
+                }), 400
+            device_ips.extend(adb_device_groups[group])
+        
+        # Same device listed twice (or in the group too) gets one command
+        serials = list(dict.fromkeys(device_serial(str(device_ip)) for device_ip in device_ips))
+        if not serials:
             return jsonify({
-                'success': True,
-                'devices': devices,
-                'raw_output': result.stdout
-            })
-        else:
+                'success': False,
+                'error': 'devices or group is required'
+            }), 400
+        if len(serials) > ADB_FLEET_MAX_DEVICES:
             return jsonify({
                 'success': False,
-                'error': result.stderr,
-                'message': 'Failed to list ADB devices'
-            }), 500
-            
+                'error': f'At most {ADB_FLEET_MAX_DEVICES} devices per job'
+            }), 400
+        
+        full_url = f"{base_url}/{target_page}"
+        job = adb_jobs.submit(serials, browser_intent(full_url), timeout=ADB_COMMAND_TIMEOUT, target_url=full_url, group=group)
+        logger.info(f"ADB fleet job {job['job_id']} opening {full_url} on {len(serials)} devices")
+        
+        return jsonify({
+            'success': True,
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'total': job['total'],
+            'target_url': full_url,
+            'status_url': f"/api/adb-jobs/{job['job_id']}",
+            'message': f'Dispatching to {len(serials)} devices'
+        }), 202
+        
     except Exception as e:
-        logger.error(f"Error listing ADB devices: {str(e)}")
+        logger.error(f"Error starting ADB fleet job: {str(e)}")
         return jsonify({
             'success': False,
             'error': str(e),
-            'message': 'Failed to list ADB devices'
+            'message': 'Internal server error'
         }), 500
 
+@app.route('/api/adb-jobs', methods=['GET'])
+def list_adb_jobs():
+    """Recent fleet jobs without per-device detail"""
+    return jsonify({
+        'success': True,
+        'jobs': adb_jobs.jobs()
+    })
+
+@app.route('/api/adb-jobs/<job_id>', methods=['GET'])
+def get_adb_job(job_id):
+    """Status of one fleet job with per-device progress"""
+    job = adb_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    
+    return jsonify(dict(job, success=True))
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Liveness endpoint: answers as long as the process serves requests, whatever the database does"""
     return jsonify({
         'status': 'healthy',
         'message': 'FIDS API with SQL Server and WebSocket support is running',
-        'database': 'connected' if engine else 'disconnected',
+        'ready': is_ready(),
+        'schema_ready': schema_ready,
+        'database': 'connected' if database_health.available else 'disconnected',
+        'database_health': database_health.stats(),
+        'replica': replica_health.stats() if REPLICA_CONFIGURED else None,
+        'board_snapshot_saved_at': board_snapshot_store.saved_at,
         'websocket': 'enabled',
-        'cdc_monitoring': 'active' if cdc_running else 'inactive'
+        'wire_encodings': client_encodings.stats(),
+        'emit_scheduler': emit_scheduler.stats(),
+        'cdc_monitoring': 'active' if cdc_running else 'inactive',
+        'cdc_leader': cdc_leader.is_leader,
+        'pubsub': flight_pubsub.name,
+        'flight_cache': flight_cache.stats(),
+        'adb': adb_manager.stats()
+    })
+
+def is_ready():
+    """Ready once the schema is up to date, and still ready during an outage while a board can be served"""
+    if not BACKGROUND_STARTUP:
+        # Only the database can be checked; the breaker limits how often this probes
+        return database_health.check()
+    return schema_ready and (database_health.available or flight_cache.has_data())
+
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint: 503 until the node can serve the board"""
+    ready = is_ready()
+    response = jsonify({
+        'status': 'ready' if ready else 'starting',
+        'checks': {
+            'database': database_health.available,
+            # null where background startup is off and these are never prepared
+            'schema': schema_ready if BACKGROUND_STARTUP else None,
+            'flight_board': flight_cache.has_data() if BACKGROUND_STARTUP else None
+        },
+        'error': schema_error or database_health.last_error
     })
+    if not ready:
+        response.status_code = 503
+        response.headers['Retry-After'] = str(DB_RETRY_AFTER)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics endpoint"""
+    return app.response_class(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/init-db', methods=['POST'])
 def initialize_database():
     """Initialize database tables"""
     try:
-        success = init_database()
+        success = run_db(init_database)
         if success:
             return jsonify({
                 'success': True,
@@ -462,6 +1609,9 @@ def initialize_database():
                 'success': False,
                 'message': 'Failed to create database tables'
             }), 500
+    except (PoolTimeoutError, DatabaseUnavailableError) as e:
+        return db_busy_response(e)
+
     except Exception as e:
         logger.error(f"Error initializing database: {str(e)}")
         return jsonify({
@@ -470,9 +1620,33 @@ def initialize_database():
             'message': 'Database initialization failed'
         }), 500
 
+def save_flight_update(flight_id, data):
+    """Write one flight's changed fields, returns the committed row or None if the flight does not exist"""
+    with session_scope() as session:
+        flight = session.query(Flight).filter(Flight.id == flight_id).first()
+        
+        if not flight:
+            return None
+        
+        # Update flight fields
+        for field in FLIGHT_UPDATE_FIELDS:
+            if field in data:
+                setattr(flight, field, data[field])
+        
+        # Keep the typed schedule columns in step with the strings
+        if 'std' in data or 'etd' in data:
+            for column, value in schedule_columns(flight.std, flight.etd, service_date_of(flight.std_at)).items():
+                setattr(flight, column, value)
+        
+        # New row version from the database clock; writes made outside the API reach screens through the CDC poller
+        flight.last_updated = utcnow()
+        
+        session.commit()
+        return flight_to_dict(flight)
+
 @app.route('/api/update-flight', methods=['PUT'])
 def update_flight():
-    """Update a specific flight (triggers CDC)"""
+    """Update a specific flight and broadcast it"""
     try:
         data = request.get_json()
         flight_id = data.get('id')
@@ -483,32 +1657,25 @@ def update_flight():
                 'error': 'Flight ID is required'
             }), 400
         
-        session = Session()
-        flight = session.query(Flight).filter(Flight.id == flight_id).first()
-        
-        if not flight:
-            session.close()
+        changed_flight = run_db(save_flight_update, flight_id, data)
+        if changed_flight is None:
             return jsonify({
                 'success': False,
                 'error': 'Flight not found'
             }), 404
         
-        # Update flight fields
-        for field in ['airline', 'time', 'destination', 'destinationCode', 'flight', 'std', 'etd', 'gate', 'status', 'statusClass']:
-            if field in data:
-                setattr(flight, field, data[field])
-        
-        # Update timestamp to trigger CDC
-        flight.last_updated = datetime.utcnow()
-        
-        session.commit()
-        session.close()
+        # Write-through: screens get the committed row now instead of on the next poll;
+        # the poller skips this row version when it reads it
+        publish_committed_flight_changes([changed_flight])
         
         return jsonify({
             'success': True,
             'message': f'Flight {flight_id} updated successfully'
         })
         
+    except (PoolTimeoutError, DatabaseUnavailableError) as e:
+        return db_busy_response(e)
+        
     except Exception as e:
         logger.error(f"Error updating flight: {str(e)}")
         return jsonify({
@@ -517,6 +1684,294 @@ def update_flight():
             'message': 'Flight update failed'
         }), 500
 
+def coalesce_flight_updates(items):
+    """Validate each update and merge repeated updates to the same flight, later fields win"""
+    merged = {}
+    invalid = []
+    
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            invalid.append({'index': index, 'status': 'invalid', 'error': 'Update must be an object'})
+            continue
+        # Same checks as imports, so one bad item cannot fail the whole transaction
+        try:
+            flight_id, fields = validate_row(item, FLIGHT_UPDATE_FIELDS, FLIGHT_MAX_LENGTHS)
+        except ValueError as e:
+            invalid.append({'index': index, 'id': item.get('id'), 'status': 'invalid', 'error': str(e)})
+            continue
+        if flight_id is None:
+            invalid.append({'index': index, 'status': 'invalid', 'error': 'Flight ID is required'})
+            continue
+        
+        if not fields:
+            invalid.append({'index': index, 'id': flight_id, 'status': 'invalid', 'error': 'No updatable fields'})
+            continue
+        
+        entry = merged.setdefault(flight_id, {'fields': {}, 'count': 0})
+        entry['fields'].update(fields)
+        entry['count'] += 1
+    
+    return merged, invalid
+
+def load_flight_schedules(session, flight_ids):
+    """Existing flights among flight_ids with their schedule, by id"""
+    existing = {}
+    # In chunks below the SQL Server parameter limit
+    for chunk in chunked(flight_ids, SQL_IN_CHUNK_SIZE):
+        for row in session.query(Flight.id, Flight.std, Flight.etd, Flight.std_at).filter(Flight.id.in_(chunk)):
+            existing[row.id] = row
+    return existing
+
+def apply_flight_updates(session, rows, existing):
+    """Write partial updates ({'id': ..., field: value}) of existing flights with one executemany UPDATE"""
+    if not rows:
+        return
+    for row in rows:
+        if 'std' in row or 'etd' in row:
+            current = existing[row['id']]
+            row.update(schedule_columns(row.get('std', current.std), row.get('etd', current.etd), service_date_of(current.std_at)))
+    # Stamped by the database to trigger CDC
+    session.execute(update(Flight).values(last_updated=utcnow()), rows)
+
+def read_committed_flights(session, flight_ids):
+    """Committed rows in dict format, for the broadcast after a write"""
+    flights = []
+    for chunk in chunked(flight_ids, SQL_IN_CHUNK_SIZE):
+        flights.extend(flight_to_dict(flight) for flight in session.query(Flight).filter(Flight.id.in_(chunk)))
+    return flights
+
+def save_flight_updates(merged):
+    """Write coalesced updates in one transaction, returns per-flight results and the new rows"""
+    results = []
+    
+    with session_scope() as session:
+        existing = load_flight_schedules(session, list(merged))
+        
+        rows = []
+        for flight_id, entry in merged.items():
+            if flight_id in existing:
+                rows.append(dict(entry['fields'], id=flight_id))
+                results.append({'id': flight_id, 'status': 'updated', 'merged_updates': entry['count']})
+            else:
+                results.append({'id': flight_id, 'status': 'not_found', 'error': 'Flight not found'})
+        
+        apply_flight_updates(session, rows, existing)
+        session.commit()
+        
+        return results, read_committed_flights(session, [row['id'] for row in rows])
+
+@app.route('/api/update-flights', methods=['PUT'])
+def update_flights():
+    """Apply a batch of partial flight updates in one transaction (one broadcast)"""
+    try:
+        data = request.get_json()
+        items = data.get('flights') if isinstance(data, dict) else data
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({
+                'success': False,
+                'error': 'A non-empty array of flight updates is required'
+            }), 400
+        
+        if len(items) > BULK_UPDATE_MAX_ITEMS:
+            return jsonify({
+                'success': False,
+                'error': f'At most {BULK_UPDATE_MAX_ITEMS} updates per request'
+            }), 400
+        
+        merged, results = coalesce_flight_updates(items)
+        updated, changed_flights = run_db(save_flight_updates, merged) if merged else ([], [])
+        results.extend(updated)
+        updated_ids = [result['id'] for result in updated if result['status'] == 'updated']
+        
+        # Broadcast the whole batch once; the CDC poller will find nothing new for these versions
+        if changed_flights:
+            publish_committed_flight_changes(changed_flights)
+        
+        return jsonify({
+            'success': len(updated_ids) == len(results),
+            'updated': len(updated_ids),
+            'not_found': sum(1 for result in results if result['status'] == 'not_found'),
+            'invalid': sum(1 for result in results if result['status'] == 'invalid'),
+            'results': results,
+            'message': f'{len(updated_ids)} flights updated'
+        })
+        
+    except (PoolTimeoutError, DatabaseUnavailableError) as e:
+        return db_busy_response(e)
+        
+    except Exception as e:
+        logger.error(f"Error updating flights: {str(e)}")
+        # Database errors stay in the log; the transaction was rolled back
+        return jsonify({
+            'success': False,
+            'error': 'The batch could not be saved, no updates were applied',
+            'message': 'Bulk flight update failed'
+        }), 500
+
+def save_flight_rows(rows):
+    """Upsert one import chunk in one transaction, returns (inserted, updated, errors, committed rows)
+
+    rows are (line number, flight id or None, fields); rows with an id update that flight or
+    insert it with that id, rows without one are inserted
+    """
+    errors = []
+    
+    # Later rows for the same flight win, as in the bulk update endpoint
+    merged = {}
+    new_rows = []
+    for line, flight_id, fields in rows:
+        if flight_id is None:
+            new_rows.append((line, fields))
+        else:
+            merged.setdefault(flight_id, (line, {}))[1].update(fields)
+    
+    with session_scope() as session:
+        existing = load_flight_schedules(session, list(merged))
+        
+        updates = []
+        inserts = []
+        for flight_id, (line, fields) in merged.items():
+            if flight_id in existing:
+                updates.append(dict(fields, id=flight_id))
+            else:
+                new_rows.append((line, dict(fields, id=flight_id)))
+        
+        for line, fields in new_rows:
+            missing = [field for field in FLIGHT_REQUIRED_FIELDS if field not in fields]
+            if missing:
+                errors.append({'line': line, 'id': fields.get('id'), 'error': f"New flights need: {', '.join(missing)}"})
+                continue
+            # last_updated comes from the column default, the database clock
+            inserts.append(dict(fields, **schedule_columns(fields['std'], fields['etd'])))
+        
+        apply_flight_updates(session, updates, existing)
+        
+        inserted_ids = []
+        with_ids = [row for row in inserts if 'id' in row]
+        without_ids = [row for row in inserts if 'id' not in row]
+        if with_ids:
+            # Explicit ids go into the IDENTITY column that create_all declares on SQL Server
+            identity_insert = session.bind.dialect.name == 'mssql'
+            if identity_insert:
+                session.execute(text(f"SET IDENTITY_INSERT {Flight.__tablename__} ON"))
+            session.execute(insert(Flight), with_ids)
+            if identity_insert:
+                session.execute(text(f"SET IDENTITY_INSERT {Flight.__tablename__} OFF"))
+            inserted_ids.extend(row['id'] for row in with_ids)
+        if without_ids:
+            inserted_ids.extend(session.scalars(insert(Flight).returning(Flight.id), without_ids).all())
+        session.commit()
+        
+        changed_flights = read_committed_flights(session, [row['id'] for row in updates] + inserted_ids)
+        return len(inserted_ids), len(updates), errors, changed_flights
+
+@app.route('/api/flights/import', methods=['POST'])
+def import_flights():
+    """Stream a CSV or NDJSON schedule into the flights table, upserting in chunks"""
+    try:
+        fmt = resolve_format(request.args.get('format'), request.content_type)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Bad request'
+        }), 400
+    
+    started = time.perf_counter()
+    totals = {'rows': 0, 'inserted': 0, 'updated': 0, 'invalid': 0}
+    errors = []
+    
+    def record_error(error):
+        totals['invalid'] += 1
+        if len(errors) < FLIGHT_IMPORT_MAX_ERRORS:
+            errors.append(error)
+    
+    def valid_rows():
+        """Validated (line, id, fields) from the request body, read as it arrives"""
+        for line, row in iter_rows(request.stream, fmt):
+            totals['rows'] += 1
+            if isinstance(row, str):
+                record_error({'line': line, 'error': row})
+                continue
+            try:
+                flight_id, fields = validate_row(row, FLIGHT_IMPORT_FIELDS, FLIGHT_MAX_LENGTHS)
+            except ValueError as e:
+                record_error({'line': line, 'error': str(e)})
+                continue
+            if not fields:
+                record_error({'line': line, 'id': flight_id, 'error': 'No importable fields'})
+                continue
+            yield line, flight_id, fields
+    
+    try:
+        # Each chunk commits on its own and reaches screens right away
+        for chunk in chunked(valid_rows(), FLIGHT_IMPORT_BATCH_SIZE):
+            inserted, updated, chunk_errors, changed_flights = run_db(save_flight_rows, chunk)
+            totals['inserted'] += inserted
+            totals['updated'] += updated
+            for error in chunk_errors:
+                record_error(error)
+            if changed_flights:
+                publish_committed_flight_changes(changed_flights)
+        
+    except (PoolTimeoutError, DatabaseUnavailableError) as e:
+        return db_busy_response(e)
+        
+    except Exception as e:
+        logger.error(f"Error importing flights: {str(e)}")
+        return jsonify(dict(totals, **{
+            'success': False,
+            'error': 'A chunk could not be saved and was rolled back',
+            'message': 'Flight import failed; chunks before the failure were committed'
+        })), 500
+    
+    elapsed = time.perf_counter() - started
+    logger.info(f"Imported {totals['rows']} {fmt} rows in {elapsed:.2f}s: "
+                f"{totals['inserted']} inserted, {totals['updated']} updated, {totals['invalid']} invalid")
+    return jsonify(dict(totals, **{
+        'success': totals['invalid'] == 0,
+        'format': fmt,
+        'errors': errors,
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(totals['rows'] / elapsed, 1) if elapsed else None,
+        'message': f"{totals['inserted'] + totals['updated']} flights imported"
+    }))
+
+@app.route('/api/flights/export', methods=['GET'])
+def export_flights():
+    """Stream the board (optionally filtered, sorted and windowed) as CSV or NDJSON"""
+    try:
+        fmt = resolve_format(request.args.get('format', 'csv'))
+        filters, sort, window = parse_flight_query(request.args)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Bad request'
+        }), 400
+    
+    try:
+        if not flight_cache.is_fresh():
+            refresh_flight_cache()
+    except (PoolTimeoutError, DatabaseUnavailableError) as e:
+        return db_busy_response(e)
+    
+    flight_ids = flight_cache.select_ids(filters, sort, window)
+    
+    def rows():
+        started = time.perf_counter()
+        for chunk in chunked(flight_ids, FLIGHT_IMPORT_BATCH_SIZE):
+            yield from flight_cache.get_flights(chunk)
+        elapsed = time.perf_counter() - started
+        logger.info(f"Exported {len(flight_ids)} flights as {fmt} in {elapsed:.2f}s")
+    
+    return Response(export_lines(rows(), fmt, FLIGHT_EXPORT_FIELDS), mimetype=EXPORT_MIMETYPES[fmt], headers={
+        'Content-Disposition': f'attachment; filename="flights.{fmt}"',
+        'X-Total-Count': str(len(flight_ids)),
+        'X-Board-Version': flight_cache.etag()
+    })
+
 @app.route('/api/cdc/start', methods=['POST'])
 def start_cdc():
     """Start CDC monitoring"""
@@ -565,23 +2020,23 @@ def connect_adb_device():
                 'error': 'Device IP is required'
             }), 400
         
-        # ADB connect command
-        connect_command = ['adb', 'connect', f"{device_ip}:{port}"]
+        serial = device_serial(device_ip, port)
+        connect_command = ['adb', 'connect', serial]
         
         logger.info(f"Connecting to ADB device: {' '.join(connect_command)}")
         
-        result = subprocess.run(
-            connect_command,
-            capture_output=True,
-            text=True,
-            timeout=15
-        )
+        try:
+            output = adb_manager.connect(serial)
+            error = None
+        except AdbError as e:
+            output = ''
+            error = str(e)
         
         return jsonify({
-            'success': result.returncode == 0,
+            'success': error is None,
             'command': ' '.join(connect_command),
-            'output': result.stdout,
-            'error': result.stderr if result.returncode != 0 else None,
+            'output': output,
+            'error': error,
             'device_ip': device_ip,
             'port': port
         })
@@ -594,48 +2049,44 @@ def connect_adb_device():
             'message': 'Failed to connect to ADB device'
         }), 500
 
-# Initialize database and start services based on environment
-def initialize_services():
-    """Initialize database and start services"""
-    # Check database connection
-    if not engine:
-        logger.error("❌ Database connection failed!")
-        logger.error("Please ensure:")
-        logger.error("1. SQL Server is running and accessible")
-        logger.error("2. Environment variables are correctly set in .env file")
-        logger.error("3. Run the migration.sql script on your database first")
-        if not os.getenv('VERCEL_ENV'):
-            exit(1)
-        return False
+# Start services based on environment
+def initialize_services(run_server=True):
+    """Start background services and the server (run_server=False when a WSGI server such as gunicorn serves the app)
+
+    Nothing here waits on the database: connecting and the schema check run in the background
+    and /api/ready reports when they are done
+    """
+    if not BACKGROUND_STARTUP:
+        # Serverless has no background tasks; the first database request connects
+        logger.info("🚀 FIDS API ready for Vercel deployment")
+        return True
     
-    try:
-        # Initialize database on startup
-        logger.info("Initializing database...")
-        init_database()
-        logger.info("✅ Database initialized successfully")
-        
-    except Exception as e:
-        logger.error(f"❌ Database setup failed: {str(e)}")
-        logger.error("Please run the migration.sql script on your AWS SQL Server first")
-        if not os.getenv('VERCEL_ENV'):
-            exit(1)
-        return False
+    # Reconnect in the background so requests never wait on a dead database
+    database_health.start(socketio.start_background_task, DB_HEALTH_CHECK_INTERVAL, socketio.sleep)
+    if REPLICA_CONFIGURED:
+        replica_health.start(socketio.start_background_task, DB_HEALTH_CHECK_INTERVAL, socketio.sleep)
+    socketio.start_background_task(prepare_database)
     
-    # Start CDC monitoring only if not on Vercel (serverless doesn't support background threads)
-    if not os.getenv('VERCEL_ENV'):
-        logger.info("Starting CDC monitoring...")
-        start_cdc_monitoring()
-        logger.info("🚀 Starting FIDS API server...")
-        # Run the application with SocketIO
-        socketio.run(app, debug=True, port=8000, host='0.0.0.0')
-    else:
-        logger.info("🚀 FIDS API ready for Vercel deployment")
+    logger.info("Starting CDC monitoring...")
+    start_cdc_monitoring()
+    adb_manager.start(socketio.start_background_task, socketio.sleep)
+    if run_server:
+        logger.info(f"🚀 Starting FIDS API server ({ASYNC_MODE} mode)...")
+        # Run the application with SocketIO; the debug reloader is opt-in
+        run_options = {'allow_unsafe_werkzeug': True} if ASYNC_MODE == 'threading' else {}
+        socketio.run(
+            app,
+            debug=os.getenv('FLASK_DEBUG', 'false').lower() in ('1', 'true'),
+            port=int(os.getenv('PORT', '8000')),
+            host='0.0.0.0',
+            **run_options
+        )
     
     return True
 
-# For Railway deployment, initialize services when imported
+# For Railway deployment, initialize services when imported (gunicorn serves the app)
 if os.getenv('RAILWAY_ENVIRONMENT'):
-    initialize_services()
+    initialize_services(run_server=False)
 
 # Export app for gunicorn
 application = app
@@ -0,0 +1,263 @@
+"""
+Prometheus-style metrics for the FIDS API
+Counters, gauges and histograms rendered in the text exposition format on /metrics
+"""
+
+import functools
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Timer:
+    """Context manager and decorator that observes elapsed seconds"""
+
+    def __init__(self, observe):
+        self._observe = observe
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._observe(time.perf_counter() - self._start)
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Timer(self._observe):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    def labels(self, **labels):
+        return _Child(self, self._key(labels))
+
+
+class _Child:
+    """A metric bound to one set of label values"""
+
+    def __init__(self, metric, key):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount=1):
+        self._metric._inc(self._key, amount)
+
+    def dec(self, amount=1):
+        self._metric._inc(self._key, -amount)
+
+    def set(self, value):
+        self._metric._set(self._key, value)
+
+    def observe(self, value):
+        self._metric._observe(self._key, value)
+
+    def time(self):
+        return _Timer(self.observe)
+
+
+class Counter(_Metric):
+    """Counter incremented directly, or read from a callback at scrape time"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY, callback=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._callback = callback
+
+    def set_callback(self, callback):
+        self._callback = callback
+
+    def inc(self, amount=1):
+        self._inc((), amount)
+
+    def _inc(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        if self._callback is not None:
+            try:
+                value = self._callback()
+            except Exception:
+                return []
+            return [] if value is None else [f"{self.name}_total {_format_value(value)}"]
+        with self._lock:
+            return [f"{self.name}_total{_format_labels(key)} {_format_value(value)}" for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """Gauge set directly, or read from a callback at scrape time"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY, callback=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._callback = callback
+
+    def inc(self, amount=1):
+        self._inc((), amount)
+
+    def dec(self, amount=1):
+        self._inc((), -amount)
+
+    def set(self, value):
+        self._set((), value)
+
+    def set_callback(self, callback):
+        self._callback = callback
+
+    def _inc(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _set(self, key, value):
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        if self._callback is not None:
+            try:
+                value = self._callback()
+            except Exception:
+                return []
+            return [] if value is None else [f"{self.name} {_format_value(value)}"]
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value):
+        self._observe((), value)
+
+    def time(self):
+        return _Timer(self.observe)
+
+    def _observe(self, key, value):
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][index] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def samples(self):
+        lines = []
+        with self._lock:
+            for key, state in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, state['counts']):
+                    cumulative += count
+                    labels = _format_labels(key + (('le', _format_value(bound)),))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(state['sum'])}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {state['count']}")
+        return lines
+
+
+# Flight board reads
+FLIGHTS_READ_SECONDS = Histogram(
+    'fids_get_flights_seconds', 'Time spent serving flight pages by phase (total, query, serialize)', ['phase'])
+FLIGHT_CACHE_HITS = Counter('fids_flight_cache_hits', 'Flight pages served from the in-memory snapshot')
+FLIGHT_CACHE_MISSES = Counter('fids_flight_cache_misses', 'Flight page lookups that required a database reload')
+FLIGHT_CACHE_HIT_RATIO = Gauge('fids_flight_cache_hit_ratio', 'Share of flight page lookups served from memory')
+
+# Change feed and broadcasting
+CDC_POLL_SECONDS = Histogram('fids_cdc_poll_seconds', 'Duration of one change feed poll')
+CDC_LAG_SECONDS = Histogram(
+    'fids_cdc_lag_seconds', 'Delay between a row being written and the poller picking it up',
+    buckets=(0.1, 0.25, 0.5, 1, 2, 3, 5, 10, 30, 60))
+BROADCAST_ROWS = Histogram(
+    'fids_broadcast_rows', 'Flight changes per broadcast', buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000))
+EMIT_FANOUT_SECONDS = Histogram('fids_emit_fanout_seconds', 'Time to emit one scheduler flush to all matching rooms')
+SOCKET_CONNECTIONS = Gauge('fids_socket_connections', 'Connected Socket.IO clients')
+EMIT_COALESCED = Counter('fids_emit_coalesced', 'Flight deltas merged into a queued delta for the same flight')
+EMIT_THROTTLED = Counter('fids_emit_throttled', 'Room messages held back from clients over their rate or with a backlog')
+SLOW_CLIENTS = Counter('fids_slow_clients', 'Clients whose send backlog exceeded the limit, by action taken', ['action'])
+FLIGHT_PUBLISH_FAILURES = Counter(
+    'fids_flight_publish_failures', 'Committed flight writes whose changes could not be published (the CDC feed catches up)')
+
+# Database connection pool
+DB_POOL_CHECKOUT_SECONDS = Histogram('fids_db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled connection')
+DB_POOL_CHECKED_OUT = Gauge('fids_db_pool_checked_out', 'Connections currently checked out of the pool')
+DB_POOL_OVERFLOW = Gauge('fids_db_pool_overflow', 'Connections open beyond pool_size')
+DB_POOL_SIZE = Gauge('fids_db_pool_size', 'Configured connection pool size')
+DB_POOL_TIMEOUTS = Counter('fids_db_pool_timeouts', 'Checkouts that gave up waiting for a free connection (answered 503)')
+
+# HTTP
+HTTP_REQUEST_SECONDS = Histogram('fids_http_request_seconds', 'HTTP request latency', ['method', 'route', 'status'])
+HTTP_COMPRESSIONS = Counter(
+    'fids_http_compressions', 'Response bodies compressed, by encoding (cached pages once per data version)', ['encoding'])
+HTTP_COMPRESSION_SAVED_BYTES = Counter(
+    'fids_http_compression_saved_bytes', 'Bytes saved by response compression, by encoding', ['encoding'])
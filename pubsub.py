@@ -0,0 +1,190 @@
+"""
+Pub/sub and leader election backends for running several API nodes
+One elected node polls the change feed and publishes, every node fans out to its own sockets
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+def node_id():
+    """Identifier of this process among the API nodes"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class InProcessPubSub:
+    """Delivers messages to subscribers in the same process (single node, local runs and tests)"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, channel, message):
+        with self._lock:
+            callbacks = list(self._subscribers.get(channel, []))
+        for callback in callbacks:
+            try:
+                callback(message)
+            except Exception as e:
+                logger.error(f"Error handling {channel} message: {str(e)}")
+
+    def subscribe(self, channel, callback):
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(callback)
+
+    def leader_lock(self, key, ttl):
+        return InProcessLeaderLock()
+
+    def close(self):
+        with self._lock:
+            self._subscribers = {}
+
+
+class InProcessLeaderLock:
+    """A single node is always the leader"""
+
+    is_leader = False
+
+    def acquire(self):
+        self.is_leader = True
+        return True
+
+    def release(self):
+        self.is_leader = False
+
+
+class RedisPubSub:
+    """Redis channels shared by every node (requires the redis package)"""
+
+    name = 'redis'
+
+    def __init__(self, url):
+        import redis  # optional dependency, only needed for multi-node deployments
+
+        self.client = redis.Redis.from_url(url)
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._handlers = {}
+        self._listener = None
+        self._closed = threading.Event()
+
+    def publish(self, channel, message):
+        self.client.publish(channel, json.dumps(message))
+
+    def subscribe(self, channel, callback):
+        """Register a callback; the listener thread subscribes, so Redis may still be down"""
+        def handler(raw):
+            try:
+                callback(json.loads(raw['data']))
+            except Exception as e:
+                logger.error(f"Error handling {channel} message: {str(e)}")
+
+        self._handlers[channel] = handler
+        if self._listener is None:
+            self._listener = threading.Thread(target=self._listen, daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        """Subscribe to every registered channel and dispatch messages, reconnecting until closed"""
+        subscribed = {}
+        while not self._closed.is_set():
+            try:
+                if subscribed != self._handlers:
+                    subscribed = dict(self._handlers)
+                    self._pubsub.subscribe(**subscribed)
+                self._pubsub.get_message(timeout=0.5)
+            except Exception as e:
+                logger.warning(f"Redis subscription interrupted, retrying: {str(e)}")
+                subscribed = {}
+                self._closed.wait(1)
+
+    def leader_lock(self, key, ttl):
+        return RedisLeaderLock(self.client, key, ttl)
+
+    def close(self):
+        self._closed.set()
+        if self._listener is not None:
+            self._listener.join(timeout=2)
+        self._pubsub.close()
+
+
+class RedisLeaderLock:
+    """Leader election with an expiring Redis key that the leader keeps renewing"""
+
+    # Renew or release only while the key still belongs to this node
+    RENEW_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('pexpire', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+    RELEASE_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, client, key, ttl):
+        self.client = client
+        self.key = key
+        self.ttl_ms = int(ttl * 1000)
+        self.node = node_id()
+        self.is_leader = False
+
+    def acquire(self):
+        """Take or renew leadership, returns True while this node is the leader"""
+        try:
+            if self.client.set(self.key, self.node, nx=True, px=self.ttl_ms):
+                leader = True
+            else:
+                leader = bool(self.client.eval(self.RENEW_SCRIPT, 1, self.key, self.node, self.ttl_ms))
+        except Exception as e:
+            logger.error(f"Leader election failed: {str(e)}")
+            leader = False
+
+        if leader != self.is_leader:
+            logger.info(f"Node {self.node} {'became' if leader else 'is no longer'} the CDC leader")
+        self.is_leader = leader
+        return leader
+
+    def release(self):
+        try:
+            self.client.eval(self.RELEASE_SCRIPT, 1, self.key, self.node)
+        except Exception as e:
+            logger.error(f"Leader release failed: {str(e)}")
+        self.is_leader = False
+
+
+class RedisWatermarkStore:
+    """Keeps the change feed watermark in Redis so a new leader resumes where the old one stopped"""
+
+    def __init__(self, client, key):
+        self.client = client
+        self.key = key
+
+    def load(self, source_name):
+        raw = self.client.get(self.key)
+        if not raw:
+            return None
+        data = json.loads(raw)
+        return data if data.get('source') == source_name else None
+
+    def save(self, source_name, watermark):
+        self.client.set(self.key, json.dumps(dict(watermark, source=source_name)))
+
+
+def create_pubsub(url=None):
+    """Backend for a PUBSUB_URL: unset or memory:// for in-process, redis:// for Redis"""
+    if not url or url.startswith('memory://'):
+        return InProcessPubSub()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisPubSub(url)
+    raise ValueError(f"Unsupported PUBSUB_URL scheme: {url}")
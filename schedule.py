@@ -0,0 +1,104 @@
+"""
+Schedule times for the flight board
+Turns the 'HH:MM' std/etd strings into datetimes and parses from/to windows
+"""
+
+import os
+import re
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+# Board times are local to the airport; naive datetimes in the database are in this zone
+AIRPORT_TIMEZONE = os.getenv('AIRPORT_TIMEZONE', 'UTC')
+
+# '+' decodes to a space in query strings, so unsigned offsets count forward
+_RELATIVE_BOUND = re.compile(r'^([+-]?)(\d+)([mhd])$')
+_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+
+
+def airport_now():
+    """Current airport-local time as a naive datetime"""
+    if AIRPORT_TIMEZONE == 'UTC':
+        return datetime.utcnow()
+    return datetime.now(ZoneInfo(AIRPORT_TIMEZONE)).replace(tzinfo=None)
+
+
+def schedule_datetime(value, service_date):
+    """Datetime for an 'HH:MM' (or ISO datetime) schedule string, None if it cannot be parsed"""
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return datetime.combine(service_date, time.fromisoformat(value))
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def schedule_columns(std, etd, service_date=None):
+    """Typed std_at/etd_at values for a flight's schedule strings"""
+    service_date = service_date or airport_now().date()
+    std_at = schedule_datetime(std, service_date)
+    etd_at = schedule_datetime(etd, service_date)
+    # An estimate far before the schedule has slipped past midnight
+    if std_at and etd_at and etd_at < std_at - timedelta(hours=12):
+        etd_at += timedelta(days=1)
+    return {'std_at': std_at, 'etd_at': etd_at}
+
+
+def service_date_of(std_at):
+    """Operating day of a flight, today for flights without a typed schedule yet"""
+    if isinstance(std_at, datetime):
+        return std_at.date()
+    if isinstance(std_at, date):
+        return std_at
+    return airport_now().date()
+
+
+def parse_window_bound(value, now=None):
+    """A from/to bound: 'now', relative ('-30m', '+2h', '2h', '1d'), 'HH:MM' today or an ISO datetime
+
+    Relative bounds are truncated to the minute so repeated requests share cached responses
+    """
+    value = str(value).strip()
+    now = now or airport_now()
+    if value == 'now':
+        return now.replace(second=0, microsecond=0)
+
+    match = _RELATIVE_BOUND.match(value)
+    if match:
+        sign, amount, unit = match.groups()
+        delta = timedelta(**{_UNITS[unit]: int(amount)})
+        return (now - delta if sign == '-' else now + delta).replace(second=0, microsecond=0)
+
+    bound = schedule_datetime(value, now.date())
+    if bound is None:
+        raise ValueError(f"Invalid time bound: {value}. Use now, -30m, +2h, HH:MM or an ISO datetime")
+    return bound
+
+
+def _is_time_of_day(value):
+    try:
+        time.fromisoformat(str(value).strip())
+    except ValueError:
+        return False
+    return True
+
+
+def parse_window(start=None, end=None, now=None):
+    """(from, to) datetimes for a window, either may be None, raises ValueError if invalid
+
+    A bare 'HH:MM' to at or before from crosses midnight, e.g. 22:00 to 02:00, and ends the next day
+    """
+    now = now or airport_now()
+    start_at = parse_window_bound(start, now) if start else None
+    end_at = parse_window_bound(end, now) if end else None
+    if start_at and end_at and end_at <= start_at:
+        if _is_time_of_day(end):
+            end_at += timedelta(days=1)
+        if end_at <= start_at:
+            raise ValueError("to must be later than from")
+    return start_at, end_at
@@ -0,0 +1,149 @@
+"""
+Socket.IO room subscriptions for flight updates
+Clients join rooms by page, gate, destinationCode or airline and only receive matching changes
+"""
+
+import threading
+
+# Clients that never subscribe keep receiving every change
+ALL_FLIGHTS_ROOM = 'flights:all'
+
+FILTER_FIELDS = ('gate', 'destinationCode', 'airline')
+
+
+def field_room(field, value):
+    """Room name for flights with a given column value"""
+    return f"{field}:{value}"
+
+
+def page_room(page, per_page):
+    """Room name for one page of the board"""
+    return f"page:{per_page}:{page}"
+
+
+def room_query(room):
+    """Filters, offset and limit selecting the flights a room shows"""
+    if room == ALL_FLIGHTS_ROOM:
+        return None, 0, None
+    kind, value = room.split(':', 1)
+    if kind == 'page':
+        per_page, page = (int(part) for part in value.split(':'))
+        return None, (page - 1) * per_page, per_page
+    return {kind: (value,)}, 0, None
+
+
+def rooms_from_request(data):
+    """Translate a subscribe/unsubscribe payload into room names, raises ValueError if invalid"""
+    rooms = []
+    for field in FILTER_FIELDS:
+        values = data.get(field)
+        if values is None:
+            continue
+        if not isinstance(values, list):
+            values = [values]
+        rooms.extend(field_room(field, value) for value in values)
+
+    if data.get('page') is not None:
+        page = int(data['page'])
+        per_page = int(data.get('per_page', 10))
+        if page < 1 or per_page < 1:
+            raise ValueError("page and per_page must be positive integers")
+        rooms.append(page_room(page, per_page))
+
+    if not rooms:
+        raise ValueError(f"Subscribe by one of: page, {', '.join(FILTER_FIELDS)}")
+    return rooms
+
+
+class SubscriptionIndex:
+    """Index of occupied rooms, so fan-out is a few dict lookups per change instead of a scan"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._members = {}  # room -> set of sids
+        self._client_rooms = {}  # sid -> set of rooms
+        self._pages = {}  # per_page -> set of subscribed pages
+
+    def add(self, sid, room):
+        with self._lock:
+            self._members.setdefault(room, set()).add(sid)
+            self._client_rooms.setdefault(sid, set()).add(room)
+            if room.startswith('page:'):
+                _, per_page, page = room.split(':')
+                self._pages.setdefault(int(per_page), set()).add(int(page))
+
+    def remove(self, sid, room):
+        with self._lock:
+            self._discard(sid, room)
+            rooms = self._client_rooms.get(sid)
+            if rooms is not None:
+                rooms.discard(room)
+                if not rooms:
+                    del self._client_rooms[sid]
+
+    def remove_client(self, sid):
+        """Forget every room of a disconnected client"""
+        with self._lock:
+            for room in self._client_rooms.pop(sid, set()):
+                self._discard(sid, room)
+
+    def members(self, room):
+        with self._lock:
+            return list(self._members.get(room, ()))
+
+    def rooms_of(self, sid):
+        with self._lock:
+            return set(self._client_rooms.get(sid, set()))
+
+    def _discard(self, sid, room):
+        members = self._members.get(room)
+        if members is None:
+            return
+        members.discard(sid)
+        if not members:
+            del self._members[room]
+            if room.startswith('page:'):
+                _, per_page, page = room.split(':')
+                pages = self._pages.get(int(per_page))
+                if pages is not None:
+                    pages.discard(int(page))
+                    if not pages:
+                        del self._pages[int(per_page)]
+
+    def match(self, current, previous, position, shifted=False):
+        """Occupied rooms interested in one flight change
+
+        current/previous are the row after and before the change (either may be None),
+        position is the flight's index in id order. When a row is inserted or deleted
+        (shifted) every later page changes too.
+        """
+        with self._lock:
+            rooms = set()
+            if ALL_FLIGHTS_ROOM in self._members:
+                rooms.add(ALL_FLIGHTS_ROOM)
+
+            # A flight that moved gate must also disappear from the old gate's screens
+            for row in (current, previous):
+                if not row:
+                    continue
+                for field in FILTER_FIELDS:
+                    room = field_room(field, row.get(field))
+                    if room in self._members:
+                        rooms.add(room)
+
+            if position is not None:
+                for per_page, pages in self._pages.items():
+                    page = position // per_page + 1
+                    if shifted:
+                        rooms.update(page_room(subscribed, per_page) for subscribed in pages if subscribed >= page)
+                    elif page in pages:
+                        rooms.add(page_room(page, per_page))
+
+            return rooms
+
+    def stats(self):
+        with self._lock:
+            return {
+                'clients': len(self._client_rooms),
+                'rooms': len(self._members)
+            }
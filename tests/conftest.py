@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# The app modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from change_feed import WatermarkStore  # noqa: E402
+
+Base = declarative_base()
+
+
+class Flight(Base):
+    """The columns of main.Flight the change feed reads"""
+    __tablename__ = 'flights'
+
+    id = Column(Integer, primary_key=True)
+    status = Column(String(50))
+    last_updated = Column(DateTime)
+
+
+@pytest.fixture
+def Session():
+    """Sessions on an in-memory SQLite stand-in for the flights table"""
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return WatermarkStore(str(tmp_path / 'watermark.json'))
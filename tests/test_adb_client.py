@@ -0,0 +1,163 @@
+"""AdbClient and AdbDeviceManager against the in-process fake adb server"""
+
+import socket
+import threading
+import time
+
+import pytest
+
+from adb_client import AdbClient, AdbDeviceManager, AdbError, device_serial, parse_devices
+from fake_adb_server import FakeAdbServer
+
+NETWORK_DEVICE = '192.168.1.100:5555'
+UNREACHABLE_DEVICE = '192.168.1.200:5555'
+
+
+@pytest.fixture
+def server():
+    server = FakeAdbServer(devices={'emulator-5554': 'device'}, reachable={NETWORK_DEVICE}).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client(server):
+    return AdbClient(port=server.port, timeout=5, start_server=False)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_device_serial_defaults_to_adb_port():
+    assert device_serial('192.168.1.100') == NETWORK_DEVICE
+    assert device_serial('192.168.1.100', 5556) == '192.168.1.100:5556'
+    assert device_serial(NETWORK_DEVICE, 5556) == NETWORK_DEVICE
+
+
+def test_version_and_devices(client):
+    assert client.version() == 0x29
+    assert parse_devices(client.devices()) == [{'device_id': 'emulator-5554', 'status': 'device'}]
+
+
+def test_connect(client, server):
+    assert client.connect(NETWORK_DEVICE) == f"connected to {NETWORK_DEVICE}"
+    assert client.connect(NETWORK_DEVICE) == f"already connected to {NETWORK_DEVICE}"
+    assert server.devices[NETWORK_DEVICE] == 'device'
+
+    with pytest.raises(AdbError, match='failed to connect'):
+        client.connect(UNREACHABLE_DEVICE)
+
+
+def test_shell_runs_on_the_device(client, server):
+    output = client.shell('emulator-5554', "am start -d 'https://example.com'")
+
+    assert 'https://example.com' in output
+    assert server.shell_commands == [('emulator-5554', "am start -d 'https://example.com'")]
+
+
+def test_shell_on_missing_device_fails(client):
+    with pytest.raises(AdbError, match='not found'):
+        client.shell(UNREACHABLE_DEVICE, 'echo hi')
+
+
+def test_server_not_running():
+    # A port nothing listens on
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    with pytest.raises(AdbError, match='not running'):
+        AdbClient(port=port, start_server=False).devices()
+
+
+def test_manager_shell_connects_network_devices_first(client, server):
+    manager = AdbDeviceManager(client)
+
+    manager.shell(NETWORK_DEVICE, ['input', 'keyevent', '26'])
+
+    assert server.shell_commands == [(NETWORK_DEVICE, 'input keyevent 26')]
+    assert {device['device_id']: device['status'] for device in manager.devices()}[NETWORK_DEVICE] == 'device'
+
+
+def test_manager_records_failures(client):
+    manager = AdbDeviceManager(client)
+
+    with pytest.raises(AdbError):
+        manager.shell(UNREACHABLE_DEVICE, ['echo', 'hi'])
+
+    state = {device['device_id']: device for device in manager.devices()}[UNREACHABLE_DEVICE]
+    assert state['failures'] == 1
+    assert 'failed to connect' in state['last_error']
+
+
+def test_health_check_reconnects_dropped_network_devices(client, server):
+    manager = AdbDeviceManager(client)
+    manager.connect(NETWORK_DEVICE)
+
+    server.set_device(NETWORK_DEVICE, None)
+    manager.health_check()
+
+    assert server.devices[NETWORK_DEVICE] == 'device'
+    assert {device['device_id']: device['status'] for device in manager.devices()}[NETWORK_DEVICE] == 'device'
+
+
+def test_requests_never_start_the_adb_server(monkeypatch):
+    started = []
+    monkeypatch.setattr('adb_client.subprocess.run', lambda *args, **kwargs: started.append(args))
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    client = AdbClient(port=port)
+
+    with pytest.raises(AdbError, match='not running'):
+        client.devices()
+    assert started == []
+
+    # The device manager's health check starts it
+    AdbDeviceManager(client).health_check()
+    assert started == [(['adb', '-P', str(port), 'start-server'],)]
+
+
+def test_track_devices_yields_each_change(client, server):
+    listings = client.track_devices(idle_timeout=0.1)
+    assert parse_devices(next(listings)) == [{'device_id': 'emulator-5554', 'status': 'device'}]
+
+    server.set_device('emulator-5556', 'device')
+    changed = next(raw for raw in listings if raw is not None)
+    assert [device['device_id'] for device in parse_devices(changed)] == ['emulator-5554', 'emulator-5556']
+    listings.close()
+
+
+def test_manager_refresh_reports_status_changes(client, server):
+    changes = []
+    manager = AdbDeviceManager(client, on_change=changes.append)
+
+    manager.refresh()
+    assert [(device['device_id'], device['status']) for device in manager.devices()] == [('emulator-5554', 'device')]
+    assert [(change['device_id'], change['previous_status'], change['status']) for change in changes] == [
+        ('emulator-5554', 'unknown', 'device')
+    ]
+
+    server.set_device('emulator-5554', None)
+    manager.refresh()
+    assert changes[-1]['status'] == 'disconnected'
+    assert manager.stats()['online'] == 0
+
+
+def test_manager_follows_track_devices(client, server):
+    manager = AdbDeviceManager(client, health_interval=0.1)
+    manager.running = True
+    thread = threading.Thread(target=manager.track, daemon=True)
+    thread.start()
+    try:
+        assert wait_for(lambda: manager.tracking)
+        server.set_device('emulator-5556', 'device')
+        assert wait_for(lambda: 'emulator-5556' in {device['device_id'] for device in manager.devices()})
+    finally:
+        manager.stop()
+        thread.join(timeout=5)
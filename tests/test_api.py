@@ -0,0 +1,89 @@
+"""HTTP API against a SQLite database
+
+main imports pyodbc, so these run where unixODBC is installed (the Docker image) and are skipped elsewhere.
+"""
+
+import pytest
+
+# pyodbc is installed but fails to load without libodbc, which is an ImportError rather than a missing module
+pytest.importorskip('pyodbc', exc_type=ImportError)
+
+
+@pytest.fixture(scope='module')
+def main(tmp_path_factory):
+    """main configured for a seeded SQLite file, with no background services started"""
+    tmp = tmp_path_factory.mktemp('api')
+    with pytest.MonkeyPatch.context() as env:
+        env.setenv('DATABASE_URL', f"sqlite:///{tmp / 'fids.db'}")
+        env.setenv('BOARD_SNAPSHOT_FILE', str(tmp / 'board_snapshot.json'))
+        env.setenv('CDC_WATERMARK_FILE', str(tmp / 'cdc_watermark.json'))
+        env.delenv('PUBSUB_URL', raising=False)
+        import main
+
+    main.Base.metadata.create_all(main.engine)
+    with main.Session() as session:
+        for flight_id in range(1, 26):
+            session.add(main.Flight(
+                id=flight_id, airline='BA' if flight_id % 2 else 'KL', time='10:00', destination='London',
+                destinationCode='LHR', flight=f'FL{flight_id}', std='10:00', etd='10:00',
+                gate=f'A{flight_id % 3}', status='On Time', statusClass='ontime'
+            ))
+        session.commit()
+    main.database_health.mark_available()
+    return main
+
+
+@pytest.fixture
+def client(main):
+    return main.app.test_client()
+
+
+def test_cursor_token_round_trip(main):
+    token = main.encode_cursor(20, 10, {'gate': ('A1', 'A2')}, ('06:00', '09:00'))
+
+    assert main.decode_cursor(token) == (20, 10, {'gate': ('A1', 'A2')}, ('06:00', '09:00'))
+    assert main.decode_cursor(main.encode_cursor(0, 5)) == (0, 5, None, None)
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        main.decode_cursor('not-a-cursor')
+
+
+def test_cursor_pages_walk_the_board(client):
+    seen = []
+    response = client.get('/api/flights?after_id=0&per_page=10&airline=BA')
+    while True:
+        pagination = response.get_json()['pagination']
+        seen += [flight['id'] for flight in response.get_json()['flights']]
+        if not pagination['has_next']:
+            break
+        # The token carries per_page and the filters along
+        response = client.get(f"/api/flights?cursor={pagination['next_cursor']}")
+
+    assert seen == list(range(1, 26, 2))
+    assert pagination['next_cursor'] is None
+    assert pagination['total_flights'] == 13
+
+
+def test_malformed_cursor_is_a_bad_request(client):
+    response = client.get('/api/flights?cursor=%%%')
+
+    assert response.status_code == 400
+    assert 'Invalid cursor' in response.get_json()['error']
+
+
+def test_unchanged_page_revalidates_with_304(main, client):
+    response = client.get('/api/flights?page=1&per_page=5', headers={'Accept-Encoding': 'identity'})
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+
+    revalidated = client.get('/api/flights?page=1&per_page=5', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    # Another page of the same board version is a different entity
+    assert client.get('/api/flights?page=2&per_page=5', headers={'If-None-Match': etag}).status_code == 200
+
+    row = {field: value for field, value in main.flight_cache.get_flights([1])[0].items() if field != 'version'}
+    main.flight_cache.apply_changes([dict(row, status='Delayed')])
+    changed = client.get('/api/flights?page=1&per_page=5', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()['flights'][0]['status'] == 'Delayed'
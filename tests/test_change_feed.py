@@ -0,0 +1,163 @@
+"""Timestamp change feed on a SQLite stand-in: exactly-once delivery and the overlap window"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from conftest import Flight
+
+from change_feed import TimestampChangeSource
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def write(Session, flight_id, status, last_updated):
+    with Session() as session:
+        session.merge(Flight(id=flight_id, status=status, last_updated=last_updated))
+        session.commit()
+
+
+def poll(source, Session, ack=True):
+    """Ids and statuses of one batch, acknowledged like the CDC loop does after publishing"""
+    with Session() as session:
+        batch = source.poll(session)
+        delivered = [(flight.id, flight.status) for flight in batch.flights]
+    if ack:
+        source.ack(batch)
+    return delivered
+
+
+def test_first_poll_starts_at_newest_row(Session, store):
+    write(Session, 1, 'On Time', T0)
+    write(Session, 2, 'On Time', T0 + timedelta(seconds=1))
+    source = TimestampChangeSource(Flight, store)
+
+    assert poll(source, Session) == []
+    assert source.watermark == (T0 + timedelta(seconds=1), 2)
+    assert store.load('timestamp') == {'last_updated': (T0 + timedelta(seconds=1)).isoformat(), 'id': 2, 'source': 'timestamp'}
+
+
+def test_each_row_version_is_delivered_once(Session, store):
+    write(Session, 1, 'On Time', T0)
+    source = TimestampChangeSource(Flight, store)
+    poll(source, Session)
+
+    write(Session, 1, 'Boarding', T0 + timedelta(seconds=1))
+    write(Session, 2, 'Delayed', T0 + timedelta(seconds=1))
+    assert poll(source, Session) == [(1, 'Boarding'), (2, 'Delayed')]
+    assert poll(source, Session) == []
+
+    write(Session, 1, 'Departed', T0 + timedelta(seconds=2))
+    assert poll(source, Session) == [(1, 'Departed')]
+
+
+def test_unacknowledged_batch_is_delivered_again(Session, store):
+    write(Session, 1, 'On Time', T0)
+    source = TimestampChangeSource(Flight, store)
+    poll(source, Session)
+
+    write(Session, 1, 'Boarding', T0 + timedelta(seconds=1))
+    assert poll(source, Session, ack=False) == [(1, 'Boarding')]
+    assert poll(source, Session) == [(1, 'Boarding')]
+    assert poll(source, Session) == []
+
+
+def test_late_commit_inside_overlap_window_is_picked_up_once(Session, store):
+    write(Session, 1, 'On Time', T0)
+    source = TimestampChangeSource(Flight, store, overlap_seconds=5)
+    poll(source, Session)
+    write(Session, 2, 'Boarding', T0 + timedelta(seconds=10))
+    assert poll(source, Session) == [(2, 'Boarding')]
+
+    # Stamped before the watermark, committed after the poll that moved it
+    write(Session, 3, 'Delayed', T0 + timedelta(seconds=7))
+    assert poll(source, Session) == [(3, 'Delayed')]
+    assert poll(source, Session) == []
+    assert source.watermark == (T0 + timedelta(seconds=10), 2)
+
+
+def test_late_commit_behind_overlap_window_is_not_delivered(Session, store):
+    write(Session, 1, 'On Time', T0)
+    source = TimestampChangeSource(Flight, store, overlap_seconds=5)
+    poll(source, Session)
+    write(Session, 2, 'Boarding', T0 + timedelta(seconds=10))
+    poll(source, Session)
+
+    write(Session, 3, 'Delayed', T0 + timedelta(seconds=4))
+    assert poll(source, Session) == []
+
+
+def test_batches_follow_feed_order(Session, store):
+    write(Session, 1, 'On Time', T0)
+    source = TimestampChangeSource(Flight, store, batch_size=2)
+    poll(source, Session)
+    for flight_id in (2, 3, 4):
+        write(Session, flight_id, 'Boarding', T0 + timedelta(seconds=flight_id))
+
+    with Session() as session:
+        batch = source.poll(session)
+        assert [flight.id for flight in batch.flights] == [2, 3]
+        assert batch.has_more
+    source.ack(batch)
+    assert poll(source, Session) == [(4, 'Boarding')]
+
+
+def test_restart_resumes_from_saved_watermark_without_replay(Session, store):
+    write(Session, 1, 'On Time', T0)
+    source = TimestampChangeSource(Flight, store)
+    poll(source, Session)
+    write(Session, 1, 'Boarding', T0 + timedelta(seconds=1))
+    poll(source, Session)
+
+    write(Session, 2, 'Delayed', T0 + timedelta(seconds=2))
+    restarted = TimestampChangeSource(Flight, store)
+    assert poll(restarted, Session) == [(2, 'Delayed')]
+    assert poll(restarted, Session) == []
+
+
+def test_resume_continues_from_another_nodes_watermark(Session, store):
+    write(Session, 1, 'On Time', T0)
+    leader = TimestampChangeSource(Flight, store)
+    # Started before any watermark was saved
+    standby = TimestampChangeSource(Flight, store)
+    poll(leader, Session)
+    write(Session, 1, 'Boarding', T0 + timedelta(seconds=1))
+    assert poll(leader, Session) == [(1, 'Boarding')]
+
+    # Written after the leader's last poll, then the leader goes away
+    write(Session, 2, 'Delayed', T0 + timedelta(seconds=2))
+    standby.resume()
+    assert poll(standby, Session) == [(2, 'Delayed')]
+    assert poll(standby, Session) == []
+
+
+class UnavailableStore:
+    """A watermark store whose backend (e.g. Redis) is down"""
+
+    def __init__(self, store):
+        self.store = store
+        self.down = True
+
+    def load(self, source_name):
+        if self.down:
+            raise ConnectionError('store unavailable')
+        return self.store.load(source_name)
+
+    def save(self, source_name, watermark):
+        if self.down:
+            raise ConnectionError('store unavailable')
+        self.store.save(source_name, watermark)
+
+
+def test_store_is_not_read_until_the_first_poll(Session, store):
+    write(Session, 1, 'On Time', T0)
+    leader = TimestampChangeSource(Flight, store)
+    poll(leader, Session)
+    write(Session, 1, 'Boarding', T0 + timedelta(seconds=1))
+
+    unavailable = UnavailableStore(store)
+    source = TimestampChangeSource(Flight, unavailable)
+    with pytest.raises(ConnectionError):
+        poll(source, Session)
+
+    unavailable.down = False
+    assert poll(source, Session) == [(1, 'Boarding')]
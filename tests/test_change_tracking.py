@@ -0,0 +1,112 @@
+"""Change tracking feed against SQLite with CHANGETABLE emulated by a change log table"""
+
+import re
+
+import pytest
+from conftest import Flight
+from sqlalchemy import event, text
+
+from change_feed import ChangeTrackingSource
+
+# SQL Server functions the source uses, rewritten to the change log table
+REWRITES = [
+    (re.compile(r"CHANGETABLE\(CHANGES dbo\.flights, \?\) AS ct"),
+     "(SELECT * FROM change_log WHERE SYS_CHANGE_VERSION > ?) AS ct"),
+    (re.compile(r"SELECT CHANGE_TRACKING_CURRENT_VERSION\(\)"), "SELECT MAX(SYS_CHANGE_VERSION) FROM change_log"),
+    (re.compile(r"SELECT CHANGE_TRACKING_MIN_VALID_VERSION\(OBJECT_ID\(\?\)\)"), "SELECT 0 * length(?)"),
+]
+TOP = re.compile(r"SELECT TOP \((\d+)\) (.*)", re.DOTALL)
+
+
+@pytest.fixture
+def tracked(Session):
+    """Session factory with a change log and the largest parameter count of any statement"""
+    engine = Session.kw['bind']
+    stats = {'max_parameters': 0}
+
+    @event.listens_for(engine, 'before_cursor_execute', retval=True)
+    def rewrite(conn, cursor, statement, parameters, context, executemany):
+        for pattern, replacement in REWRITES:
+            statement = pattern.sub(replacement, statement)
+        top = TOP.match(statement)
+        if top:
+            statement = f"SELECT {top.group(2)} LIMIT {top.group(1)}"
+        if not executemany:
+            stats['max_parameters'] = max(stats['max_parameters'], len(parameters))
+        return statement, parameters
+
+    with Session() as session:
+        session.execute(text(
+            "CREATE TABLE change_log (id INTEGER PRIMARY KEY, SYS_CHANGE_VERSION INTEGER, SYS_CHANGE_OPERATION TEXT)"
+        ))
+        session.execute(text("INSERT INTO change_log VALUES (0, 0, 'I')"))
+        session.commit()
+    Session.stats = stats
+    return Session
+
+
+def commit(Session, version, flights=(), deleted=()):
+    """One transaction: upsert flights and delete ids, all tagged with the same version"""
+    with Session() as session:
+        for flight_id, status in flights:
+            session.merge(Flight(id=flight_id, status=status))
+            session.execute(text("INSERT OR REPLACE INTO change_log VALUES (:id, :version, 'U')"),
+                            {'id': flight_id, 'version': version})
+        for flight_id in deleted:
+            session.execute(text("DELETE FROM flights WHERE id = :id"), {'id': flight_id})
+            session.execute(text("INSERT OR REPLACE INTO change_log VALUES (:id, :version, 'D')"),
+                            {'id': flight_id, 'version': version})
+        session.commit()
+
+
+def poll(source, Session):
+    with Session() as session:
+        batch = source.poll(session)
+        result = ([flight.id for flight in batch.flights], batch.deleted_ids, batch.watermark, batch.has_more)
+    source.ack(batch)
+    return result
+
+
+def test_changes_and_deletes_since_the_stored_version(tracked, store):
+    source = ChangeTrackingSource(Flight, store)
+    assert poll(source, tracked) == ([], [], 0, False)
+
+    commit(tracked, 1, flights=[(1, 'On Time'), (2, 'On Time')])
+    commit(tracked, 2, flights=[(1, 'Boarding')], deleted=[2])
+    assert poll(source, tracked) == ([1], [2], 2, False)
+    assert poll(source, tracked) == ([], [], 2, False)
+    assert store.load('change_tracking')['version'] == 2
+
+
+def test_batches_end_on_a_version_boundary(tracked, store):
+    source = ChangeTrackingSource(Flight, store, batch_size=3)
+    poll(source, tracked)
+    commit(tracked, 1, flights=[(1, 'On Time'), (2, 'On Time')])
+    commit(tracked, 2, flights=[(3, 'On Time'), (4, 'On Time')])
+    commit(tracked, 3, flights=[(5, 'On Time')])
+
+    # Version 2 does not fit after version 1, so the batch stops before it
+    assert poll(source, tracked) == ([1, 2], [], 1, True)
+    assert poll(source, tracked) == ([3, 4, 5], [], 3, False)
+
+
+def test_a_version_larger_than_the_batch_is_read_whole(tracked, store):
+    source = ChangeTrackingSource(Flight, store, batch_size=2)
+    poll(source, tracked)
+    commit(tracked, 1, flights=[(flight_id, 'On Time') for flight_id in range(1, 6)])
+
+    assert poll(source, tracked) == ([1, 2, 3, 4, 5], [], 1, True)
+    assert poll(source, tracked) == ([], [], 1, False)
+
+
+def test_large_backlog_binds_no_parameter_per_row(tracked, store):
+    source = ChangeTrackingSource(Flight, store, batch_size=5000)
+    poll(source, tracked)
+    commit(tracked, 1, flights=[(flight_id, 'On Time') for flight_id in range(1, 2501)])
+    tracked.stats['max_parameters'] = 0
+
+    flights, _, watermark, has_more = poll(source, tracked)
+
+    assert len(flights) == 2500
+    assert (watermark, has_more) == (1, False)
+    assert tracked.stats['max_parameters'] <= 2
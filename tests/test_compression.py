@@ -0,0 +1,52 @@
+"""Accept-Encoding negotiation and response compression"""
+
+import gzip
+
+import pytest
+from werkzeug.http import parse_accept_header as accepts
+from werkzeug.wrappers import Response
+
+from compression import ResponseCompressor
+
+BODY = b'{"flights": []}' * 100
+
+
+@pytest.fixture
+def compressor():
+    return ResponseCompressor(min_size=1024)
+
+
+def test_negotiate(compressor):
+    brotli = pytest.importorskip('brotli')
+
+    assert compressor.negotiate(accepts('gzip, deflate, br'), len(BODY)) == 'br'
+    assert compressor.negotiate(accepts('gzip;q=1.0, br;q=0.5'), len(BODY)) == 'gzip'
+    assert compressor.negotiate(accepts('br;q=0, gzip'), len(BODY)) == 'gzip'
+    assert compressor.negotiate(accepts('identity'), len(BODY)) is None
+    assert compressor.negotiate(accepts(''), len(BODY)) is None
+    # Too small to be worth it
+    assert compressor.negotiate(accepts('gzip, br'), 1023) is None
+    assert brotli.decompress(compressor.compress(BODY, 'br')) == BODY
+
+
+def test_gzip_is_deterministic():
+    sizes = []
+    compressor = ResponseCompressor(gzip_level=9, on_compressed=lambda *args: sizes.append(args))
+
+    compressed = compressor.compress(BODY, 'gzip')
+
+    assert gzip.decompress(compressed) == BODY
+    assert compressor.compress(BODY, 'gzip') == compressed
+    assert sizes[0] == ('gzip', len(BODY), len(compressed))
+    with pytest.raises(ValueError, match='Unsupported encoding'):
+        compressor.compress(BODY, 'deflate')
+    with pytest.raises(ValueError, match='gzip_level'):
+        ResponseCompressor(gzip_level=0)
+
+
+def test_compressible(compressor):
+    assert compressor.compressible(Response(BODY, mimetype='application/json'))
+    assert not compressor.compressible(Response(BODY, mimetype='image/png'))
+    assert not compressor.compressible(Response(BODY, status=404, mimetype='application/json'))
+    assert not compressor.compressible(Response(BODY, mimetype='text/csv', headers={'Content-Encoding': 'gzip'}))
+    assert not compressor.compressible(Response(iter([BODY]), mimetype='application/x-ndjson'))
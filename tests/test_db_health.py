@@ -0,0 +1,115 @@
+"""Database circuit breaker and the last-known board kept for outages"""
+
+import threading
+
+import pytest
+
+import db_health
+from db_health import DatabaseHealth
+from flight_cache import BoardSnapshotStore
+
+
+class FakeTime:
+    """Stands in for the time module inside db_health"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(db_health, 'time', fake)
+    return fake
+
+
+class Database:
+    """connect callback that is up or down and counts the probes"""
+
+    def __init__(self, up=False):
+        self.up = up
+        self.probes = 0
+
+    def connect(self):
+        self.probes += 1
+        if not self.up:
+            raise ConnectionError('Login timeout expired')
+        return True
+
+
+def test_fails_fast_between_backed_off_probes(clock):
+    database = Database()
+    health = DatabaseHealth('primary', database.connect, initial_backoff=1, max_backoff=4)
+
+    assert not health.check()
+    assert (database.probes, health.failed_attempts, health.last_error) == (1, 1, 'Login timeout expired')
+
+    # 1s, 2s, 4s, then capped at 4s between probes
+    for backoff in (1, 2, 4, 4):
+        clock.now += backoff - 0.5
+        assert not health.check()
+        probes = database.probes
+        clock.now += 0.5
+        assert not health.check()
+        assert database.probes == probes + 1
+
+    assert health.stats()['unavailable_since'] == 1000.0
+
+
+def test_reconnects_and_resets_the_backoff(clock):
+    database = Database()
+    health = DatabaseHealth('primary', database.connect, initial_backoff=1, max_backoff=60)
+    for _ in range(3):
+        health.check()
+        clock.now += 60
+
+    database.up = True
+    assert health.check()
+    assert health.stats() == {'available': True, 'unavailable_since': None, 'failed_attempts': 0, 'last_error': None}
+
+    # A failed request opens the circuit for the initial backoff only
+    probes = database.probes
+    health.mark_unavailable(ConnectionError('Communication link failure'))
+    assert not health.check()
+    clock.now += 1
+    assert health.check()
+    assert database.probes == probes + 1
+
+
+def test_one_caller_probes_at_a_time(clock):
+    probing = threading.Event()
+    release = threading.Event()
+
+    def connect():
+        probing.set()
+        release.wait(5)
+        return True
+
+    health = DatabaseHealth('primary', connect)
+    prober = threading.Thread(target=health.check)
+    prober.start()
+    probing.wait(5)
+
+    assert not health.check()
+
+    release.set()
+    prober.join(5)
+    assert health.check()
+
+
+def test_snapshot_store_round_trip(tmp_path):
+    store = BoardSnapshotStore(str(tmp_path / 'board_snapshot.json'))
+    assert store.load() is None
+
+    store.save([{'id': 1, 'gate': 'A1'}], 7)
+
+    assert store.saved_generation == 7
+    assert store.load() == {'saved_at': store.saved_at, 'generation': 7, 'flights': [{'id': 1, 'gate': 'A1'}]}
+    (tmp_path / 'board_snapshot.json').write_text('{not json')
+    assert store.load() is None
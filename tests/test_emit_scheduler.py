@@ -0,0 +1,167 @@
+"""Emit scheduler: coalescing window, per-client rate limit and slow-client handling"""
+
+import pytest
+
+import emit_scheduler
+from emit_scheduler import EmitScheduler
+
+
+class FakeTime:
+    """Stands in for the time module inside emit_scheduler"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+
+class Sockets:
+    """Room members and send queues of the clients, and everything sent to them"""
+
+    def __init__(self):
+        self.rooms = {}
+        self.backlogs = {}
+        self.sent = []  # (room, deltas, skip_sids)
+        self.caught_up = []
+        self.resynced = []
+        self.dropped = []
+        self.tasks = []
+
+    def scheduler(self, **options):
+        return EmitScheduler(
+            send=lambda room, deltas, skip_sids, generation: self.sent.append((room, deltas, skip_sids)),
+            send_to_clients=lambda sids, deltas, generation: self.sent.append((sids, deltas, [])),
+            members=lambda room: self.rooms.get(room, []),
+            backlog=lambda sid: self.backlogs.get(sid, 0),
+            catch_up=lambda sid, flight_ids: self.caught_up.append((sid, flight_ids)),
+            resync=self.resynced.append,
+            disconnect=self.dropped.append,
+            start_background_task=self.tasks.append,
+            **options
+        )
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(emit_scheduler, 'time', fake)
+    return fake
+
+
+@pytest.fixture
+def sockets():
+    return Sockets()
+
+
+def delta(flight_id, version, **changes):
+    return {'id': flight_id, 'version': version, 'changes': changes}
+
+
+def test_changes_to_a_flight_are_coalesced(clock, sockets):
+    sockets.rooms['gate:A1'] = ['a']
+    coalesced = []
+    scheduler = sockets.scheduler(on_coalesced=coalesced.append)
+
+    scheduler.submit('gate:A1', [delta(1, 2, status='Delayed'), delta(2, 5, gate='A1')])
+    scheduler.submit('gate:A1', [delta(1, 3, status='Boarding')])
+    scheduler.flush()
+
+    assert sockets.sent == [('gate:A1', [
+        {'id': 1, 'version': 3, 'since': 1, 'changes': {'status': 'Boarding'}},
+        delta(2, 5, gate='A1'),
+    ], [])]
+    assert coalesced == [1]
+    assert scheduler.stats()['pending_rooms'] == 0
+
+
+def test_rate_limited_client_catches_up_later(clock, sockets):
+    sockets.rooms['all'] = ['a', 'b']
+    throttled = []
+    scheduler = sockets.scheduler(max_rate=2, on_throttled=throttled.append)
+    scheduler.submit('all', [delta(1, 2)])
+    scheduler.flush()
+    sockets.rooms['all'] = ['a']
+
+    for version in (3, 4):
+        scheduler.submit('all', [delta(1, version), delta(version, 1)])
+        scheduler.flush()
+
+    # Two messages a second: the third is held back and nothing goes to the room
+    assert [deltas[0]['version'] for _, deltas, _ in sockets.sent] == [2, 3]
+    assert throttled == [1]
+    assert scheduler.stats()['throttled_clients'] == 1
+    assert sockets.caught_up == []
+
+    clock.now += 0.5
+    scheduler.flush()
+
+    assert sockets.caught_up == [('a', [1, 4])]
+    assert scheduler.stats()['throttled_clients'] == 0
+
+
+def test_backlog_over_the_limit_pauses_then_resyncs(clock, sockets):
+    sockets.rooms['all'] = ['a', 'b']
+    sockets.backlogs['a'] = 11
+    slow = []
+    scheduler = sockets.scheduler(max_backlog=10, on_slow_client=slow.append)
+
+    scheduler.submit('all', [delta(1, 2)])
+    scheduler.flush()
+
+    assert sockets.sent == [('all', [delta(1, 2)], ['a'])]
+    assert slow == ['resync']
+    assert scheduler.stats()['slow_clients'] == 1
+
+    # Still draining: no resync yet
+    sockets.backlogs['a'] = 6
+    scheduler.flush()
+    assert sockets.resynced == []
+
+    sockets.backlogs['a'] = 5
+    scheduler.flush()
+    assert sockets.resynced == ['a']
+    assert scheduler.stats()['slow_clients'] == 0
+
+
+def test_slow_client_is_dropped(clock, sockets):
+    sockets.rooms['all'] = ['a']
+    sockets.backlogs['a'] = 11
+    slow = []
+    scheduler = sockets.scheduler(max_backlog=10, slow_client_action='drop', on_slow_client=slow.append)
+
+    scheduler.submit('all', [delta(1, 2)])
+    scheduler.flush()
+
+    assert sockets.dropped == ['a']
+    assert sockets.sent == []
+    assert slow == ['drop']
+    assert scheduler.stats()['slow_clients'] == 0
+    with pytest.raises(ValueError, match='slow_client_action'):
+        sockets.scheduler(slow_client_action='ignore')
+
+
+def test_flush_waits_out_the_window(clock, sockets):
+    sockets.rooms['all'] = ['a']
+    scheduler = None
+
+    def sleep(seconds):
+        # A change arriving during the window goes out in the same flush
+        assert seconds == 0.05
+        scheduler.submit('all', [delta(2, 1)])
+        scheduler.stop()
+
+    scheduler = sockets.scheduler(sleep=sleep)
+    scheduler.submit('all', [delta(1, 2, status='Delayed')])
+    scheduler.submit('all', [delta(1, 3, gate='B2')])
+    assert len(sockets.tasks) == 1 and sockets.sent == []
+
+    sockets.tasks[0]()
+
+    assert sockets.sent == [('all', [
+        {'id': 1, 'version': 3, 'since': 1, 'changes': {'status': 'Delayed', 'gate': 'B2'}},
+        delta(2, 1),
+    ], [])]
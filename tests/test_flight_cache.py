@@ -0,0 +1,261 @@
+"""In-memory board snapshot: paging, freshness, deltas, board queries, serialized pages and reconciliation"""
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+import flight_cache
+from flight_cache import FlightBoardCache, merge_delta, parse_flight_query
+
+
+class FakeTime:
+    """Stands in for the time module inside flight_cache"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(flight_cache, 'time', fake)
+    return fake
+
+
+def flight(flight_id, gate='A1', status='On Time', **fields):
+    return dict({'id': flight_id, 'gate': gate, 'destinationCode': 'LHR', 'airline': 'BA', 'status': status,
+                 'std_at': None, 'etd_at': None}, **fields)
+
+
+def changes_of(row):
+    """Delta changes of an inserted row"""
+    return {field: value for field, value in row.items() if field != 'id'}
+
+
+def test_pages_come_from_memory_while_fresh(clock):
+    cache = FlightBoardCache(max_staleness=10)
+    assert cache.get_page(1, 10) is None
+    cache.load([flight(flight_id) for flight_id in range(1, 26)])
+
+    page = cache.get_page(3, 10)
+
+    assert [row['id'] for row in page['flights']] == [21, 22, 23, 24, 25]
+    assert page['pagination'] == {
+        'current_page': 3, 'per_page': 10, 'total_flights': 25, 'total_pages': 3,
+        'has_next': False, 'has_prev': True, 'next_page': 1, 'prev_page': 2
+    }
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_stale_snapshot_is_a_miss_until_touched(clock):
+    cache = FlightBoardCache(max_staleness=10)
+    cache.load([flight(1)])
+
+    clock.now += 11
+    assert cache.get_page(1, 10) is None
+
+    cache.touch()
+    assert cache.get_page(1, 10) is not None
+
+    cache.invalidate()
+    assert cache.get_page(1, 10) is None
+
+
+def test_last_known_board_is_never_fresh(clock):
+    cache = FlightBoardCache()
+    cache.load([flight(1)], fresh=False, confirmed_at=500.0)
+
+    cache.touch()
+
+    assert not cache.is_fresh()
+    assert cache.has_data()
+    assert cache.confirmed_at == 500.0
+
+
+def test_reconcile_is_due_even_while_polls_keep_it_fresh(clock):
+    cache = FlightBoardCache(max_staleness=10, reconcile_interval=60)
+    assert not cache.reconcile_due()
+    cache.load([flight(1)])
+
+    for _ in range(7):
+        clock.now += 9
+        cache.touch()
+
+    assert cache.is_fresh()
+    assert cache.reconcile_due()
+    cache.load([flight(1)])
+    assert not cache.reconcile_due()
+    assert cache.stats()['last_reconcile_age_seconds'] == 0
+
+
+def test_keyset_pages_follow_after_id(clock):
+    cache = FlightBoardCache()
+    cache.load([flight(flight_id) for flight_id in (2, 4, 6, 8, 10)])
+
+    first = cache.get_page_after(0, 2)
+    assert [row['id'] for row in first['flights']] == [2, 4]
+    assert first['pagination'] == {
+        'mode': 'cursor', 'per_page': 2, 'after_id': 0, 'has_next': True, 'next_after_id': 4, 'total_flights': 5
+    }
+
+    # A deleted row does not shift the next page
+    cache.remove([4])
+    second = cache.get_page_after(4, 2, include_total=False)
+    assert [row['id'] for row in second['flights']] == [6, 8]
+    assert 'total_flights' not in second['pagination']
+
+    last = cache.get_page_after(8, 2)
+    assert [row['id'] for row in last['flights']] == [10]
+    assert (last['pagination']['has_next'], last['pagination']['next_after_id']) == (False, None)
+
+
+def test_changes_become_field_level_deltas(clock):
+    cache = FlightBoardCache()
+    cache.load([flight(1), flight(2)])
+    generation = cache.generation
+
+    deltas = cache.apply_changes([flight(1, gate='B7', status='Boarding'), flight(2), flight(3)])
+
+    assert deltas == [
+        {'id': 1, 'version': 2, 'changes': {'gate': 'B7', 'status': 'Boarding'}},
+        {'id': 3, 'version': 1, 'changes': changes_of(flight(3))},
+    ]
+    assert cache.generation == generation + 1
+    assert cache.get_flights([1])[0]['version'] == 2
+    # The same row read again produces nothing
+    assert cache.apply_changes([flight(1, gate='B7', status='Boarding')]) == []
+    assert cache.generation == generation + 1
+
+
+def test_older_row_version_is_ignored(clock):
+    cache = FlightBoardCache()
+    cache.load([flight(1, last_updated='2026-01-01T10:05:00')])
+
+    assert cache.apply_changes([flight(1, gate='Z9', last_updated='2026-01-01T10:00:00')]) == []
+    assert cache.get_flights([1])[0]['gate'] == 'A1'
+
+
+def test_remove_and_reload_deltas(clock):
+    cache = FlightBoardCache()
+    assert cache.load([flight(1), flight(2), flight(3)]) == []
+
+    assert cache.remove([2, 99]) == [{'id': 2, 'version': 2, 'deleted': True}]
+
+    # A full read finds what the feed missed
+    deltas = cache.load([flight(1, status='Delayed'), flight(4)])
+    assert {'id': 1, 'version': 2, 'changes': {'status': 'Delayed'}} in deltas
+    assert {'id': 3, 'version': 2, 'deleted': True} in deltas
+    assert {'id': 4, 'version': 1, 'changes': changes_of(flight(4))} in deltas
+    assert [row['id'] for row in cache.flights()[0]] == [1, 4]
+
+
+def test_merge_delta():
+    first = {'id': 1, 'version': 3, 'changes': {'gate': 'B7', 'status': 'Delayed'}}
+    second = {'id': 1, 'version': 4, 'changes': {'status': 'Boarding'}}
+    deleted = {'id': 1, 'version': 5, 'deleted': True}
+
+    assert merge_delta(None, first) is first
+    assert merge_delta(first, second) == {
+        'id': 1, 'version': 4, 'since': 2, 'changes': {'gate': 'B7', 'status': 'Boarding'}
+    }
+    assert merge_delta(merge_delta(first, second), deleted) is deleted
+    # Inserted again after a delete: the new row replaces the old one
+    reinserted = {'id': 1, 'version': 1, 'changes': {'gate': 'C1'}}
+    assert merge_delta(deleted, reinserted) is reinserted
+
+
+def test_parse_flight_query():
+    args = MultiDict([('gate', 'A1, A2'), ('gate', 'A2'), ('airline', 'BA'), ('sort', '-etd'), ('page', '2')])
+    assert parse_flight_query(args) == ({'gate': ('A1', 'A2'), 'airline': ('BA',)}, ('etd', True), None)
+
+    # Socket payloads pass lists
+    assert parse_flight_query({'status': ['Delayed', 'Boarding'], 'sort': 'std'}) == (
+        {'status': ('Delayed', 'Boarding')}, ('std', False), None
+    )
+    assert parse_flight_query({'gate': ''}) == (None, None, None)
+    with pytest.raises(ValueError, match='Invalid sort field'):
+        parse_flight_query({'sort': 'gate'})
+
+
+def test_filters_and_sort_follow_changes(clock):
+    cache = FlightBoardCache()
+    cache.load([
+        flight(1, gate='A1', airline='BA', etd_at='2026-01-01T10:30:00'),
+        flight(2, gate='A2', airline='KL', etd_at='2026-01-01T09:00:00'),
+        flight(3, gate='A1', airline='KL', etd_at='2026-01-01T11:00:00'),
+        flight(4, gate='B1', airline='BA', etd_at='2026-01-01T08:00:00'),
+    ])
+
+    # Any of a field's values, every field
+    assert cache.select_ids({'gate': ('A1', 'A2'), 'airline': ('KL',)}) == [2, 3]
+    assert cache.select_ids({'gate': ('Z9',)}) == []
+    assert cache.select_ids(sort=('etd', False)) == [4, 2, 1, 3]
+    assert cache.select_ids({'airline': ('BA',)}, sort=('etd', True)) == [1, 4]
+
+    cache.apply_changes([flight(3, gate='B1', airline='KL', etd_at='2026-01-01T07:00:00')])
+    cache.remove([2])
+    assert cache.select_ids({'gate': ('A1', 'A2')}) == [1]
+    assert cache.select_ids({'gate': ('B1',)}, sort=('etd', False)) == [3, 4]
+    assert cache.select_ids(sort=('etd', True)) == [1, 4, 3]
+
+
+def test_page_echoes_the_query(clock):
+    cache = FlightBoardCache()
+    cache.load([flight(1, gate='A1'), flight(2, gate='A2'), flight(3, gate='A1')])
+
+    page = cache.get_page(1, 10, filters={'gate': ('A1',)}, sort=('std', True))
+
+    assert [row['id'] for row in page['flights']] == [3, 1]
+    assert page['pagination']['total_flights'] == 2
+    assert (page['filters'], page['sort']) == ({'gate': ['A1']}, '-std')
+
+
+def test_changes_since_a_board_version(clock):
+    cache = FlightBoardCache(changelog_size=2)
+    cache.load([flight(1), flight(2)])
+    board_version = cache.etag()
+    assert cache.changes_since(board_version) == []
+
+    cache.apply_changes([flight(1, status='Delayed')])
+    cache.apply_changes([flight(1, status='Boarding')])
+
+    # Merged per flight, on top of the version the client held
+    assert cache.changes_since(board_version) == [
+        {'id': 1, 'version': 3, 'since': 1, 'changes': {'status': 'Boarding'}}
+    ]
+    assert cache.changes_since(f"{cache.epoch}-{cache.generation + 1}") is None
+    # Another process, or a version the changelog no longer reaches
+    assert cache.changes_since(f"other-{cache.generation}") is None
+    cache.remove([2])
+    assert cache.changes_since(board_version) is None
+
+
+def test_reload_differences_reach_the_changelog(clock):
+    cache = FlightBoardCache()
+    cache.load([flight(1)])
+    board_version = cache.etag()
+
+    cache.load([flight(1, gate='C3')])
+
+    assert cache.changes_since(board_version) == [{'id': 1, 'version': 2, 'changes': {'gate': 'C3'}}]
+    assert FlightBoardCache().changes_since(board_version) is None
+
+
+def test_serialized_pages_last_one_generation(clock):
+    cache = FlightBoardCache()
+    cache.load([flight(1)])
+    key = ('page', 1, 10, None, None, None)
+    cache.put_serialized(key, cache.generation, {'identity': b'{}'})
+    assert cache.get_serialized(key) == (cache.etag(), {'identity': b'{}'})
+
+    # A body built from an older generation is not kept
+    cache.put_serialized(('page', 2, 10, None, None, None), cache.generation - 1, {'identity': b'{}'})
+    assert cache.get_serialized(('page', 2, 10, None, None, None)) is None
+
+    cache.apply_changes([flight(1, status='Delayed')])
+    assert cache.get_serialized(key) is None
@@ -0,0 +1,79 @@
+"""Import/export row handling: validation, parsing and streaming"""
+
+import io
+
+import pytest
+
+from flight_io import chunked, export_lines, iter_rows, resolve_format, validate_row
+
+FIELDS = ['gate', 'status']
+MAX_LENGTHS = {'gate': 10, 'status': 50}
+
+
+def test_validate_row_returns_id_and_stripped_fields():
+    assert validate_row({'id': '12', 'gate': ' B4 ', 'other': 'x'}, FIELDS, MAX_LENGTHS) == (12, {'gate': 'B4'})
+    assert validate_row({'status': 'Boarding'}, FIELDS, MAX_LENGTHS) == (None, {'status': 'Boarding'})
+    assert validate_row({'id': 3, 'gate': 7}, FIELDS, MAX_LENGTHS) == (3, {'gate': '7'})
+
+
+@pytest.mark.parametrize('row, error', [
+    ({'id': 'abc'}, 'Invalid id'),
+    ({'id': 0}, 'Invalid id'),
+    ({'id': 2, 'gate': None}, 'gate cannot be null'),
+    ({'id': 2, 'gate': {'terminal': 'A'}}, 'gate must be a string'),
+    ({'id': 2, 'gate': ['A1']}, 'gate must be a string'),
+    ({'id': 2, 'gate': True}, 'gate must be a string'),
+    ({'id': 2, 'gate': 'X' * 11}, 'gate is longer than 10 characters'),
+])
+def test_validate_row_rejects(row, error):
+    with pytest.raises(ValueError, match=error):
+        validate_row(row, FIELDS, MAX_LENGTHS)
+
+
+def test_resolve_format():
+    assert resolve_format('csv') == 'csv'
+    assert resolve_format(None, 'application/x-ndjson; charset=utf-8') == 'ndjson'
+    assert resolve_format(None, 'text/csv') == 'csv'
+    with pytest.raises(ValueError, match='Invalid format'):
+        resolve_format('xml')
+    with pytest.raises(ValueError, match='Specify format'):
+        resolve_format(None, 'application/json')
+
+
+def test_csv_rows_skip_empty_cells():
+    stream = io.BytesIO(b'\xef\xbb\xbfid,gate,status\r\n1,B4,\r\n,A1,Boarding\r\n')
+
+    assert list(iter_rows(stream, 'csv')) == [(2, {'id': '1', 'gate': 'B4'}), (3, {'gate': 'A1', 'status': 'Boarding'})]
+
+
+def test_ndjson_rows_report_bad_lines_and_drop_nulls():
+    stream = io.BytesIO(b'{"id": 1, "gate": null, "status": "Delayed"}\n\nnot json\n[1, 2]\n')
+
+    rows = list(iter_rows(stream, 'ndjson'))
+
+    assert rows[0] == (1, {'id': 1, 'status': 'Delayed'})
+    assert rows[1][0] == 3 and rows[1][1].startswith('Invalid JSON')
+    assert rows[2] == (4, 'Each line must be a JSON object')
+
+
+def test_chunked_does_not_read_ahead():
+    read = []
+
+    def items():
+        for item in range(5):
+            read.append(item)
+            yield item
+
+    chunks = chunked(items(), 2)
+    assert next(chunks) == [0, 1]
+    assert read == [0, 1]
+    assert list(chunks) == [[2, 3], [4]]
+
+
+def test_export_lines_stream_one_row_at_a_time():
+    flights = [{'id': 1, 'gate': 'B4', 'status': 'On Time'}, {'id': 2, 'gate': 'A1, east', 'status': None}]
+
+    assert list(export_lines(flights, 'csv', ['id', 'gate'])) == ['id,gate\r\n1,B4\r\n', '2,"A1, east"\r\n']
+    assert list(export_lines(flights, 'ndjson', ['id', 'status'])) == [
+        '{"id": 1, "status": "On Time"}\n', '{"id": 2, "status": null}\n'
+    ]
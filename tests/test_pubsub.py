@@ -0,0 +1,124 @@
+"""In-process pub/sub fan-out and CDC leader handoff between nodes sharing a bus and watermark"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from conftest import Flight
+
+from change_feed import TimestampChangeSource
+from pubsub import InProcessLeaderLock, InProcessPubSub, create_pubsub
+
+CHANNEL = 'fids:flight_changes'
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def test_publish_fans_out_to_every_subscriber():
+    bus = InProcessPubSub()
+    first, second, other = [], [], []
+    bus.subscribe(CHANNEL, first.append)
+    bus.subscribe(CHANNEL, second.append)
+    bus.subscribe('fids:other', other.append)
+
+    bus.publish(CHANNEL, {'flights': [1]})
+
+    assert first == second == [{'flights': [1]}]
+    assert other == []
+
+
+def test_failing_subscriber_does_not_stop_the_others():
+    bus = InProcessPubSub()
+    received = []
+
+    def broken(message):
+        raise RuntimeError('socket gone')
+
+    bus.subscribe(CHANNEL, broken)
+    bus.subscribe(CHANNEL, received.append)
+
+    bus.publish(CHANNEL, {'flights': [1]})
+
+    assert received == [{'flights': [1]}]
+
+
+def test_close_drops_subscribers():
+    bus = InProcessPubSub()
+    received = []
+    bus.subscribe(CHANNEL, received.append)
+
+    bus.close()
+    bus.publish(CHANNEL, {'flights': [1]})
+
+    assert received == []
+
+
+def test_create_pubsub_picks_backend_from_url():
+    assert isinstance(create_pubsub(None), InProcessPubSub)
+    assert isinstance(create_pubsub('memory://'), InProcessPubSub)
+    with pytest.raises(ValueError, match='Unsupported PUBSUB_URL'):
+        create_pubsub('amqp://localhost')
+
+
+def test_in_process_leader_lock():
+    lock = InProcessPubSub().leader_lock('fids:cdc_leader', ttl=10)
+    assert isinstance(lock, InProcessLeaderLock)
+    assert not lock.is_leader
+
+    assert lock.acquire()
+    assert lock.is_leader
+    lock.release()
+    assert not lock.is_leader
+
+
+class Node:
+    """One API node: publishes when it leads, fans out whatever arrives on the bus"""
+
+    def __init__(self, bus, store):
+        self.bus = bus
+        self.leader = bus.leader_lock('fids:cdc_leader', ttl=10)
+        self.source = TimestampChangeSource(Flight, store)
+        self.received = []
+        bus.subscribe(CHANNEL, self.received.append)
+
+    def step(self, Session):
+        """One pass of the CDC loop in main.monitor_cdc_changes"""
+        was_leader = self.leader.is_leader
+        if not self.leader.acquire():
+            return
+        if not was_leader:
+            self.source.resume()
+
+        with Session() as session:
+            batch = self.source.poll(session)
+            changes = [[flight.id, flight.status] for flight in batch.flights]
+        if changes:
+            self.bus.publish(CHANNEL, changes)
+        self.source.ack(batch)
+
+
+def write(Session, flight_id, status, last_updated):
+    with Session() as session:
+        session.merge(Flight(id=flight_id, status=status, last_updated=last_updated))
+        session.commit()
+
+
+def test_leader_handoff_delivers_every_change_once(Session, store):
+    bus = InProcessPubSub()
+    write(Session, 1, 'On Time', T0)
+    a = Node(bus, store)
+    # Started together, so b's own watermark would replay what a already published
+    b = Node(bus, store)
+
+    a.step(Session)
+    write(Session, 1, 'Boarding', T0 + timedelta(seconds=1))
+    a.step(Session)
+    write(Session, 2, 'Delayed', T0 + timedelta(seconds=2))
+    a.leader.release()
+
+    b.step(Session)
+    write(Session, 1, 'Departed', T0 + timedelta(seconds=3))
+    b.step(Session)
+    b.step(Session)
+
+    expected = [[[1, 'Boarding']], [[2, 'Delayed']], [[1, 'Departed']]]
+    assert a.received == expected
+    assert b.received == expected
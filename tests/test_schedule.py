@@ -0,0 +1,63 @@
+"""Schedule strings to datetimes and from/to window bounds"""
+
+from datetime import date, datetime
+
+import pytest
+
+from schedule import parse_window, parse_window_bound, schedule_columns, service_date_of
+
+NOW = datetime(2026, 3, 14, 21, 47, 31)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('now', datetime(2026, 3, 14, 21, 47)),
+    ('-30m', datetime(2026, 3, 14, 21, 17)),
+    ('+2h', datetime(2026, 3, 14, 23, 47)),
+    # An unsigned offset counts forward, '+' arrives as a space in query strings
+    (' 2h', datetime(2026, 3, 14, 23, 47)),
+    ('1d', datetime(2026, 3, 15, 21, 47)),
+    ('06:30', datetime(2026, 3, 14, 6, 30)),
+    ('2026-03-16T08:00:00', datetime(2026, 3, 16, 8, 0)),
+    ('2026-03-16T08:00:00+02:00', datetime(2026, 3, 16, 8, 0)),
+])
+def test_parse_window_bound(value, expected):
+    assert parse_window_bound(value, NOW) == expected
+
+
+def test_parse_window_bound_rejects_garbage():
+    with pytest.raises(ValueError, match='Invalid time bound'):
+        parse_window_bound('tomorrow', NOW)
+
+
+def test_parse_window_open_ended():
+    assert parse_window('now', None, NOW) == (datetime(2026, 3, 14, 21, 47), None)
+    assert parse_window(None, '23:00', NOW) == (None, datetime(2026, 3, 14, 23, 0))
+
+
+def test_parse_window_overnight_rolls_to_to_the_next_day():
+    assert parse_window('22:00', '02:00', NOW) == (datetime(2026, 3, 14, 22, 0), datetime(2026, 3, 15, 2, 0))
+    assert parse_window('now', '01:30', NOW) == (datetime(2026, 3, 14, 21, 47), datetime(2026, 3, 15, 1, 30))
+
+
+@pytest.mark.parametrize('start, end', [
+    ('+2h', '-30m'),
+    ('now', 'now'),
+    ('2026-03-16T08:00:00', '02:00'),
+])
+def test_parse_window_rejects_backwards_windows(start, end):
+    with pytest.raises(ValueError, match='to must be later than from'):
+        parse_window(start, end, NOW)
+
+
+def test_schedule_columns():
+    assert schedule_columns('10:15', '10:40', date(2026, 3, 14)) == {
+        'std_at': datetime(2026, 3, 14, 10, 15), 'etd_at': datetime(2026, 3, 14, 10, 40)
+    }
+    # An estimate far before the schedule has slipped past midnight
+    assert schedule_columns('23:50', '00:20', date(2026, 3, 14))['etd_at'] == datetime(2026, 3, 15, 0, 20)
+    assert schedule_columns('TBA', None, date(2026, 3, 14)) == {'std_at': None, 'etd_at': None}
+
+
+def test_service_date_of():
+    assert service_date_of(datetime(2026, 3, 14, 23, 50)) == date(2026, 3, 14)
+    assert service_date_of(date(2026, 3, 14)) == date(2026, 3, 14)
@@ -0,0 +1,69 @@
+"""Room names from subscribe payloads and matching flight changes to occupied rooms"""
+
+import pytest
+
+from subscriptions import ALL_FLIGHTS_ROOM, SubscriptionIndex, room_query, rooms_from_request
+
+
+def flight(gate='A1', destinationCode='LHR', airline='BA'):
+    return {'gate': gate, 'destinationCode': destinationCode, 'airline': airline}
+
+
+def test_rooms_from_request():
+    assert rooms_from_request({'gate': ['A1', 'A2'], 'airline': 'BA', 'page': 2, 'per_page': 20}) == [
+        'gate:A1', 'gate:A2', 'airline:BA', 'page:20:2'
+    ]
+    with pytest.raises(ValueError, match='positive'):
+        rooms_from_request({'page': 0})
+    with pytest.raises(ValueError, match='Subscribe by one of'):
+        rooms_from_request({'terminal': 'B'})
+
+
+def test_room_query():
+    assert room_query(ALL_FLIGHTS_ROOM) == (None, 0, None)
+    assert room_query('page:20:3') == (None, 40, 20)
+    assert room_query('gate:A1') == ({'gate': ('A1',)}, 0, None)
+
+
+def test_match_only_occupied_rooms():
+    index = SubscriptionIndex()
+    index.add('s1', 'gate:A1')
+    index.add('s2', 'airline:KL')
+
+    assert index.match(flight(), None, 0) == {'gate:A1'}
+    assert index.match(flight(gate='C3'), None, 0) == set()
+
+
+def test_gate_change_reaches_old_and_new_gate():
+    index = SubscriptionIndex()
+    index.add('s1', 'gate:A1')
+    index.add('s2', 'gate:B2')
+
+    assert index.match(flight(gate='B2'), flight(gate='A1'), 0) == {'gate:A1', 'gate:B2'}
+
+
+def test_page_rooms_by_position():
+    index = SubscriptionIndex()
+    index.add('s1', 'page:10:1')
+    index.add('s2', 'page:10:3')
+
+    assert index.match(flight(), None, 25) == {'page:10:3'}
+    assert index.match(flight(), None, 15) == set()
+    # An insert or delete moves every later row, so later pages change too
+    assert index.match(flight(), None, 5, shifted=True) == {'page:10:1', 'page:10:3'}
+    assert index.match(flight(), None, 15, shifted=True) == {'page:10:3'}
+
+
+def test_leaving_rooms():
+    index = SubscriptionIndex()
+    index.add('s1', 'page:10:1')
+    index.add('s1', 'gate:A1')
+    index.add('s2', ALL_FLIGHTS_ROOM)
+
+    index.remove('s1', 'page:10:1')
+    assert index.match(flight(), None, 0) == {'gate:A1', ALL_FLIGHTS_ROOM}
+
+    index.remove_client('s1')
+    assert index.rooms_of('s1') == set()
+    assert index.match(flight(), None, 0) == {ALL_FLIGHTS_ROOM}
+    assert index.stats() == {'clients': 1, 'rooms': 1}
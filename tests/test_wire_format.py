@@ -0,0 +1,66 @@
+"""Compact and msgpack encodings of flight payloads"""
+
+import pytest
+
+from wire_format import (ClientEncodings, available_encodings, decode_payload, decode_table, encode_payload,
+                         encode_table, wire_room)
+
+BOARD = [
+    {'id': 1, 'airline': 'Emirates', 'gate': 'A1', 'status': 'On Time', 'std_at': '2026-01-01T10:00:00'},
+    {'id': 2, 'airline': 'Emirates', 'gate': 'A2', 'status': 'On Time', 'std_at': None},
+    {'id': 3, 'airline': 'KLM', 'gate': 'A1', 'status': 'Delayed', 'std_at': '2026-01-01T11:00:00'},
+]
+DELTAS = [
+    {'id': 1, 'version': 4, 'gate': 'B7'},
+    {'id': 3, 'version': 2, 'status': 'Boarding', 'since': 1},
+]
+
+
+def test_full_rows_share_field_names_and_strings():
+    table = encode_table(BOARD)
+
+    assert table['fields'] == ['id', 'airline', 'gate', 'status', 'std_at']
+    assert table['dictionaries'] == {'airline': ['Emirates', 'KLM'], 'gate': ['A1', 'A2'],
+                                     'status': ['On Time', 'Delayed']}
+    assert table['rows'][2] == [3, 1, 0, 1, '2026-01-01T11:00:00']
+    assert not table['sparse']
+    assert decode_table(table) == BOARD
+
+
+def test_sparse_rows_carry_a_field_mask():
+    table = encode_table(DELTAS)
+
+    assert table['sparse']
+    assert table['rows'][0] == [0b0111, 1, 4, 0]
+    assert decode_table(table) == DELTAS
+    assert decode_table(encode_table([])) == []
+
+
+@pytest.mark.parametrize('encoding', available_encodings())
+def test_payload_round_trip(encoding):
+    payload = {'success': True, 'generation': 7, 'flights': BOARD}
+
+    encoded = encode_payload(payload, encoding, 'flights')
+
+    assert isinstance(encoded, bytes) == (encoding == 'msgpack')
+    assert decode_payload(encoded, 'flights') == (payload if encoding == 'json' else dict(payload, encoding=encoding))
+    with pytest.raises(ValueError, match='Unsupported encoding'):
+        encode_payload(payload, 'xml', 'flights')
+
+
+def test_client_encodings():
+    encodings = ClientEncodings()
+    encodings.set('a', 'compact')
+    encodings.set('b', 'compact')
+    encodings.set('c', 'json')
+
+    assert encodings.in_use() == ['json', 'compact']
+    assert wire_room('gate:A1', encodings.get('a')) == 'compact|gate:A1'
+    assert wire_room('gate:A1', encodings.get('c')) == 'gate:A1'
+
+    encodings.set('a', 'json')
+    encodings.remove('b')
+    assert encodings.in_use() == ['json']
+    assert encodings.stats() == {}
+    with pytest.raises(ValueError, match='Use one of'):
+        encodings.set('a', 'xml')
@@ -0,0 +1,159 @@
+"""
+Compact wire encodings for flight payloads on the websocket
+Clients opt in per connection; JSON dicts stay the default
+
+The 'compact' table layout sends each field name once and each repeated string once:
+
+    {'fields': ['id', 'airline', ...],
+     'dictionaries': {'airline': ['Emirates', ...]},
+     'rows': [[1, 0, ...], ...],
+     'sparse': False}
+
+Values of dictionary fields are indexes into their dictionary. When rows do not all carry the
+same fields (deltas), 'sparse' is True and each row starts with a bitmask of the fields present,
+followed by their values in field order. 'msgpack' sends the same layout as MessagePack binary.
+"""
+
+import threading
+
+try:
+    import msgpack  # optional dependency, only needed for the msgpack encoding
+except ImportError:
+    msgpack = None
+
+DEFAULT_ENCODING = 'json'
+
+# String columns whose values repeat across the board
+DICTIONARY_FIELDS = ('airline', 'logo', 'destination', 'destinationCode', 'gate', 'status', 'statusClass')
+
+
+def available_encodings():
+    return ('json', 'compact', 'msgpack') if msgpack is not None else ('json', 'compact')
+
+
+def wire_room(room, encoding):
+    """Socket.IO room for the clients of a subscription room that use an encoding"""
+    return room if encoding == DEFAULT_ENCODING else f"{encoding}|{room}"
+
+
+def encode_table(rows):
+    """Table layout for a list of row dicts"""
+    fields = []
+    positions = {}
+    for row in rows:
+        for field in row:
+            if field not in positions:
+                positions[field] = len(fields)
+                fields.append(field)
+
+    dictionaries = {}
+    lookups = {}
+    masks = []
+    encoded = []
+    for row in rows:
+        mask = 0
+        values = []
+        for position, field in enumerate(fields):
+            if field not in row:
+                continue
+            mask |= 1 << position
+            value = row[field]
+            if field in DICTIONARY_FIELDS and isinstance(value, str):
+                lookup = lookups.setdefault(field, {})
+                if value not in lookup:
+                    lookup[value] = len(lookup)
+                    dictionaries.setdefault(field, []).append(value)
+                value = lookup[value]
+            values.append(value)
+        masks.append(mask)
+        encoded.append(values)
+
+    full = (1 << len(fields)) - 1
+    sparse = any(mask != full for mask in masks)
+    if sparse:
+        encoded = [[mask] + values for mask, values in zip(masks, encoded)]
+    return {'fields': fields, 'dictionaries': dictionaries, 'rows': encoded, 'sparse': sparse}
+
+
+def decode_table(table):
+    """Row dicts from the table layout"""
+    fields = table['fields']
+    dictionaries = list(table['dictionaries'].items())
+    rows = []
+    for encoded in table['rows']:
+        if table['sparse']:
+            mask = encoded[0]
+            row = dict(zip([field for position, field in enumerate(fields) if mask & (1 << position)], encoded[1:]))
+        else:
+            row = dict(zip(fields, encoded))
+        for field, dictionary in dictionaries:
+            value = row.get(field)
+            if value is not None:
+                row[field] = dictionary[value]
+        rows.append(row)
+    return rows
+
+
+def encode_payload(payload, encoding, table_key):
+    """Event payload in a client encoding, with the row list under table_key in the table layout"""
+    if encoding == DEFAULT_ENCODING:
+        return payload
+    if encoding not in available_encodings():
+        raise ValueError(f"Unsupported encoding: {encoding}")
+    compact = dict(payload, encoding=encoding)
+    if payload.get(table_key) is not None:
+        compact[table_key] = encode_table(payload[table_key])
+    if encoding == 'msgpack':
+        return msgpack.packb(compact, use_bin_type=True)
+    return compact
+
+
+def decode_payload(data, table_key):
+    """Inverse of encode_payload, for Python clients and the benchmark"""
+    if isinstance(data, (bytes, bytearray)):
+        data = msgpack.unpackb(data, raw=False)
+    if data.get('encoding', DEFAULT_ENCODING) != DEFAULT_ENCODING and data.get(table_key) is not None:
+        data = dict(data, **{table_key: decode_table(data[table_key])})
+    return data
+
+
+class ClientEncodings:
+    """Encoding negotiated by each connected client, so broadcasts are encoded only for formats in use"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._encodings = {}  # sid -> encoding, default encoding clients are not stored
+        self._counts = {}
+
+    def get(self, sid):
+        with self._lock:
+            return self._encodings.get(sid, DEFAULT_ENCODING)
+
+    def set(self, sid, encoding):
+        if encoding not in available_encodings():
+            raise ValueError(f"Unsupported encoding: {encoding}. Use one of: {', '.join(available_encodings())}")
+        with self._lock:
+            self._forget(sid)
+            if encoding != DEFAULT_ENCODING:
+                self._encodings[sid] = encoding
+                self._counts[encoding] = self._counts.get(encoding, 0) + 1
+
+    def remove(self, sid):
+        with self._lock:
+            self._forget(sid)
+
+    def in_use(self):
+        """The default encoding, then every other encoding at least one client negotiated"""
+        with self._lock:
+            return [DEFAULT_ENCODING] + sorted(self._counts)
+
+    def _forget(self, sid):
+        encoding = self._encodings.pop(sid, None)
+        if encoding is not None:
+            self._counts[encoding] -= 1
+            if not self._counts[encoding]:
+                del self._counts[encoding]
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts)